@@ -4,16 +4,17 @@ Receives a parsed alarm context, runs PLAN → INVESTIGATE → DECIDE → ACT ph
 by delegating to sub-agents (logs, metrics, deploy) via A2A and synthesizing their findings.
 """
 
-import datetime
 import logging
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
 
 from app.agents.deploy_agent import deploy_agent
 from app.agents.logs_agent import logs_agent
 from app.agents.metrics_agent import metrics_agent
+from app.agents.models import bedrock_model
+from app.tools import deadline, tracing
 from app.tools.parse_alarm import parse_alarm_event
+from app.tools.rca_templates import render_rca
 
 logger = logging.getLogger(__name__)
 
@@ -108,48 +109,19 @@ def generate_rca_markdown(
     Returns:
         Markdown string of the full RCA report.
     """
-    now = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    evidence_lines = "\n".join(f"  {i + 1}. {e}" for i, e in enumerate(evidence_chain))
-
-    return f"""# Incident Report: {incident_id}
-
-## Summary
-| Field | Value |
-|-------|-------|
-| Incident ID | {incident_id} |
-| Service | {service} |
-| Detected At | {detected_at} |
-| Root Cause | {root_cause} |
-| Confidence | {confidence:.0%} |
-| Recommended Action | {recommended_action} |
-| Report Generated | {now} |
-
-## Evidence Chain
-{evidence_lines}
-
-## Log Analysis
-{logs_summary or "No log findings available."}
-
-## Metric Analysis
-{metrics_summary or "No metric findings available."}
-
-## Deployment Correlation
-{deploy_summary or "No deployment findings available."}
-
-## Recommended Action
-**{recommended_action.upper()}** — {"Roll back " + service + " to previous version" if recommended_action == "rollback" else "Escalate to human on-call team for further investigation"}
-
-## Agent Chain of Thought
-1. DETECT — Alarm received for {service}
-2. PLAN — Investigation plan generated, 3 agents dispatched via A2A
-3. INVESTIGATE — Logs, Metrics, Deploy agents analyzed data
-4. DECIDE — Root cause identified (confidence: {confidence:.0%})
-5. ACT — {recommended_action.upper()} recommended
-6. REPORT — This document generated at {now}
-
----
-*Generated by Autonomous Incident Commander (AIC)*
-"""
+    return render_rca(
+        "markdown",
+        incident_id=incident_id,
+        service=service,
+        detected_at=detected_at,
+        root_cause=root_cause,
+        confidence=confidence,
+        recommended_action=recommended_action,
+        evidence_chain=evidence_chain,
+        logs_summary=logs_summary,
+        metrics_summary=metrics_summary,
+        deploy_summary=deploy_summary,
+    )
 
 
 # ── Commander Agent Definition ─────────────────────────────────────────────────
@@ -175,6 +147,9 @@ Based on the parsed alarm, determine:
 - The affected service
 - A time window for investigation (extend 30 minutes BEFORE the alarm detection time)
 - Your initial hypothesis about what might be wrong
+If you are shown past incidents and one matches closely (similarity >= 0.6), take its
+recorded root cause as your leading hypothesis and ask the sub-agents to confirm or rule
+it out first.
 Then state your plan clearly before delegating.
 
 ### Phase 3: INVESTIGATE (A2A Delegation)
@@ -185,6 +160,8 @@ Transfer to each sub-agent one at a time. Before each transfer, tell the agent w
 3. **Transfer to `deploy_agent`**: Tell it the service name, start/end timestamps (extend start to 2 hours before alarm), and incident_id
 
 Each agent will investigate using its own tools and return findings to you.
+logs_agent's analysis may list `similar_incidents`: past incidents matched on its evidence.
+Those matches are much sharper than the ones for the alarm alone.
 
 ### Phase 4: DECIDE
 After all 3 agents have reported back:
@@ -211,7 +188,7 @@ Call `generate_rca_markdown` with all findings to produce the final report. Incl
 
 commander_agent = Agent(
     name="commander",
-    model=LiteLlm(model="bedrock/anthropic.claude-opus-4-6-v1"),
+    model=bedrock_model("bedrock/anthropic.claude-opus-4-6-v1", role="commander"),
     instruction=COMMANDER_INSTRUCTION,
     description="The Incident Commander — orchestrates multi-phase incident investigation by delegating to logs, metrics, and deployment sub-agents via A2A.",
     tools=[
@@ -224,4 +201,10 @@ commander_agent = Agent(
         metrics_agent,
         deploy_agent,
     ],
+    before_agent_callback=tracing.agent_started,
+    after_agent_callback=tracing.agent_finished,
+    before_model_callback=[deadline.model_started, tracing.model_started],
+    after_model_callback=tracing.model_finished,
+    before_tool_callback=tracing.tool_started,
+    after_tool_callback=tracing.tool_finished,
 )
@@ -1,20 +1,25 @@
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
-from app.tools.envelope import build_response_envelope
-import datetime
-import boto3
+from app.agents.models import bedrock_model
+from app.tools.envelope import collect_findings, emit_envelope, record_agent_start
+from app.tools import deadline, tracing
+from app.tools.s3_deployments import default_source, get_deployments
 import json
+import os
+
+PUSH_EVENT_BUCKET = os.getenv("DEPLOY_EVENTS_BUCKET", "bucketrag-426313057150")
+PUSH_EVENT_KEY = "mock_github_push_event.json"
 
 
 def fetch_deployment_logs():
     """Fetches deployment logs (mock GitHub push event) from S3."""
-    bucket_name = "bucketrag-426313057150"
-    key = "mock_github_push_event.json"
-    s3 = boto3.client("s3")
-    
+    bucket_name = PUSH_EVENT_BUCKET
+    key = PUSH_EVENT_KEY
+
     try:
-        response = s3.get_object(Bucket=bucket_name, Key=key)
-        data = json.loads(response["Body"].read().decode("utf-8"))
+        # Cached per container and revalidated by ETag, like the deploy history.
+        data = default_source().cache.get(bucket_name, key, json.loads)
+        if data is None:
+            raise FileNotFoundError(f"s3://{bucket_name}/{key} does not exist")
         return {
             "source": f"s3://{bucket_name}/{key}",
             "deployment_data": data,
@@ -24,30 +29,31 @@ def fetch_deployment_logs():
         return {"error": f"Failed to fetch deployment logs from S3: {str(e)}"}
 
 
-def submit_deploy_response(incident_id: str, findings: list, summary: str) -> dict:
-    """Submits the final response with the agent's generated summary."""
-    start_time = datetime.datetime.now(datetime.timezone.utc)
-    return build_response_envelope(
-        agent_name="deploy_agent",
-        incident_id=incident_id,
-        findings=findings,
-        start_time=start_time,
-        summary=summary,
-    )
-
-
 deploy_agent = Agent(
     name="deploy_agent",
-    model=LiteLlm(model="bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0"),
+    model=bedrock_model("bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0"),
     description="Analyzes deployment logs from S3 to identify potential causes of incidents.",
     instruction="""You are the Deployment Intelligence Agent. When you receive a task:
-1. Call `fetch_deployment_logs` to retrieve the latest deployment information from S3.
-2. Analyze the 'deployment_data' in the response. Look at the 'commits' list, 'pusher', and 'repository' details.
+1. Call `get_deployments` with the service and the task's time window to get the deploy history for that window (most recent first, with `risk_flag` and `minutes_before_incident`), and `fetch_deployment_logs` for the latest push event.
+2. Analyze the deployments and the 'deployment_data' in the response. Look at risk flags and config diffs, the 'commits' list, 'pusher', and 'repository' details.
 3. Identify any risky changes (e.g., modified files, commit messages indicating fixes or features).
-4. Generate a professional summary (e.g., "Analyzed deployment logs from S3. Found push event [ref] by [pusher]. Commit [id]: [message] modified [files]...").
-5. Call `submit_deploy_response` with a list formatted as findings (can be the raw commits list or a simplified version) and your summary.
-6. After responding, you will automatically return control to the Commander.
+4. Reply with a professional summary as your final answer (e.g., "Analyzed deployment logs from S3. Found push event [ref] by [pusher]. Commit [id]: [message] modified [files]..."), without calling another tool. Your reply becomes the summary of your response envelope, and the deployments `get_deployments` returned become its findings.
+5. After responding, you will automatically return control to the Commander.
 """,
-    tools=[fetch_deployment_logs, submit_deploy_response],
+    tools=[get_deployments, fetch_deployment_logs],
     output_key="deploy_findings",
+    before_agent_callback=[record_agent_start, tracing.agent_started, deadline.agent_started],
+    after_agent_callback=[
+        emit_envelope("deploy_findings"),
+        tracing.agent_finished,
+        deadline.agent_finished,
+    ],
+    before_model_callback=[deadline.model_started, tracing.model_started],
+    after_model_callback=tracing.model_finished,
+    before_tool_callback=[deadline.tool_started, tracing.tool_started],
+    on_tool_error_callback=deadline.tool_failed,
+    after_tool_callback=[
+        tracing.tool_finished,
+        collect_findings("get_deployments", "deployments"),
+    ],
 )
@@ -6,11 +6,12 @@ from dotenv import load_dotenv
 
 from google.adk.agents import LlmAgent
 from google.adk.runners import InMemoryRunner
-from google.adk.models.lite_llm import LiteLlm
 
+from app.agents.models import bedrock_model
 from app.tools.cloudwatch_logs import query_logs_insights
 from app.tools.stack_parser import extract_stack_traces
-from app.tools.envelope import build_response_envelope
+from app.tools.envelope import build_response_envelope, incident_id_for, record_agent_start
+from app.tools import deadline, similarity_index, tracing
 import datetime
 
 load_dotenv()
@@ -25,7 +26,9 @@ def diagnose_service_errors(service: str, lookback_minutes: int = 15) -> str:
     2. Queries CloudWatch Logs for ERRORs.
     3. Returns ONLY the last 100 characters of the findings.
     """
-    logs_client = boto3.client("logs", region_name=os.getenv("AWS_REGION", "us-east-1"))
+    logs_client = tracing.instrument_client(
+        boto3.client("logs", region_name=os.getenv("AWS_REGION", "us-east-1"))
+    )
 
     end_time = int(time.time())
     start_time = end_time - (lookback_minutes * 60)
@@ -79,7 +82,7 @@ def analyze_logs(service: str, time_window: dict, filter_pattern: str = None) ->
     except Exception as e:
         return build_response_envelope(
             agent_name="logs_agent",
-            incident_id=time_window.get("incident_id", "INC-UNKNOWN"),
+            incident_id=incident_id_for(time_window),
             findings=[],
             start_time=start_time,
             error=str(e),
@@ -123,7 +126,7 @@ def analyze_logs(service: str, time_window: dict, filter_pattern: str = None) ->
 
     return build_response_envelope(
         agent_name="logs_agent",
-        incident_id=time_window.get("incident_id", "INC-UNKNOWN"),
+        incident_id=incident_id_for(time_window),
         findings=[findings] if logs else [],
         start_time=start_time,
         summary=summary,
@@ -134,7 +137,7 @@ def analyze_logs(service: str, time_window: dict, filter_pattern: str = None) ->
 
 logs_agent = LlmAgent(
     name="logs_agent",
-    model=LiteLlm(model="bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0"),
+    model=bedrock_model("bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0"),
     description="Reads and analyzes CloudWatch Logs to identify errors and stack traces. Give it the service name, start time, end time, and incident_id.",
     instruction="""You are the Logs Intelligence Agent. When you receive a task:
 1. Call `analyze_logs` with the service, time_window (dict with "start", "end", "incident_id"), and optional filter_pattern.
@@ -145,6 +148,13 @@ logs_agent = LlmAgent(
 """,
     tools=[analyze_logs, diagnose_service_errors],
     output_key="logs_findings",
+    before_agent_callback=[record_agent_start, tracing.agent_started, deadline.agent_started],
+    after_agent_callback=[tracing.agent_finished, deadline.agent_finished],
+    before_model_callback=[deadline.model_started, tracing.model_started],
+    after_model_callback=tracing.model_finished,
+    before_tool_callback=[deadline.tool_started, tracing.tool_started],
+    on_tool_error_callback=deadline.tool_failed,
+    after_tool_callback=[tracing.tool_finished, similarity_index.logs_reported],
 )
 
 
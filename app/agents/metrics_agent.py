@@ -1,8 +1,9 @@
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
+from app.agents.models import bedrock_model
 from app.tools.cloudwatch_metrics import get_metric_data
 from app.tools.anomaly_detector import detect_anomalies
-from app.tools.envelope import build_response_envelope
+from app.tools.envelope import collect_findings, emit_envelope, incident_id_for, record_agent_start
+from app.tools import deadline, tracing
 import datetime
 
 
@@ -13,6 +14,7 @@ def query_metrics_and_detect_anomalies(
     datetime.datetime.now(datetime.timezone.utc)
 
     try:
+        deadline.check("get_metric_data")
         raw_data = get_metric_data(service, metric_names, time_window)
     except Exception as e:
         return {"error": str(e)}
@@ -40,33 +42,34 @@ def query_metrics_and_detect_anomalies(
         "anomalies": anomalies_detected,
         "count": len(anomalies_detected),
         "service": service,
-        "incident_id": time_window.get("incident_id", "INC-UNKNOWN"),
+        "incident_id": incident_id_for(time_window),
     }
 
 
-def submit_metrics_response(incident_id: str, findings: list, summary: str) -> dict:
-    """Submits the final response with the agent's generated summary."""
-    start_time = datetime.datetime.now(datetime.timezone.utc)
-    return build_response_envelope(
-        agent_name="metrics_agent",
-        incident_id=incident_id,
-        findings=findings,
-        start_time=start_time,
-        summary=summary,
-    )
-
-
 metrics_agent = Agent(
     name="metrics_agent",
-    model=LiteLlm(model="bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0"),
+    model=bedrock_model("bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0"),
     description="Analyzes CloudWatch metrics to identify anomalies and degradation trends. Give it the service name, metric_names list, time_window dict, and optional threshold.",
     instruction="""You are the Metrics Intelligence Agent. When you receive a task:
 1. Call `query_metrics_and_detect_anomalies` with the service, metric_names list, time_window (dict with "start", "end", "incident_id"), and threshold.
 2. Analyze the returned 'anomalies' and 'raw_datapoints'. Determine trend (rising, recovering, stable) and severity.
-3. Generate a concise expert summary of the situation.
-4. Call `submit_metrics_response` with the incident_id, findings list, and your summary.
-5. After responding, you will automatically return control to the Commander.
+3. Reply with a concise expert summary of the situation as your final answer, without calling another tool. Your reply becomes the summary of your response envelope, and the anomalies the tool returned become its findings.
+4. After responding, you will automatically return control to the Commander.
 """,
-    tools=[query_metrics_and_detect_anomalies, submit_metrics_response],
+    tools=[query_metrics_and_detect_anomalies],
     output_key="metrics_findings",
+    before_agent_callback=[record_agent_start, tracing.agent_started, deadline.agent_started],
+    after_agent_callback=[
+        emit_envelope("metrics_findings"),
+        tracing.agent_finished,
+        deadline.agent_finished,
+    ],
+    before_model_callback=[deadline.model_started, tracing.model_started],
+    after_model_callback=tracing.model_finished,
+    before_tool_callback=[deadline.tool_started, tracing.tool_started],
+    on_tool_error_callback=deadline.tool_failed,
+    after_tool_callback=[
+        tracing.tool_finished,
+        collect_findings("query_metrics_and_detect_anomalies", "anomalies"),
+    ],
 )
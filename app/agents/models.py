@@ -0,0 +1,186 @@
+"""Model wiring shared by the agents: every LLM call goes through the scheduler.
+
+``bedrock_model`` builds the LiteLlm for an agent and wraps it in
+``ScheduledLlm``, which waits for a grant from ``llm_scheduler`` before
+calling the backend. Before that, a sub-agent's call is routed by
+``model_router`` to the small model when its evidence is simple. Tests and
+the local runner swap ``agent.model`` for a fake and skip the scheduler;
+``ScheduledLlm(inner=fake)`` puts the fake behind the scheduler instead.
+
+Every request opens with the same static prefix for its agent: tool
+schemas, then the system prompt (the agent's instruction). Then comes the
+conversation, which only grows within a run. ``CACHE_POINTS`` marks the
+end of each part for Bedrock prompt caching, so a turn re-reads the tools,
+the instruction and the previous turn's conversation from the cache, and
+pays full price only for what is new. Per-turn steering (see deadline)
+goes at the end of the conversation, never into the system prompt, so the
+prefix stays byte-identical. Steering is not part of the conversation the
+next turn, so the conversation's cache point moves back onto the last
+message before it (``_cache_points``). LiteLLM turns the points into Bedrock
+``cachePoint`` blocks. Prefixes below the model's minimum cacheable length
+are sent uncached. ``AIC_PROMPT_CACHE=0`` turns the points off.
+"""
+
+import copy
+import os
+import time
+from typing import Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.lite_llm import LiteLlm
+
+from app.tools import deadline, llm_scheduler, model_router, tracing
+
+CHARS_PER_TOKEN = 4
+DEFAULT_OUTPUT_TOKENS = 1024
+
+PROMPT_CACHE = os.getenv("AIC_PROMPT_CACHE", "1") == "1"
+# Bedrock accepts at most four cache points per request.
+CACHE_POINTS = [
+    {"location": "tool_config"},
+    {"location": "message", "role": "system"},
+    {"location": "message", "index": -1},
+]
+
+
+def estimate_tokens(llm_request) -> int:
+    """Rough prompt + completion size, charged to the token bucket before the call."""
+    chars = sum(len(c.model_dump_json(exclude_none=True)) for c in llm_request.contents or [])
+    config = llm_request.config
+    if config is not None and config.system_instruction:
+        chars += len(str(config.system_instruction))
+    max_output = (config.max_output_tokens if config is not None else None) or DEFAULT_OUTPUT_TOKENS
+    return chars // CHARS_PER_TOKEN + max_output
+
+
+def _priority(role: str, llm_request) -> int:
+    if role != "commander":
+        return llm_scheduler.PRIORITY_SUB_AGENT
+    # Once the Commander has delegated, each of its calls moves the incident
+    # forward (next delegation, DECIDE, REPORT), so they go first.
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.function_call and part.function_call.name == "transfer_to_agent":
+                return llm_scheduler.PRIORITY_DECIDE
+    return llm_scheduler.PRIORITY_COMMANDER
+
+
+def _tool_responses(llm_request) -> list:
+    # Only the agent's own tool results are function responses; ADK turns
+    # other agents' events into plain text.
+    return [
+        part.function_response.response
+        for content in llm_request.contents or []
+        for part in content.parts or []
+        if part.function_response
+    ]
+
+
+def _cache_points(points: list, llm_request) -> list:
+    """``points`` with the conversation's cache point moved back past per-turn steering."""
+    labels = (llm_request.config.labels if llm_request.config is not None else None) or {}
+    steering = int(labels.get(deadline.STEERING_LABEL, "0"))
+    if not steering:
+        return points
+    return [{**p, "index": p["index"] - steering} if "index" in p else p for p in points]
+
+
+def _with_cache_points(inner: BaseLlm, llm_request) -> BaseLlm:
+    # LiteLlm sends its constructor kwargs with every call; a shallow copy
+    # carries this request's points without touching the shared model.
+    args = getattr(inner, "_additional_args", None) or {}
+    points = args.get("cache_control_injection_points")
+    if not points:
+        return inner
+    shifted = _cache_points(points, llm_request)
+    if shifted is points:
+        return inner
+    inner = copy.copy(inner)
+    inner._additional_args = {**args, "cache_control_injection_points": shifted}
+    return inner
+
+
+def _agent_name(llm_request, default: str) -> str:
+    labels = (llm_request.config.labels if llm_request.config is not None else None) or {}
+    return labels.get("adk_agent_name", default)
+
+
+def _is_throttle(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}"
+    return any(marker in text for marker in ("RateLimit", "Throttl", "TooManyRequests"))
+
+
+class ScheduledLlm(BaseLlm):
+    """Wraps another model; each call waits for a scheduler grant for its model id.
+
+    With ``small_model`` set, each call is first routed between it and the
+    pinned model (``model_router.route``).
+    """
+
+    inner: BaseLlm
+    role: str = "sub_agent"
+    small_model: Optional[str] = None
+
+    async def generate_content_async(self, llm_request, stream=False):
+        scheduler = llm_scheduler.default_scheduler()
+        pinned = llm_request.model or self.model
+        model, tier, reason = model_router.route(
+            pinned, self.small_model, _tool_responses(llm_request)
+        )
+        # LiteLlm calls llm_request.model when it is set.
+        llm_request.model = model
+        priority = _priority(self.role, llm_request)
+        estimate = estimate_tokens(llm_request)
+        with tracing.span("llm.queue", kind="queue", model=model, priority=priority, tier=tier):
+            grant = await scheduler.acquire(
+                model, llm_scheduler.current_incident(), priority, estimate
+            )
+        prompt_tokens = completion_tokens = cached_tokens = 0
+        used = None
+        started = time.monotonic()
+        try:
+            inner = _with_cache_points(self.inner, llm_request)
+            async for response in inner.generate_content_async(llm_request, stream):
+                usage = response.usage_metadata
+                if usage is not None and not response.partial:
+                    prompt_tokens = usage.prompt_token_count or 0
+                    completion_tokens = usage.candidates_token_count or 0
+                    cached_tokens = usage.cached_content_token_count or 0
+                    used = prompt_tokens + completion_tokens
+                yield response
+        except Exception as e:
+            if _is_throttle(e):
+                scheduler.throttled(model)
+            raise
+        finally:
+            scheduler.release(grant, used)
+            log = model_router.current_log()
+            if log is not None:
+                log.record(
+                    _agent_name(llm_request, self.role),
+                    pinned,
+                    model,
+                    tier,
+                    reason,
+                    (time.monotonic() - started) * 1000,
+                    prompt_tokens,
+                    completion_tokens,
+                    cached_tokens,
+                )
+
+
+def bedrock_model(model_id: str, role: str = "sub_agent") -> ScheduledLlm:
+    """The Bedrock model ``model_id`` via LiteLlm, behind the process-wide scheduler.
+
+    Sub-agents route simple calls down to ``model_router.SMALL_MODEL``; the
+    Commander always uses ``model_id``. With ``PROMPT_CACHE`` on, requests
+    carry ``CACHE_POINTS``.
+    """
+    small_model = model_router.SMALL_MODEL if role == "sub_agent" else None
+    kwargs = {"cache_control_injection_points": CACHE_POINTS} if PROMPT_CACHE else {}
+    return ScheduledLlm(
+        model=model_id,
+        inner=LiteLlm(model=model_id, **kwargs),
+        role=role,
+        small_model=small_model or None,
+    )
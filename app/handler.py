@@ -3,12 +3,30 @@
 import asyncio
 import json
 import logging
-from typing import Any, Dict
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 
 from google.adk.runners import InMemoryRunner
 from google.genai import types
 
 from app.agents.commander import commander_agent
+from app.tools import (
+    coalescer,
+    deadline,
+    evidence_store,
+    llm_scheduler,
+    model_router,
+    notifier,
+    report_generator,
+    similarity_index,
+    state_store,
+    tracing,
+)
+from app.tools.envelope import emitted_envelopes
+from app.tools.parse_alarm import parse_alarm_event
+from app.tools.rca_templates import render_rca
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s"
@@ -17,59 +35,324 @@ logger = logging.getLogger(__name__)
 
 APP_NAME = "aic-commander"
 USER_ID = "system"
+STATE_FLUSH_TIMEOUT_SECONDS = 10.0
 
+_STREAM_DONE = object()
+
+
+def _save_tool_state(incident_id: str, event_response, evidence: Dict[str, Any]) -> None:
+    """DECISION / ACTION write points (plan.md), from Commander tool traffic.
+
+    Also collects the decision and the RCA Markdown into ``evidence`` for the
+    report bundle.
+    """
+    for call in event_response.get_function_calls():
+        if call.name == "generate_rca_markdown":
+            args = call.args or {}
+            # ACT is mock/log only: record the action the report recommends.
+            action = {
+                "recommended_action": args.get("recommended_action"),
+                "confidence": args.get("confidence"),
+                "root_cause": args.get("root_cause"),
+                "executed": False,
+            }
+            evidence["action"] = action
+            state_store.save_state(incident_id, "ACTION", action)
+    for response in event_response.get_function_responses():
+        if response.name == "compute_confidence_score":
+            evidence["decision"] = response.response or {}
+            state_store.save_state(incident_id, "DECISION", evidence["decision"])
+        elif response.name == "generate_rca_markdown":
+            evidence["markdown"] = (response.response or {}).get("result", "")
+
+
+def _partial_report(incident: Dict, evidence: Dict[str, Any]) -> None:
+    """Write an escalation RCA from the findings so far; the budget ran out before the Commander did."""
+    findings = evidence["findings"]
+    action = {
+        "recommended_action": "escalate",
+        "confidence": (evidence.get("decision") or {}).get("base_confidence", 0.0),
+        "root_cause": "Undetermined: the investigation time budget ran out",
+        "executed": False,
+    }
+    evidence["action"] = action
+    state_store.save_state(incident["incident_id"], "ACTION", action)
+    evidence["markdown"] = render_rca(
+        "markdown",
+        incident_id=incident["incident_id"],
+        service=incident["service"],
+        detected_at=incident["detected_at"],
+        root_cause=action["root_cause"],
+        confidence=action["confidence"],
+        recommended_action="escalate",
+        evidence_chain=[f"{f['agent']} ({f['status']}): {f.get('summary')}" for f in findings]
+        or ["No sub-agent reported before the budget ran out"],
+    )
+
+
+def _publish_report(incident: Dict, evidence: Dict[str, Any], trace) -> Dict[str, Any]:
+    """Upload the RCA + evidence bundle (REPORT write point), or keep it in state only."""
+    markdown = evidence.pop("markdown")
+    action = evidence.get("action") or {}
+    if not report_generator.REPORTS_BUCKET:
+        state_store.save_state(incident["incident_id"], "REPORT", {"markdown": markdown})
+        return {}
+    if trace is not None:
+        evidence["trace"] = trace.summary()
+    return report_generator.generate_rca_report(
+        incident_id=incident["incident_id"],
+        service=incident["service"],
+        detected_at=incident["detected_at"],
+        markdown=markdown,
+        evidence={"incident": incident, **evidence},
+        summary=f"{action.get('root_cause') or 'Root cause undetermined'} "
+        f"— {action.get('recommended_action') or 'escalate'} recommended.",
+    )
+
+
+def _finish_invocation() -> None:
+    """Flush state, notifications and metrics before Lambda freezes the container.
+
+    Each step is guarded, so one failing neither skips the rest nor replaces
+    the invocation's response.
+    """
+    steps = (
+        # State writes are write-behind; make them durable.
+        ("State flush", lambda: state_store.flush_state(timeout=STATE_FLUSH_TIMEOUT_SECONDS)),
+        # A frozen container may never run atexit, so queued alerts go out now.
+        ("Notification flush", notifier.flush_notifications),
+        ("Scheduler metrics", llm_scheduler.emit_metrics),
+    )
+    for what, step in steps:
+        try:
+            step()
+        except Exception as e:
+            logger.exception("%s failed: %s", what, e)
+
+
+def _notify(incident: Dict, evidence: Dict[str, Any], report: Dict[str, Any]) -> None:
+    """Queue the incident alert (tools.md Tool 13); batching and dedup are the notifier's."""
+    action = evidence.get("action") or {}
+    notifier.send_notification(
+        incident_id=incident["incident_id"],
+        summary=report.get("summary")
+        or f"{action.get('root_cause') or 'Root cause undetermined'} "
+        f"— {action.get('recommended_action') or 'escalate'} recommended.",
+        report_url=report.get("report_url"),
+        recommended_action=action.get("recommended_action") or "escalate",
+        service=incident["service"],
+        alarm_name=incident.get("alarm_name"),
+        root_cause=action.get("root_cause"),
+    )
+
+
+async def stream_commander(
+    event: dict, budget_seconds: Optional[float] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run the Commander agent and yield progress events as the investigation unfolds.
+
+    ``budget_seconds`` bounds the run (see ``deadline``). Sub-agents that run
+    out of time report ``failed``. A Commander still running
+    ``deadline.GRACE_SECONDS`` past the budget is stopped. If it has not
+    written the RCA by then, an escalation report is built from the findings
+    so far.
+
+    Event types, each carrying ``elapsed_ms`` since the run started:
+      started — incident_id and session_id
+      phase   — the Commander moved to a new phase (PLAN, INVESTIGATE, ...)
+      finding — a sub-agent tool returned a response envelope
+      text    — an agent produced its final text (sub-agent report or RCA)
+      final   — concatenated response, first_evidence_ms, report_url (when
+                uploaded), budget_exhausted and trace summary
+    """
+    t0 = time.perf_counter()
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - t0) * 1000, 1)
 
-async def _run_commander(event: dict) -> dict:
-    """Run the Commander agent with the alarm event and collect the final response."""
     runner = InMemoryRunner(agent=commander_agent, app_name=APP_NAME)
 
     session = await runner.session_service.create_session(
         app_name=APP_NAME, user_id=USER_ID
     )
 
+    incident = parse_alarm_event(event)
+    # Similar past incidents go into the opening message rather than costing a tool turn.
+    similar = await asyncio.to_thread(similarity_index.SimilarIncidents, incident)
+
     # Format the event as a user message to the Commander
     prompt = (
         "A CloudWatch alarm has fired. Here is the raw event:\n\n"
         f"```json\n{json.dumps(event, indent=2, default=str)}\n```\n\n"
-        "Execute the full incident investigation: DETECT → PLAN → INVESTIGATE → DECIDE → REPORT."
+        + (f"{similar.opening}\n\n" if similar.opening else "")
+        + "Execute the full incident investigation: DETECT → PLAN → INVESTIGATE → DECIDE → REPORT."
     )
 
     content = types.Content(role="user", parts=[types.Part(text=prompt)])
 
+    incident_id = incident["incident_id"]
+    state_store.save_state(incident_id, "META#0", incident, timestamped=False)
+    yield {
+        "type": "started",
+        "incident_id": incident_id,
+        "session_id": session.id,
+        "elapsed_ms": elapsed_ms(),
+    }
+
+    phase = tracing.PHASES[0]
+    first_evidence_ms = None
     final_text = ""
-    async for event_response in runner.run_async(
-        user_id=USER_ID, session_id=session.id, new_message=content
-    ):
-        if (
-            event_response.is_final_response()
-            and event_response.content
-            and event_response.content.parts
+    plan_text = ""
+    evidence: Dict[str, Any] = {"findings": []}
+    report: Dict[str, Any] = {}
+    with tracing.trace_incident(
+        f"{incident_id}-{session.id[:8]}"
+    ) as trace, deadline.incident_budget(
+        incident_id, budget_seconds
+    ) as budget, llm_scheduler.incident(incident_id), model_router.incident(
+        incident_id
+    ) as routing, similarity_index.incident(similar):
+        async for event_response in deadline.until_hard_stop(
+            runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content),
+            budget,
         ):
-            for part in event_response.content.parts:
-                if part.text:
-                    final_text += part.text
+            tracing.observe_event(event_response)
+            if phase in ("DETECT", "PLAN") and event_response.content:
+                plan_text += "".join(
+                    p.text for p in event_response.content.parts or [] if p.text
+                )
+            next_phase = tracing.phase_for_event(event_response, phase)
+            if next_phase:
+                if next_phase == "INVESTIGATE":
+                    state_store.save_state(incident_id, "PLAN", {"plan": plan_text})
+                phase = next_phase
+                yield {"type": "phase", "phase": phase, "elapsed_ms": elapsed_ms()}
+            _save_tool_state(incident_id, event_response, evidence)
+
+            envelopes = [r.response or {} for r in event_response.get_function_responses()]
+            # Metrics and deploy agents emit theirs through session state;
+            # sub-agents stopped by the budget report through the budget.
+            envelopes += emitted_envelopes(event_response) + budget.drain_failures()
+            for envelope in envelopes:
+                if "agent" not in envelope or "status" not in envelope:
+                    continue
+                first_evidence_ms = first_evidence_ms or elapsed_ms()
+                state_store.save_state(
+                    incident_id, f"FINDING#{envelope['agent']}", envelope
+                )
+                evidence["findings"].append(envelope)
+                yield {
+                    "type": "finding",
+                    "agent": envelope["agent"],
+                    "status": envelope["status"],
+                    "summary": envelope.get("summary"),
+                    "findings": envelope.get("findings", []),
+                    "elapsed_ms": elapsed_ms(),
+                }
+
+            if (
+                event_response.is_final_response()
+                and event_response.content
+                and event_response.content.parts
+            ):
+                text = "".join(p.text for p in event_response.content.parts if p.text)
+                if text:
+                    final_text += text
+                    first_evidence_ms = first_evidence_ms or elapsed_ms()
+                    yield {
+                        "type": "text",
+                        "author": event_response.author,
+                        "text": text,
+                        "elapsed_ms": elapsed_ms(),
+                    }
 
-    return {
+        budget_exhausted = budget.exhausted
+        if "markdown" not in evidence and budget_exhausted:
+            logger.warning("Incident budget spent before the RCA; escalating on partial evidence")
+            _partial_report(incident, evidence)
+        if "markdown" in evidence:
+            try:
+                report = await asyncio.to_thread(_publish_report, incident, evidence, trace)
+            except Exception as e:
+                logger.exception("Report upload failed: %s", e)
+            try:
+                _notify(incident, evidence, report)
+            except Exception as e:
+                logger.exception("Notification failed: %s", e)
+            try:
+                await asyncio.to_thread(evidence_store.record_evidence, incident, evidence)
+            except Exception as e:
+                logger.exception("Evidence export failed: %s", e)
+
+    model_routing = routing.summary()
+    if model_routing["calls"]:
+        logger.info(
+            "Model routing for %s: %d of %d calls on the small model, est. $%.4f and %.0f ms saved",
+            incident_id,
+            model_routing["small_calls"],
+            model_routing["calls"],
+            model_routing["est_cost_saved_usd"],
+            model_routing["est_latency_saved_ms"],
+        )
+    final = {
+        "type": "final",
         "response": final_text,
         "session_id": session.id,
+        "first_evidence_ms": first_evidence_ms,
+        "budget_exhausted": budget_exhausted,
+        "model_routing": model_routing,
+        "elapsed_ms": elapsed_ms(),
     }
+    if report:
+        final["report_url"] = report["report_url"]
+    if trace is not None:
+        final["trace"] = trace.summary()
+    yield final
 
 
-def lambda_handler(event: Any, context: Any = None) -> Dict[str, Any]:
-    """AWS Lambda entry point.
+async def _run_commander(event: dict, budget_seconds: Optional[float] = None) -> dict:
+    """Run the Commander agent with the alarm event and collect the final response."""
+    result: Dict[str, Any] = {}
+    async for update in stream_commander(event, budget_seconds):
+        if update["type"] == "final":
+            result = {
+                "response": update["response"],
+                "session_id": update["session_id"],
+            }
+            for key in ("report_url", "trace"):
+                if key in update:
+                    result[key] = update[key]
+    return result
 
-    Handles both EventBridge alarm events and direct test invocations.
-    """
-    logger.info("Received event: %s", json.dumps(event, default=str)[:500])
 
+def _normalize_event(event: Any) -> dict:
     # Normalize: if this is an EventBridge event, it has 'detail-type'
     # If it's a direct invoke with just the alarm detail, wrap it
     if "detail-type" not in event and "detail" not in event:
         # Assume it's a raw alarm detail passed directly for testing
         event = {"detail": event, "detail-type": "CloudWatch Alarm State Change"}
+    return event
+
+
+def lambda_handler(event: Any, context: Any = None) -> Dict[str, Any]:
+    """AWS Lambda entry point.
+
+    Handles both EventBridge alarm events and direct test invocations.
+    Duplicate alarms for an in-flight incident are coalesced (see coalescer).
+    """
+    logger.info("Received event: %s", json.dumps(event, default=str)[:500])
+
+    event = _normalize_event(event)
+    budget_seconds = deadline.budget_seconds(context)
+
+    def run() -> dict:
+        return asyncio.run(_run_commander(event, budget_seconds))
 
     try:
-        result = asyncio.run(_run_commander(event))
+        if coalescer.COALESCE_ENABLED:
+            result = coalescer.run_coalesced(parse_alarm_event(event), run)
+        else:
+            result = run()
         logger.info("Commander completed successfully")
         return {
             "statusCode": 200,
@@ -81,3 +364,42 @@ def lambda_handler(event: Any, context: Any = None) -> Dict[str, Any]:
             "statusCode": 500,
             "body": {"error": str(e)},
         }
+    finally:
+        _finish_invocation()
+
+
+def stream_handler(event: Any, context: Any = None) -> Iterator[bytes]:
+    """Response-streaming entry point — yields one NDJSON line per progress event.
+
+    Meant for a Function URL with ``InvokeMode=RESPONSE_STREAM`` behind a runtime
+    that forwards generator output as it is produced (e.g. the Lambda Web
+    Adapter). The Commander runs on its own event loop in a worker thread so
+    every line is flushed as soon as the agent emits it. State, notifications
+    and metrics are flushed however the stream ends.
+    """
+    logger.info("Received streaming event: %s", json.dumps(event, default=str)[:500])
+
+    event = _normalize_event(event)
+    budget_seconds = deadline.budget_seconds(context)
+    updates: "queue.Queue[Any]" = queue.Queue()
+
+    async def _pump() -> None:
+        try:
+            async for update in stream_commander(event, budget_seconds):
+                updates.put(update)
+        except Exception as e:
+            logger.exception("Commander failed: %s", e)
+            updates.put({"type": "error", "error": str(e)})
+        finally:
+            updates.put(_STREAM_DONE)
+
+    worker = threading.Thread(target=asyncio.run, args=(_pump(),), daemon=True)
+    worker.start()
+    try:
+        while (update := updates.get()) is not _STREAM_DONE:
+            yield (json.dumps(update, default=str) + "\n").encode("utf-8")
+    finally:
+        # Also when the client disconnects and the generator is closed early:
+        # the investigation runs to the end of its budget, then everything is flushed.
+        worker.join()
+        _finish_invocation()
@@ -0,0 +1,248 @@
+"""Stub AWS clients that answer from the ``mock_data/`` layout.
+
+Lets the investigation tools run offline: ``patch_aws()`` swaps ``boto3.client``
+for a factory returning these stubs for ``logs``, ``cloudwatch`` and ``s3``.
+Each stub call is recorded as an ``aws`` span so traced runs keep their
+per-phase AWS timing, and can sleep to simulate API latency.
+
+Logs and metrics are indexed as time-sorted columns (``app/local/insights.py``),
+so the same stubs serve a generated data set of millions of events.
+"""
+
+import contextlib
+import hashlib
+import itertools
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow
+    pq = None
+
+from app.local.insights import LogColumns, MetricColumns, aggregate, parse_query, run_query
+from app.tools import timeutil, tracing
+from seeder.json_stream import iter_records
+
+MOCK_DATA_DIR = Path(__file__).resolve().parents[2] / "mock_data"
+
+
+class MockDataStore:
+    """Read-only view of a mock_data-style directory, loaded once per service.
+
+    Log files may be JSON arrays, NDJSON or Parquet (``*.json`` / ``*.ndjson``
+    / ``*.parquet``, the last when pyarrow is installed), so a data set from
+    ``benchmarks/incidents.py`` loads as-is. ``add_logs`` and
+    ``add_metrics`` index entries directly, without a directory.
+    """
+
+    def __init__(self, root: Optional[Path] = MOCK_DATA_DIR):
+        self.root = Path(root) if root is not None else None
+        self._lock = threading.Lock()
+        self._logs: Dict[str, LogColumns] = {}
+        self._metrics: Dict[str, Dict[str, MetricColumns]] = {}
+
+    def logs(self, service: str) -> LogColumns:
+        """Log entries for ``service`` as time-sorted columns."""
+        with self._lock:
+            if service not in self._logs:
+                columns = LogColumns()
+                log_dir = self.root / "logs" / service if self.root else None
+                if log_dir and log_dir.is_dir():
+                    for path in sorted(log_dir.iterdir()):
+                        if path.suffix in (".json", ".ndjson"):
+                            with open(path, "rb") as f:
+                                columns.extend(iter_records(f))
+                        elif path.suffix == ".parquet" and pq is not None:
+                            for batch in pq.ParquetFile(path).iter_batches():
+                                columns.extend(
+                                    {k: v for k, v in row.items() if v is not None}
+                                    for row in batch.to_pylist()
+                                )
+                self._logs[service] = columns
+            return self._logs[service]
+
+    def metrics(self, service: str) -> Dict[str, MetricColumns]:
+        """Datapoint columns per metric name for ``service``."""
+        with self._lock:
+            if service not in self._metrics:
+                series: Dict[str, MetricColumns] = {}
+                path = self.root / "metrics" / service / "timeseries.json" if self.root else None
+                if path and path.exists():
+                    with open(path, "rb") as f:
+                        for metric in iter_records(f, keys=("metrics",)):
+                            series[metric["metric_name"]] = MetricColumns(metric.get("datapoints", []))
+                self._metrics[service] = series
+            return self._metrics[service]
+
+    def add_logs(self, service: str, entries: Iterable[Dict]) -> int:
+        columns = self.logs(service)
+        with self._lock:
+            return columns.extend(entries)
+
+    def add_metrics(self, service: str, metric_name: str, datapoints: Iterable[Dict]) -> None:
+        series = self.metrics(service)
+        with self._lock:
+            series[metric_name] = MetricColumns(datapoints)
+
+    def read(self, key: str) -> bytes:
+        if self.root is None:
+            raise FileNotFoundError(key)
+        return (self.root / key).read_bytes()
+
+
+class _StubClient:
+    service_name = ""
+
+    def __init__(self, store: MockDataStore, latency_s: float = 0.0):
+        self.store = store
+        self.latency_s = latency_s
+
+    @contextlib.contextmanager
+    def _call(self, operation: str):
+        with tracing.span(f"{self.service_name}.{operation}", kind="aws"):
+            if self.latency_s:
+                time.sleep(self.latency_s)
+            yield
+
+
+class StubLogsClient(_StubClient):
+    """StartQuery / GetQueryResults over the columnar log store.
+
+    Queries run through ``app/local/insights.py``: fields, filter, stats
+    count, sort and limit, the subset of Logs Insights the tools use.
+    """
+
+    service_name = "logs"
+    _ids = itertools.count(1)
+
+    def __init__(self, store: MockDataStore, latency_s: float = 0.0):
+        super().__init__(store, latency_s)
+        self._queries: Dict[str, Dict[str, Any]] = {}
+
+    def start_query(
+        self,
+        logGroupName: str,
+        startTime: int,
+        endTime: int,
+        queryString: str,
+        limit: Optional[int] = None,
+        **kwargs,
+    ):
+        with self._call("StartQuery"):
+            query = parse_query(queryString)
+            columns = self.store.logs(logGroupName.rsplit("/", 1)[-1])
+            # startTime/endTime are epoch seconds, both inclusive.
+            results, statistics = run_query(
+                columns, startTime * 1000, endTime * 1000, query, limit
+            )
+            query_id = f"stub-query-{next(self._ids)}"
+            self._queries[query_id] = {"results": results, "statistics": statistics}
+            return {"queryId": query_id}
+
+    def get_query_results(self, queryId: str, **kwargs):
+        with self._call("GetQueryResults"):
+            done = self._queries.pop(queryId, {"results": [], "statistics": {}})
+            return {"status": "Complete", **done}
+
+    def stop_query(self, queryId: str, **kwargs):
+        with self._call("StopQuery"):
+            return {"success": self._queries.pop(queryId, None) is not None}
+
+
+class StubMetricsClient(_StubClient):
+    """GetMetricData over the columnar metric store, aggregated per ``Period``."""
+
+    service_name = "monitoring"
+
+    def get_metric_data(self, MetricDataQueries: List[Dict], StartTime, EndTime, **kwargs):
+        with self._call("GetMetricData"):
+            start, end = timeutil.to_epoch_ms(StartTime), timeutil.to_epoch_ms(EndTime)
+            results = []
+            for query in MetricDataQueries:
+                stat = query["MetricStat"]
+                metric = stat["Metric"]
+                dims = {d["Name"]: d["Value"] for d in metric.get("Dimensions", [])}
+                columns = self.store.metrics(dims.get("ServiceName", "")).get(metric["MetricName"])
+                buckets: Dict[int, List[float]] = {}
+                if columns is not None:
+                    period_ms = int(stat.get("Period", 60)) * 1000
+                    for i in columns.window(start, end):
+                        ms = columns.epoch_ms[i]
+                        buckets.setdefault(ms - ms % period_ms, []).append(columns.values[i])
+                stamps = sorted(buckets, reverse=True)  # CloudWatch returns newest first
+                results.append(
+                    {
+                        "Id": query["Id"],
+                        "Label": metric["MetricName"],
+                        "Timestamps": [timeutil.from_epoch_ms(ms) for ms in stamps],
+                        "Values": [aggregate(buckets[ms], stat.get("Stat", "Average")) for ms in stamps],
+                        "StatusCode": "Complete",
+                    }
+                )
+            return {"MetricDataResults": results}
+
+
+class _Body:
+    """Like botocore's StreamingBody: ``read()`` drains it, ``read(n)`` reads a chunk."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        end = len(self._data) if amt is None else self._pos + amt
+        chunk = self._data[self._pos : end]
+        self._pos += len(chunk)
+        return chunk
+
+
+class StubS3Client(_StubClient):
+    """GetObject (with ETag / IfNoneMatch) for keys relative to the mock_data directory."""
+
+    service_name = "s3"
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: Optional[str] = None, **kwargs):
+        with self._call("GetObject"):
+            try:
+                data = self.store.read(Key)
+            except FileNotFoundError:
+                raise ClientError(
+                    {"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject"
+                ) from None
+            etag = f'"{hashlib.md5(data).hexdigest()}"'
+            if IfNoneMatch == etag:
+                raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"}}, "GetObject")
+            return {"Body": _Body(data), "ContentLength": len(data), "ETag": etag}
+
+
+_STUBS = {"logs": StubLogsClient, "cloudwatch": StubMetricsClient, "s3": StubS3Client}
+
+
+@lru_cache(maxsize=None)
+def default_store() -> MockDataStore:
+    return MockDataStore()
+
+
+@contextlib.contextmanager
+def patch_aws(store: Optional[MockDataStore] = None, latency_ms: float = 0.0):
+    """Route ``boto3.client(...)`` to the stubs for the duration of the block."""
+    store = store or default_store()
+    real_client = boto3.client
+
+    def client(service_name: str, *args: Any, **kwargs: Any):
+        if service_name not in _STUBS:
+            raise ValueError(f"No local stub for AWS service '{service_name}'")
+        return _STUBS[service_name](store, latency_ms / 1000.0)
+
+    boto3.client = client
+    try:
+        yield store
+    finally:
+        boto3.client = real_client
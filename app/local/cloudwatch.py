@@ -0,0 +1,72 @@
+"""In-memory stand-in for the CloudWatch PutMetricData API the seeders use.
+
+Same request shape as ``boto3.client("cloudwatch").put_metric_data``. It
+enforces the current limits: 1,000 datums per call, 150 values per
+``Values`` array with a matching ``Counts``, exactly one of ``Value`` /
+``Values`` / ``StatisticValues``, and at most 30 dimensions. Accepted
+datums are kept so tests can check what a seeder sent.
+"""
+
+import threading
+import time
+from typing import Dict, List
+
+from botocore.exceptions import ClientError
+
+MAX_DATUMS_PER_CALL = 1000
+MAX_VALUES_PER_DATUM = 150
+MAX_DIMENSIONS = 30
+
+
+def _invalid(message: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "InvalidParameterValue", "Message": message}}, "PutMetricData"
+    )
+
+
+class LocalCloudWatch:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_s = latency_ms / 1000.0
+        self._lock = threading.Lock()
+        self.datums: Dict[str, List[Dict]] = {}  # namespace -> accepted datums
+        self.calls: Dict[str, int] = {}
+
+    def put_metric_data(self, Namespace: str, MetricData: List[Dict], **kwargs) -> Dict:
+        with self._lock:
+            self.calls["PutMetricData"] = self.calls.get("PutMetricData", 0) + 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if Namespace.startswith("AWS/"):
+            raise _invalid(f"Namespace {Namespace} is reserved")
+        if not MetricData or len(MetricData) > MAX_DATUMS_PER_CALL:
+            raise _invalid(f"MetricData must hold 1-{MAX_DATUMS_PER_CALL} items")
+        for datum in MetricData:
+            kinds = [k for k in ("Value", "Values", "StatisticValues") if k in datum]
+            if len(kinds) != 1:
+                raise _invalid(f"{datum.get('MetricName')}: exactly one of Value/Values/StatisticValues")
+            if len(datum.get("Dimensions", [])) > MAX_DIMENSIONS:
+                raise _invalid(f"{datum['MetricName']}: more than {MAX_DIMENSIONS} dimensions")
+            if "Values" in datum:
+                values, counts = datum["Values"], datum.get("Counts")
+                if len(values) > MAX_VALUES_PER_DATUM:
+                    raise _invalid(f"{datum['MetricName']}: more than {MAX_VALUES_PER_DATUM} values")
+                if counts is not None and len(counts) != len(values):
+                    raise _invalid(f"{datum['MetricName']}: Values and Counts differ in length")
+        with self._lock:
+            self.datums.setdefault(Namespace, []).extend(MetricData)
+        return {}
+
+    def sample_count(self, namespace: str, metric_name: str) -> float:
+        """Raw datapoints represented by the accepted datums for one metric."""
+        total = 0.0
+        with self._lock:
+            for datum in self.datums.get(namespace, []):
+                if datum["MetricName"] != metric_name:
+                    continue
+                if "Value" in datum:
+                    total += 1
+                elif "Values" in datum:
+                    total += sum(datum.get("Counts") or [1] * len(datum["Values"]))
+                else:
+                    total += datum["StatisticValues"]["SampleCount"]
+        return total
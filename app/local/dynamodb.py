@@ -0,0 +1,143 @@
+"""In-memory stand-in for the DynamoDB service resource.
+
+Implements the subset the state store and tests use — ``Table(name)`` with
+put_item / get_item / delete_item / query, and the resource-level
+``batch_write_item`` — with the same request and response shapes as
+``boto3.resource("dynamodb")``. ``unprocessed_rate`` hands back part of each
+batch as ``UnprocessedItems`` (like a throttled table) so retry paths run.
+"""
+
+import copy
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from boto3.dynamodb.conditions import And, BeginsWith, Between, ConditionBase, Equals
+
+MAX_BATCH_WRITE = 25
+
+
+def _matches(condition: ConditionBase, item: Dict) -> bool:
+    expression = condition.get_expression()
+    values = expression["values"]
+    if isinstance(condition, And):
+        return all(_matches(c, item) for c in values)
+    key, *operands = values
+    actual = item.get(key.name)
+    if actual is None:
+        return False
+    if isinstance(condition, Equals):
+        return actual == operands[0]
+    if isinstance(condition, BeginsWith):
+        return str(actual).startswith(operands[0])
+    if isinstance(condition, Between):
+        return operands[0] <= actual <= operands[1]
+    raise NotImplementedError(f"Unsupported key condition: {expression['operator']}")
+
+
+class LocalTable:
+    def __init__(self, name: str, owner: "LocalDynamoDB"):
+        self.name = name
+        self._owner = owner
+        self._items: Dict[tuple, Dict] = {}
+
+    @staticmethod
+    def _key(item: Dict) -> tuple:
+        return item["PK"], item["SK"]
+
+    def put_item(self, Item: Dict, **kwargs) -> Dict:
+        self._owner._call()
+        with self._owner._lock:
+            self._items[self._key(Item)] = copy.deepcopy(Item)
+        return {}
+
+    def get_item(self, Key: Dict, **kwargs) -> Dict:
+        self._owner._call()
+        with self._owner._lock:
+            item = self._items.get(self._key(Key))
+        return {"Item": copy.deepcopy(item)} if item else {}
+
+    def delete_item(self, Key: Dict, **kwargs) -> Dict:
+        self._owner._call()
+        with self._owner._lock:
+            self._items.pop(self._key(Key), None)
+        return {}
+
+    def query(
+        self,
+        KeyConditionExpression: ConditionBase,
+        ScanIndexForward: bool = True,
+        Limit: Optional[int] = None,
+        ExclusiveStartKey: Optional[Dict] = None,
+        **kwargs,
+    ) -> Dict:
+        self._owner._call()
+        with self._owner._lock:
+            items = sorted(
+                (i for i in self._items.values() if _matches(KeyConditionExpression, i)),
+                key=self._key,
+                reverse=not ScanIndexForward,
+            )
+        if ExclusiveStartKey:
+            start = self._key(ExclusiveStartKey)
+            keys = [self._key(i) for i in items]
+            items = items[keys.index(start) + 1 :] if start in keys else []
+        response: Dict[str, Any] = {}
+        if Limit is not None and len(items) > Limit:
+            items = items[:Limit]
+            last = items[-1]
+            response["LastEvaluatedKey"] = {"PK": last["PK"], "SK": last["SK"]}
+        response.update(Items=copy.deepcopy(items), Count=len(items))
+        return response
+
+
+class LocalDynamoDB:
+    """Thread-safe stand-in for ``boto3.resource("dynamodb")``."""
+
+    def __init__(self, latency_ms: float = 0.0, unprocessed_rate: float = 0.0, seed: int = 0):
+        self.latency_s = latency_ms / 1000.0
+        self.unprocessed_rate = unprocessed_rate
+        self.batch_calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tables: Dict[str, LocalTable] = {}
+
+    def _call(self) -> None:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def Table(self, name: str) -> LocalTable:
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = LocalTable(name, self)
+            return self._tables[name]
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict]], **kwargs) -> Dict:
+        if sum(len(r) for r in RequestItems.values()) > MAX_BATCH_WRITE:
+            raise ValueError(f"BatchWriteItem accepts at most {MAX_BATCH_WRITE} requests")
+        self._call()
+        unprocessed: Dict[str, List[Dict]] = {}
+        with self._lock:
+            self.batch_calls += 1
+            rejected = [
+                (name, request)
+                for name, requests in RequestItems.items()
+                for request in requests
+                if self._rng.random() < self.unprocessed_rate
+            ]
+        for name, request in rejected:
+            unprocessed.setdefault(name, []).append(request)
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            for request in requests:
+                if any(request is r for _, r in rejected):
+                    continue
+                if "PutRequest" in request:
+                    with self._lock:
+                        item = request["PutRequest"]["Item"]
+                        table._items[table._key(item)] = copy.deepcopy(item)
+                elif "DeleteRequest" in request:
+                    with self._lock:
+                        table._items.pop(table._key(request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": unprocessed}
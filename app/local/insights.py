@@ -0,0 +1,412 @@
+"""Time-sorted columnar log/metric store and a Logs Insights query subset.
+
+Backs the stub CloudWatch clients in ``app/local/aws.py``. Log entries are
+stored as parallel columns sorted by epoch milliseconds. A StartQuery time
+window is two bisects. Filters only touch the columns they name, and an
+entry's JSON is decoded only for fields that have no column. This keeps
+StartQuery fast over millions of events.
+
+Query syntax is the part of Logs Insights the tools use, piped in any order:
+
+  fields @timestamp, @message, level
+  filter level in ['ERROR', 'WARN'] and @message like /DB_CONN|timeout/
+  filter error_code = 'DB_CONN_TIMEOUT' and status != 200
+  stats count(*) as errors by error_code, bin(5m)
+  sort @timestamp desc | sort errors asc
+  limit 50
+
+Anything else raises ``MalformedQueryException``, the same error the real
+service returns.
+"""
+
+import array
+import bisect
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.tools import timeutil
+
+DEFAULT_LIMIT = 1000  # StartQuery's ``limit`` default
+MAX_LIMIT = 10_000
+INDEXED_FIELDS = ("level", "error_code", "stack_trace")
+_UNITS_MS = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000}
+
+
+def _malformed(message: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "MalformedQueryException", "Message": message}}, "StartQuery"
+    )
+
+
+class LogColumns:
+    """Log entries of one log group as columns sorted by timestamp."""
+
+    __slots__ = ("epoch_ms", "message", "level", "error_code", "stack_trace")
+
+    def __init__(self):
+        self.epoch_ms = array.array("q")
+        self.message: List[str] = []  # the entry as JSON, what @message returns
+        self.level: List[Optional[str]] = []
+        self.error_code: List[Optional[str]] = []
+        self.stack_trace: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.epoch_ms)
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Add entries (anything with a parseable ``timestamp``), keeping time order."""
+        entries = [e for e in entries if isinstance(e, dict)]
+        stamps = timeutil.bulk_epoch_ms([e.get("timestamp") for e in entries])
+        added = [(ms, e) for ms, e in zip(stamps, entries) if ms is not None]
+        if not added:
+            return 0
+        added.sort(key=lambda pair: pair[0])
+        if len(self) and added[0][0] < self.epoch_ms[-1]:
+            # Out-of-order batch: rebuild in one sort rather than insert row by row.
+            rows = sorted(
+                [(self.epoch_ms[i], self._row(i)) for i in range(len(self))] + [
+                    (ms, self._columns(e)) for ms, e in added
+                ],
+                key=lambda pair: pair[0],
+            )
+            self.__init__()
+            for ms, row in rows:
+                self._append(ms, row)
+        else:
+            for ms, entry in added:
+                self._append(ms, self._columns(entry))
+        return len(added)
+
+    @staticmethod
+    def _columns(entry: Dict[str, Any]) -> Tuple:
+        level, code, trace = (entry.get(f) for f in INDEXED_FIELDS)
+        return (
+            json.dumps(entry, default=str),
+            None if level is None else str(level),
+            None if code is None else str(code),
+            None if trace is None else str(trace),
+        )
+
+    def _row(self, i: int) -> Tuple:
+        return self.message[i], self.level[i], self.error_code[i], self.stack_trace[i]
+
+    def _append(self, ms: int, row: Tuple) -> None:
+        self.epoch_ms.append(ms)
+        message, level, code, trace = row
+        self.message.append(message)
+        self.level.append(level)
+        self.error_code.append(code)
+        self.stack_trace.append(trace)
+
+    def window(self, start_ms: int, end_ms: int) -> range:
+        """Row indices with ``start_ms <= timestamp <= end_ms``."""
+        return range(
+            bisect.bisect_left(self.epoch_ms, start_ms), bisect.bisect_right(self.epoch_ms, end_ms)
+        )
+
+    def getter(self, name: str) -> Callable[[int], Any]:
+        """Row index -> value of ``name``, reading a column when there is one."""
+        if name == "@timestamp":
+            return self.epoch_ms.__getitem__
+        if name == "@message":
+            return self.message.__getitem__
+        if name in INDEXED_FIELDS:
+            return getattr(self, name).__getitem__
+        path = name.split(".")
+
+        def lookup(i: int) -> Any:
+            value: Any = json.loads(self.message[i])
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            return value
+
+        return lookup
+
+
+class MetricColumns:
+    """One metric's datapoints as sorted epoch-ms and value columns."""
+
+    __slots__ = ("epoch_ms", "values")
+
+    def __init__(self, datapoints: Iterable[Dict[str, Any]] = ()):
+        points = [p for p in datapoints if isinstance(p, dict) and p.get("value") is not None]
+        stamps = timeutil.bulk_epoch_ms([p.get("timestamp") for p in points])
+        pairs = sorted((ms, float(p["value"])) for ms, p in zip(stamps, points) if ms is not None)
+        self.epoch_ms = array.array("q", (ms for ms, _ in pairs))
+        self.values = array.array("d", (v for _, v in pairs))
+
+    def __len__(self) -> int:
+        return len(self.epoch_ms)
+
+    def window(self, start_ms: int, end_ms: int) -> range:
+        return range(
+            bisect.bisect_left(self.epoch_ms, start_ms), bisect.bisect_right(self.epoch_ms, end_ms)
+        )
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def aggregate(values: List[float], stat: str) -> float:
+    """A GetMetricData statistic (Average, Sum, Minimum, Maximum, SampleCount, pNN)."""
+    if stat == "Average":
+        return sum(values) / len(values)
+    if stat == "Sum":
+        return sum(values)
+    if stat == "Minimum":
+        return min(values)
+    if stat == "Maximum":
+        return max(values)
+    if stat == "SampleCount":
+        return float(len(values))
+    if re.fullmatch(r"p\d+(\.\d+)?", stat):
+        return _percentile(values, float(stat[1:]))
+    raise ValueError(f"Unsupported statistic {stat!r}")
+
+
+# ── Query parsing ──────────────────────────────────────────────────────────────
+
+
+def _split_outside(text: str, separator: str) -> List[str]:
+    """Split on ``separator`` except inside quotes, /regex/ or brackets."""
+    parts, current, quote, depth = [], [], None, 0
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == "\\" and i + 1 < len(text):
+                current.append(text[i : i + 2])
+                i += 2
+                continue
+            if char == quote:
+                quote = None
+        elif char in "'\"/":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif depth == 0 and text.startswith(separator, i):
+            parts.append("".join(current))
+            current = []
+            i += len(separator)
+            continue
+        current.append(char)
+        i += 1
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _literal(token: str) -> Any:
+    token = token.strip()
+    if len(token) >= 2 and token[0] == token[-1] and token[0] in "'\"":
+        return token[1:-1]
+    try:
+        return float(token)
+    except ValueError:
+        raise _malformed(f"Expected a literal, got {token!r}") from None
+
+
+_FIELD = r"(@?[\w.]+)"
+_CONDITIONS = [
+    (re.compile(rf"^{_FIELD}\s+(not\s+)?in\s*\[(.*)\]$", re.S), "in"),
+    (re.compile(rf"^{_FIELD}\s+(not\s+)?like\s+/(.*)/$", re.S), "regex"),
+    (re.compile(rf"^{_FIELD}\s+(not\s+)?like\s+(['\"].*['\"])$", re.S), "substring"),
+    (re.compile(rf"^{_FIELD}\s*(=|!=|<=|>=|<|>)\s*(.+)$", re.S), "compare"),
+]
+_COMPARE = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+@dataclass
+class Condition:
+    field: str
+    test: Callable[[Any], bool]
+
+
+def _condition(text: str) -> Condition:
+    for pattern, kind in _CONDITIONS:
+        match = pattern.match(text.strip())
+        if not match:
+            continue
+        name = match.group(1)
+        if kind == "compare":
+            op, expected = match.group(2), _literal(match.group(3))
+            compare = _COMPARE[op]
+
+            def test(value, compare=compare, expected=expected):
+                if value is None:
+                    return False
+                if isinstance(expected, float):
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        return False
+                else:
+                    value = str(value)
+                return compare(value, expected)
+
+            return Condition(name, test)
+        negate = bool(match.group(2))
+        operand = match.group(3)
+        if kind == "in":
+            wanted = {str(_literal(t)) if t.strip()[0] in "'\"" else t.strip() for t in _split_outside(operand, ",")}
+            test = lambda value: (value is not None and str(value) in wanted) != negate  # noqa: E731
+        elif kind == "regex":
+            regex = re.compile(operand)
+            test = lambda value: (value is not None and regex.search(str(value)) is not None) != negate  # noqa: E731
+        else:
+            needle = _literal(operand)
+            test = lambda value: (value is not None and needle in str(value)) != negate  # noqa: E731
+        return Condition(name, test)
+    raise _malformed(f"Unsupported filter condition {text!r}")
+
+
+@dataclass
+class Stats:
+    function: str  # "count"
+    argument: str  # "*" or a field
+    alias: str
+    by: List[str] = field(default_factory=list)
+
+
+@dataclass
+class InsightsQuery:
+    fields: List[str] = field(default_factory=lambda: ["@timestamp", "@message"])
+    filters: List[Condition] = field(default_factory=list)
+    stats: Optional[Stats] = None
+    sort: List[Tuple[str, bool]] = field(default_factory=list)  # (field, descending)
+    limit: Optional[int] = None
+
+
+_STATS = re.compile(r"^(count)\(\s*(\*|@?[\w.]*)\s*\)(?:\s+as\s+(\w+))?(?:\s+by\s+(.+))?$", re.S)
+_BIN = re.compile(r"^bin\((\d+)([smhd])\)$")
+
+
+def parse_query(text: str) -> InsightsQuery:
+    query = InsightsQuery()
+    for command in _split_outside(text, "|"):
+        verb, _, rest = command.partition(" ")
+        rest = rest.strip()
+        if verb == "fields":
+            query.fields = _split_outside(rest, ",")
+        elif verb == "filter":
+            query.filters.extend(_condition(c) for c in _split_outside(rest, " and "))
+        elif verb == "stats":
+            match = _STATS.match(rest)
+            if not match:
+                raise _malformed(f"Unsupported stats expression {rest!r}")
+            function, argument, alias, by = match.groups()
+            argument = argument or "*"
+            query.stats = Stats(
+                function, argument, alias or f"{function}({argument})", _split_outside(by or "", ",")
+            )
+        elif verb == "sort":
+            for key in _split_outside(rest, ","):
+                name, _, direction = key.partition(" ")
+                if direction.strip() not in ("", "asc", "desc"):
+                    raise _malformed(f"Unsupported sort direction {direction!r}")
+                query.sort.append((name, direction.strip() != "asc"))  # Insights sorts desc by default
+        elif verb == "limit":
+            if not rest.isdigit() or not 0 < int(rest) <= MAX_LIMIT:
+                raise _malformed(f"limit must be 1-{MAX_LIMIT}")
+            query.limit = int(rest)
+        else:
+            raise _malformed(f"Unsupported command {verb!r}")
+    return query
+
+
+# ── Execution ──────────────────────────────────────────────────────────────────
+
+
+def _format(name: str, value: Any) -> str:
+    if name == "@timestamp" and isinstance(value, int):
+        return timeutil.from_epoch_ms(value).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _sort_key(value: Any) -> Tuple:
+    # None sorts last; numbers before strings so mixed columns still order.
+    if value is None:
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, str(value))
+
+
+def run_query(
+    columns: LogColumns, start_ms: int, end_ms: int, query: InsightsQuery, limit: Optional[int] = None
+) -> Tuple[List[List[Dict[str, str]]], Dict[str, float]]:
+    """Rows in GetQueryResults shape, plus the ``statistics`` block."""
+    rows: Sequence[int] = columns.window(start_ms, end_ms)
+    scanned = len(rows)
+    for condition in query.filters:
+        get = columns.getter(condition.field)
+        rows = [i for i in rows if condition.test(get(i))]
+    matched = len(rows)
+    limit = query.limit or limit or DEFAULT_LIMIT
+
+    if query.stats:
+        records = _run_stats(columns, rows, query.stats)
+        for name, descending in reversed(query.sort):
+            records.sort(key=lambda r: _sort_key(r.get(name)), reverse=descending)
+        results = [
+            [{"field": k, "value": _format(k, v)} for k, v in record.items() if v is not None]
+            for record in records[:limit]
+        ]
+    else:
+        rows = list(rows)
+        for name, descending in reversed(query.sort):
+            get = columns.getter(name)
+            rows.sort(key=lambda i: _sort_key(get(i)), reverse=descending)
+        getters = [(name, columns.getter(name)) for name in query.fields]
+        results = []
+        for i in rows[:limit]:
+            row = []
+            for name, get in getters:
+                value = get(i)
+                if value is not None:
+                    row.append({"field": name, "value": _format(name, value)})
+            results.append(row)
+    statistics = {"recordsMatched": float(matched), "recordsScanned": float(scanned)}
+    return results, statistics
+
+
+def _run_stats(columns: LogColumns, rows: Sequence[int], stats: Stats) -> List[Dict[str, Any]]:
+    keys = []
+    for name in stats.by:
+        binned = _BIN.match(name)
+        if binned:
+            width = int(binned.group(1)) * _UNITS_MS[binned.group(2)]
+            keys.append((name, lambda i, w=width: columns.epoch_ms[i] - columns.epoch_ms[i] % w))
+        else:
+            keys.append((name, columns.getter(name)))
+    counted = None if stats.argument == "*" else columns.getter(stats.argument)
+    groups: Dict[Tuple, int] = {}
+    for i in rows:
+        if counted is not None and counted(i) is None:
+            continue
+        group = tuple(get(i) for _, get in keys)
+        groups[group] = groups.get(group, 0) + 1
+    records = []
+    for group, count in groups.items():
+        record: Dict[str, Any] = {}
+        for (name, _), value in zip(keys, group):
+            record[name] = _format("@timestamp", value) if _BIN.match(name) else value
+        record[stats.alias] = count
+        records.append(record)
+    return records
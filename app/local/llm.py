@@ -0,0 +1,116 @@
+"""Deterministic stand-in for the Bedrock models.
+
+``StubLlm`` plays the Commander's tool sequence without a real model:
+parse_alarm → compute_confidence_score → generate_rca_markdown → final text.
+Token usage is estimated at ~4 characters per token so traced runs still
+report plausible LLM token counts; ``latency_ms`` simulates model time.
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+_EVENT_JSON = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+
+
+def _responses(llm_request) -> Dict[str, Any]:
+    found = {}
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.function_response:
+                found[part.function_response.name] = part.function_response.response
+    return found
+
+
+def _first_user_text(llm_request) -> str:
+    for content in llm_request.contents or []:
+        if content.role == "user":
+            for part in content.parts or []:
+                if part.text:
+                    return part.text
+    return ""
+
+
+class StubLlm(BaseLlm):
+    """Scripted Commander model; any other agent just answers with text."""
+
+    latency_ms: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+
+        done = _responses(llm_request)
+        if "parse_alarm" not in llm_request.tools_dict:
+            part = types.Part(text="Stub sub-agent: no findings.")
+        elif "parse_alarm" not in done:
+            match = _EVENT_JSON.search(_first_user_text(llm_request))
+            event = json.loads(match.group(1)) if match else {}
+            part = _call("parse_alarm", {"event": event})
+        elif "compute_confidence_score" not in done:
+            part = _call(
+                "compute_confidence_score",
+                {
+                    "logs_confidence": 0.8,
+                    "metrics_confidence": 0.8,
+                    "deploy_confidence": 0.8,
+                    "has_timestamp_overlap": True,
+                    "has_config_match": True,
+                },
+            )
+        elif "generate_rca_markdown" not in done:
+            incident = done["parse_alarm"]
+            part = _call(
+                "generate_rca_markdown",
+                {
+                    "incident_id": incident.get("incident_id", "INC-UNKNOWN"),
+                    "service": incident.get("service", "unknown"),
+                    "detected_at": incident.get("detected_at", ""),
+                    "root_cause": "Stubbed root cause",
+                    "confidence": done["compute_confidence_score"]["base_confidence"],
+                    "recommended_action": "rollback",
+                    "evidence_chain": ["Stubbed evidence"],
+                },
+            )
+        else:
+            part = types.Part(text=done["generate_rca_markdown"].get("result", ""))
+
+        prompt_chars = sum(
+            len(c.model_dump_json(exclude_none=True)) for c in llm_request.contents or []
+        )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=len(part.model_dump_json(exclude_none=True)) // 4,
+            ),
+        )
+
+
+def _call(name: str, args: Dict[str, Any]) -> types.Part:
+    return types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+
+def install_stub_llm(latency_ms: float = 0.0, scheduled: bool = False) -> List[Any]:
+    """Point the Commander and every sub-agent at a StubLlm. Returns the agents.
+
+    With ``scheduled`` the stubs sit behind the LLM scheduler like the real
+    models, keeping each agent's model id, so replays show queueing under
+    the configured quotas.
+    """
+    from app.agents.commander import commander_agent
+    from app.agents.models import ScheduledLlm
+
+    agents = [commander_agent, *commander_agent.sub_agents]
+    for agent in agents:
+        stub = StubLlm(model=f"stub/{agent.name}", latency_ms=latency_ms)
+        if scheduled and isinstance(agent.model, ScheduledLlm):
+            agent.model = agent.model.model_copy(update={"inner": stub})
+        else:
+            agent.model = stub
+    return agents
@@ -0,0 +1,131 @@
+"""In-memory stand-in for the CloudWatch Logs write API the seeders use.
+
+Covers create_log_group / create_log_stream / describe_log_streams /
+put_log_events with the same request and response shapes as
+``boto3.client("logs")``, and exposes ``exceptions`` the way botocore
+clients do. ``put_log_events`` enforces the service limits: at most 10,000
+events and 1,048,576 bytes per call, counting 26 bytes of overhead per
+event; chronological order; and a 24-hour span per batch. A seeder that
+passes here will not be rejected by the real service. Sequence tokens are
+ignored, as CloudWatch has done since 2023, unless
+``require_sequence_token`` is set.
+"""
+
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+MAX_BATCH_EVENTS = 10_000
+MAX_BATCH_BYTES = 1_048_576
+EVENT_OVERHEAD_BYTES = 26
+MAX_BATCH_SPAN_MS = 24 * 60 * 60 * 1000
+
+
+def _exception(code: str):
+    return type(code, (ClientError,), {})
+
+
+class _Exceptions:
+    ResourceAlreadyExistsException = _exception("ResourceAlreadyExistsException")
+    ResourceNotFoundException = _exception("ResourceNotFoundException")
+    InvalidSequenceTokenException = _exception("InvalidSequenceTokenException")
+    InvalidParameterException = _exception("InvalidParameterException")
+
+
+def _raise(cls, message: str, operation: str, **extra):
+    raise cls({"Error": {"Code": cls.__name__, "Message": message}, **extra}, operation)
+
+
+class LocalLogs:
+    exceptions = _Exceptions
+
+    def __init__(self, latency_ms: float = 0.0, require_sequence_token: bool = False):
+        self.latency_s = latency_ms / 1000.0
+        self.require_sequence_token = require_sequence_token
+        self._lock = threading.Lock()
+        self._groups: set = set()
+        # (group, stream) -> {"events": [...], "token": str}
+        self._streams: Dict[Tuple[str, str], Dict] = {}
+        self._tokens = itertools.count(1)
+        self.calls: Dict[str, int] = {}
+
+    def _call(self, operation: str) -> None:
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def create_log_group(self, logGroupName: str, **kwargs) -> Dict:
+        self._call("CreateLogGroup")
+        with self._lock:
+            if logGroupName in self._groups:
+                _raise(_Exceptions.ResourceAlreadyExistsException, logGroupName, "CreateLogGroup")
+            self._groups.add(logGroupName)
+        return {}
+
+    def create_log_stream(self, logGroupName: str, logStreamName: str, **kwargs) -> Dict:
+        self._call("CreateLogStream")
+        with self._lock:
+            if logGroupName not in self._groups:
+                _raise(_Exceptions.ResourceNotFoundException, logGroupName, "CreateLogStream")
+            key = (logGroupName, logStreamName)
+            if key in self._streams:
+                _raise(_Exceptions.ResourceAlreadyExistsException, logStreamName, "CreateLogStream")
+            self._streams[key] = {"events": [], "token": None}
+        return {}
+
+    def describe_log_streams(
+        self, logGroupName: str, logStreamNamePrefix: str = "", limit: int = 50, **kwargs
+    ) -> Dict:
+        self._call("DescribeLogStreams")
+        with self._lock:
+            streams = [
+                {"logStreamName": stream, "uploadSequenceToken": state["token"], "storedBytes": 0}
+                for (group, stream), state in sorted(self._streams.items())
+                if group == logGroupName and stream.startswith(logStreamNamePrefix)
+            ]
+        return {"logStreams": [{k: v for k, v in s.items() if v is not None} for s in streams[:limit]]}
+
+    def put_log_events(
+        self,
+        logGroupName: str,
+        logStreamName: str,
+        logEvents: List[Dict],
+        sequenceToken: Optional[str] = None,
+        **kwargs,
+    ) -> Dict:
+        self._call("PutLogEvents")
+        invalid = _Exceptions.InvalidParameterException
+        if not logEvents:
+            _raise(invalid, "logEvents must not be empty", "PutLogEvents")
+        if len(logEvents) > MAX_BATCH_EVENTS:
+            _raise(invalid, f"more than {MAX_BATCH_EVENTS} events", "PutLogEvents")
+        size = sum(len(e["message"].encode("utf-8")) + EVENT_OVERHEAD_BYTES for e in logEvents)
+        if size > MAX_BATCH_BYTES:
+            _raise(invalid, f"batch of {size} bytes exceeds {MAX_BATCH_BYTES}", "PutLogEvents")
+        stamps = [e["timestamp"] for e in logEvents]
+        if stamps != sorted(stamps):
+            _raise(invalid, "log events are not in chronological order", "PutLogEvents")
+        if stamps[-1] - stamps[0] > MAX_BATCH_SPAN_MS:
+            _raise(invalid, "batch spans more than 24 hours", "PutLogEvents")
+        with self._lock:
+            state = self._streams.get((logGroupName, logStreamName))
+            if state is None:
+                _raise(_Exceptions.ResourceNotFoundException, logStreamName, "PutLogEvents")
+            if self.require_sequence_token and state["token"] != sequenceToken:
+                _raise(
+                    _Exceptions.InvalidSequenceTokenException,
+                    f"The given sequenceToken is invalid. The next expected sequenceToken is: {state['token']}",
+                    "PutLogEvents",
+                    expectedSequenceToken=state["token"],
+                )
+            state["events"].extend(logEvents)
+            state["token"] = f"{next(self._tokens):056d}"
+            return {"nextSequenceToken": state["token"]}
+
+    def events(self, group: str, stream: str) -> List[Dict]:
+        with self._lock:
+            return list(self._streams.get((group, stream), {}).get("events", []))
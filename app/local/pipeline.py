@@ -0,0 +1,130 @@
+"""Deterministic investigation pipeline — the Commander's phases without an LLM.
+
+Calls the same tools the agents would, in phase order, so a replay can measure
+the tool and AWS cost of an incident independently of model latency:
+
+  DETECT      parse_alarm_event
+  PLAN        investigation windows (-30m / -2h for deploys, +5m)
+  INVESTIGATE analyze_logs, similar past incidents for the alarm and log
+              evidence, query_metrics_and_detect_anomalies,
+              get_deployments + correlate_deploy_to_incident
+  DECIDE      compute_confidence_score
+  REPORT      render_rca (with metric and error-cluster tables), and the
+              evidence appended to the Parquet store when AIC_EVIDENCE_DIR is set
+"""
+
+import datetime
+from typing import Dict
+
+from app.agents.commander import compute_confidence_score
+from app.agents.logs_agent import analyze_logs
+from app.agents.metrics_agent import query_metrics_and_detect_anomalies
+from app.tools import evidence_store, similarity_index, timeutil, tracing
+from app.tools.deploy_correlator import correlate_deploy_to_incident
+from app.tools.parse_alarm import parse_alarm_event
+from app.tools.rca_templates import render_rca
+from app.tools.s3_deployments import get_deployments
+
+# plan.md metric set for a latency / saturation incident
+PIPELINE_METRICS = [
+    "p99_latency_ms",
+    "cpu_utilization_percent",
+    "memory_utilization_percent",
+    "db_connection_pool_active",
+    "db_connection_wait_queue",
+    "error_rate_percent",
+]
+
+
+def _iso(dt: datetime.datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def run_pipeline(event: dict) -> Dict:
+    """Run every phase for one alarm event and return the decision and report."""
+    tracing.enter_phase("DETECT")
+    incident = parse_alarm_event(event)
+    service, incident_id = incident["service"], incident["incident_id"]
+
+    tracing.enter_phase("PLAN")
+    detected = timeutil.parse_iso(incident["detected_at"])
+    window = {
+        "start": _iso(detected - datetime.timedelta(minutes=30)),
+        "end": _iso(detected + datetime.timedelta(minutes=5)),
+        "incident_id": incident_id,
+    }
+
+    tracing.enter_phase("INVESTIGATE")
+    logs = analyze_logs(service, window)
+    similar = similarity_index.similar_incidents(incident, [logs])
+    metrics = query_metrics_and_detect_anomalies(service, PIPELINE_METRICS, window)
+    deployments = get_deployments(
+        service,
+        {"start": _iso(detected - datetime.timedelta(hours=2)), "end": window["end"]},
+        incident_time=incident["detected_at"],
+    )["deployments"]
+    anomaly_start = (
+        min(a["anomaly_start"] for a in metrics["anomalies"])
+        if metrics.get("anomalies")
+        else incident["detected_at"]
+    )
+    error_summary = logs["findings"][0]["error_summary"] if logs["findings"] else {}
+    deploy = correlate_deploy_to_incident(deployments, anomaly_start, list(error_summary))
+
+    tracing.enter_phase("DECIDE")
+    top_deploy = deploy["highest_risk_deploy"] or {}
+    score = compute_confidence_score(
+        logs_confidence=0.9 if logs["findings"] else 0.2,
+        metrics_confidence=min(1.0, 0.3 + 0.15 * metrics.get("count", 0)),
+        deploy_confidence=top_deploy.get("correlation_score", 0.0),
+        has_timestamp_overlap=bool(logs["findings"] and metrics.get("anomalies")),
+        has_config_match=bool(top_deploy.get("config_diff")),
+        failed_agents=int(logs["status"] == "failed") + int("error" in metrics),
+    )
+    confidence = score["base_confidence"]
+    action = "rollback" if confidence >= 0.8 else "escalate"
+
+    tracing.enter_phase("REPORT")
+    report = render_rca(
+        "markdown",
+        incident_id=incident_id,
+        service=service,
+        detected_at=incident["detected_at"],
+        root_cause=top_deploy.get("change_summary") or "Undetermined",
+        confidence=confidence,
+        recommended_action=action,
+        evidence_chain=[
+            logs.get("summary") or "No log errors found",
+            f"{metrics.get('count', 0)} metric anomalies from {anomaly_start}",
+            f"Top deploy: {top_deploy.get('deploy_id', 'none')}",
+        ],
+        logs_summary=logs.get("summary") or "",
+        metric_summaries=metrics.get("anomalies", []),
+        clusters=(
+            {"label": code, **stats} for code, stats in error_summary.items()
+        ),
+    )
+    evidence_store.record_evidence(
+        incident,
+        {
+            "findings": [
+                logs,
+                {"agent": "metrics_agent", "findings": metrics.get("anomalies", [])},
+                {"agent": "deploy_agent", "findings": deploy["correlations"]},
+            ],
+            "decision": score,
+            "action": {
+                "recommended_action": action,
+                "confidence": confidence,
+                "root_cause": top_deploy.get("change_summary"),
+            },
+        },
+    )
+    return {
+        "incident_id": incident_id,
+        "service": service,
+        "confidence": confidence,
+        "recommended_action": action,
+        "similar_incidents": similar,
+        "report": report,
+    }
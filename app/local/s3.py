@@ -0,0 +1,137 @@
+"""In-memory stand-in for the S3 client calls the report generator and deploy reader make.
+
+Covers put_object / get_object / head_object / list_objects_v2 and the
+multipart trio (create / upload_part / complete, plus abort) with the same
+request and response shapes as ``boto3.client("s3")``. Errors are raised as
+botocore ``ClientError``s, including ``304`` for a matching ``IfNoneMatch``
+and ``NoSuchKey``. Enforces the 5 MiB minimum for non-final parts so the
+multipart path is exercised honestly.
+"""
+
+import hashlib
+import itertools
+import threading
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class _Body:
+    """Like botocore's StreamingBody: ``read()`` drains it, ``read(n)`` reads a chunk."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        end = len(self._data) if amt is None else self._pos + amt
+        chunk = self._data[self._pos : end]
+        self._pos += len(chunk)
+        return chunk
+
+
+def _error(code: str, message: str, status: int, operation: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": code, "Message": message}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        operation,
+    )
+
+
+class LocalS3:
+    def __init__(self, min_part_size: int = MIN_PART_SIZE):
+        self.min_part_size = min_part_size
+        self._lock = threading.Lock()
+        self._objects: Dict[tuple, Dict] = {}
+        self._uploads: Dict[str, Dict] = {}
+        self._ids = itertools.count(1)
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, operation: str) -> None:
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", **kwargs) -> Dict:
+        self._count("PutObject")
+        data = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            self._objects[(Bucket, Key)] = {"Body": data, "ETag": etag, **kwargs}
+        return {"ETag": etag}
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: Optional[str] = None, **kwargs) -> Dict:
+        self._count("GetObject")
+        obj = self._get(Bucket, Key)
+        if IfNoneMatch is not None and IfNoneMatch == obj["ETag"]:
+            raise _error("304", "Not Modified", 304, "GetObject")
+        meta = {k: v for k, v in obj.items() if k != "Body"}
+        return {**meta, "Body": _Body(obj["Body"]), "ContentLength": len(obj["Body"])}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        self._count("HeadObject")
+        obj = self._get(Bucket, Key)
+        meta = {k: v for k, v in obj.items() if k != "Body"}
+        return {**meta, "ContentLength": len(obj["Body"])}
+
+    def _get(self, bucket: str, key: str) -> Dict:
+        with self._lock:
+            obj = self._objects.get((bucket, key))
+        if obj is None:
+            raise _error("NoSuchKey", f"s3://{bucket}/{key} does not exist", 404, "GetObject")
+        return obj
+
+    def list_objects_v2(
+        self, Bucket: str, Prefix: str = "", MaxKeys: int = 1000, ContinuationToken: Optional[str] = None, **kwargs
+    ) -> Dict:
+        self._count("ListObjectsV2")
+        with self._lock:
+            keys = sorted(k for b, k in self._objects if b == Bucket and k.startswith(Prefix))
+        if ContinuationToken:
+            keys = [k for k in keys if k > ContinuationToken]
+        page, rest = keys[:MaxKeys], keys[MaxKeys:]
+        response = {
+            "Contents": [
+                {"Key": k, "Size": len(self._objects[(Bucket, k)]["Body"])} for k in page
+            ],
+            "KeyCount": len(page),
+            "IsTruncated": bool(rest),
+        }
+        if rest:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        self._count("CreateMultipartUpload")
+        upload_id = f"upload-{next(self._ids)}"
+        with self._lock:
+            self._uploads[upload_id] = {"Bucket": Bucket, "Key": Key, "parts": {}, "meta": kwargs}
+        return {"UploadId": upload_id, "Bucket": Bucket, "Key": Key}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body, **kwargs) -> Dict:
+        self._count("UploadPart")
+        data = bytes(Body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            self._uploads[UploadId]["parts"][PartNumber] = (data, etag)
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict, **kwargs) -> Dict:
+        self._count("CompleteMultipartUpload")
+        with self._lock:
+            upload = self._uploads.pop(UploadId)
+        listed = MultipartUpload["Parts"]
+        for part in listed[:-1]:
+            if len(upload["parts"][part["PartNumber"]][0]) < self.min_part_size:
+                raise ValueError("EntityTooSmall: non-final part below the minimum size")
+        data = b"".join(upload["parts"][p["PartNumber"]][0] for p in listed)
+        etag = f'"{hashlib.md5(data).hexdigest()}-{len(listed)}"'
+        with self._lock:
+            self._objects[(Bucket, Key)] = {"Body": data, "ETag": etag, **upload["meta"]}
+        return {"Bucket": Bucket, "Key": Key, "ETag": etag}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> Dict:
+        self._count("AbortMultipartUpload")
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
@@ -0,0 +1,69 @@
+"""In-memory stand-in for the SNS client calls the notifier makes.
+
+Covers ``publish`` and ``publish_batch`` with the same request and response
+shapes as ``boto3.client("sns")``. It enforces the 10-entry / unique-Id
+limits of PublishBatch and, for ``MessageStructure="json"``, the rule that
+the message has a ``default`` key. ``failure_rate`` returns part of each
+batch as retryable ``Failed`` entries so the retry path runs.
+"""
+
+import itertools
+import json
+import random
+import threading
+from typing import Dict, List, Optional
+
+MAX_PUBLISH_BATCH = 10
+
+
+class LocalSNS:
+    def __init__(self, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.messages: List[Dict] = []  # delivered, in publish order
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, operation: str) -> None:
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def _deliver(self, topic_arn: str, entry: Dict) -> str:
+        if entry.get("MessageStructure") == "json" and "default" not in json.loads(entry["Message"]):
+            raise ValueError("MessageStructure=json requires a 'default' message")
+        message_id = f"msg-{next(self._ids)}"
+        with self._lock:
+            self.messages.append(
+                {
+                    "TopicArn": topic_arn,
+                    "MessageId": message_id,
+                    "Subject": entry.get("Subject"),
+                    "Message": entry["Message"],
+                    "MessageStructure": entry.get("MessageStructure"),
+                }
+            )
+        return message_id
+
+    def publish(self, TopicArn: str, Message: str, **kwargs) -> Dict:
+        self._count("Publish")
+        return {"MessageId": self._deliver(TopicArn, {"Message": Message, **kwargs})}
+
+    def publish_batch(self, TopicArn: str, PublishBatchRequestEntries: List[Dict]) -> Dict:
+        entries = PublishBatchRequestEntries
+        if len(entries) > MAX_PUBLISH_BATCH:
+            raise ValueError(f"PublishBatch accepts at most {MAX_PUBLISH_BATCH} entries")
+        if len({e["Id"] for e in entries}) != len(entries):
+            raise ValueError("PublishBatch entry Ids must be unique")
+        self._count("PublishBatch")
+        successful, failed = [], []
+        for entry in entries:
+            with self._lock:
+                rejected = self._rng.random() < self.failure_rate
+            if rejected:
+                failed.append(
+                    {"Id": entry["Id"], "Code": "InternalError", "SenderFault": False}
+                )
+                continue
+            successful.append({"Id": entry["Id"], "MessageId": self._deliver(TopicArn, entry)})
+        return {"Successful": successful, "Failed": failed}
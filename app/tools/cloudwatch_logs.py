@@ -1,28 +1,28 @@
 import boto3
+import logging
 import time
 from typing import List, Dict, Optional
 
+from app.tools import deadline, timeutil, tracing
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 1.0
+
 
 def query_logs_insights(
     service: str, time_window: Dict[str, str], filter_pattern: Optional[str] = None
 ) -> List[Dict]:
     """
     Queries CloudWatch Logs Insights for a given service and time window.
-    """
-    logs_client = boto3.client("logs")
 
-    import datetime
+    Polling stops when the incident budget runs out. The query is then
+    cancelled and ``deadline.DeadlineExceeded`` is raised.
+    """
+    logs_client = tracing.instrument_client(boto3.client("logs"))
 
-    start_time = int(
-        datetime.datetime.fromisoformat(
-            time_window["start"].replace("Z", "+00:00")
-        ).timestamp()
-    )
-    end_time = int(
-        datetime.datetime.fromisoformat(
-            time_window["end"].replace("Z", "+00:00")
-        ).timestamp()
-    )
+    start_time = timeutil.datetime_to_ms(timeutil.parse_iso(time_window["start"])) // 1000
+    end_time = timeutil.datetime_to_ms(timeutil.parse_iso(time_window["end"])) // 1000
 
     log_group = f"/bayer/{service}"
 
@@ -45,9 +45,25 @@ def query_logs_insights(
     query_id = start_query_response["queryId"]
 
     response = None
-    while response is None or response["status"] == "Running":
-        time.sleep(1)
-        response = logs_client.get_query_results(queryId=query_id)
+    with tracing.span("logs_insights.poll", kind="wait") as poll_span:
+        polls = 0
+        while response is None or response["status"] == "Running":
+            left = deadline.remaining()
+            if left is not None and left <= 0:
+                if poll_span is not None:
+                    poll_span.attrs["polls"] = polls
+                try:
+                    logs_client.stop_query(queryId=query_id)
+                except Exception as e:  # the query may have just finished
+                    logger.warning("Could not stop Logs Insights query %s: %s", query_id, e)
+                raise deadline.DeadlineExceeded(
+                    f"Logs Insights query on {log_group} still running after {polls} polls"
+                )
+            time.sleep(POLL_INTERVAL_SECONDS if left is None else min(POLL_INTERVAL_SECONDS, left))
+            response = logs_client.get_query_results(queryId=query_id)
+            polls += 1
+        if poll_span is not None:
+            poll_span.attrs["polls"] = polls
 
     results = []
     for result in response.get("results", []):
@@ -1,7 +1,8 @@
 import boto3
-import datetime
 from typing import List, Dict
 
+from app.tools import timeutil, tracing
+
 
 def get_metric_data(
     service: str, metric_names: List[str], time_window: Dict[str, str]
@@ -9,14 +10,10 @@ def get_metric_data(
     """
     Fetches metric data from CloudWatch for a given service and time window.
     """
-    cw = boto3.client("cloudwatch")
+    cw = tracing.instrument_client(boto3.client("cloudwatch"))
 
-    start_time = datetime.datetime.fromisoformat(
-        time_window["start"].replace("Z", "+00:00")
-    )
-    end_time = datetime.datetime.fromisoformat(
-        time_window["end"].replace("Z", "+00:00")
-    )
+    start_time = timeutil.parse_iso(time_window["start"])
+    end_time = timeutil.parse_iso(time_window["end"])
 
     # Match plan.md: Bayer/CheckoutService, Bayer/PaymentService
     namespace_service = "".join(word.capitalize() for word in service.split("-"))
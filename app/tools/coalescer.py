@@ -0,0 +1,264 @@
+"""Coalesces duplicate alarms into a single in-flight investigation.
+
+During an alarm storm CloudWatch fires several alarms for the same service
+within seconds. Each alarm is keyed on service + metric + time bucket (derived
+from ``parse_alarm_event``); the first alarm for a key leads the investigation,
+later ones attach to it and return the leader's result instead of repeating
+the same Logs Insights queries and LLM calls.
+
+Two backends share one interface:
+  InMemoryCoalesceBackend — process-local, also the stand-in used by tests;
+                            finished leases are dropped once they expire
+  DynamoDBCoalesceBackend — lease items in the incident state table, shared
+                            across Lambda containers. The published result is
+                            capped at ``MAX_RESULT_BYTES`` to fit DynamoDB's
+                            400 KB item limit (see ``lease_result``)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.types import Binary
+from botocore.exceptions import ClientError
+
+from app.tools import timeutil, tracing
+from app.tools.serialization import pack, unpack
+
+logger = logging.getLogger(__name__)
+
+COALESCE_ENABLED = os.getenv("AIC_COALESCE", "1") == "1"
+COALESCE_WINDOW_SECONDS = int(os.getenv("AIC_COALESCE_WINDOW_SECONDS", "300"))
+COALESCE_WAIT_SECONDS = float(os.getenv("AIC_COALESCE_WAIT_SECONDS", "840"))
+COALESCE_POLL_SECONDS = 2.0
+# DynamoDB items max out at 400 KB; leave room for the rest of the lease item.
+MAX_RESULT_BYTES = 300_000
+
+
+def coalesce_key(incident: Dict, window_seconds: int = COALESCE_WINDOW_SECONDS) -> str:
+    """Build the dedup key ``service#metric#bucket`` for a parsed alarm."""
+    detected_at = incident.get("detected_at") or ""
+    try:
+        epoch = timeutil.datetime_to_ms(timeutil.parse_iso(detected_at)) // 1000
+    except ValueError:
+        epoch = int(time.time())
+    bucket = epoch // window_seconds
+    return f"{incident.get('service', '')}#{incident.get('metric_name', '')}#{bucket}"
+
+
+def lease_result(result: Dict, limit: int = MAX_RESULT_BYTES) -> bytes:
+    """Pack ``result`` for the lease item, cut down to ``limit`` bytes if needed.
+
+    The full report is in S3 (``report_url``), so duplicates can do with a
+    reference: the trace goes first, then the response text is truncated
+    (``response_truncated``), and as a last resort only the ids and the
+    report URL are kept.
+    """
+    packed = pack(result)
+    if len(packed) <= limit:
+        return packed
+    slim = {k: v for k, v in result.items() if k != "trace"}
+    packed = pack(slim)
+    text = str(slim.get("response") or "")
+    while len(packed) > limit and text:
+        text = text[: max(0, len(text) * limit // len(packed) - 1024)]
+        slim.update(response=text, response_truncated=True)
+        packed = pack(slim)
+    if len(packed) > limit:
+        pointer = {k: slim[k] for k in ("session_id", "report_url") if k in slim}
+        packed = pack({**pointer, "response": "", "response_truncated": True})
+    logger.warning("Coalesced result trimmed to %d bytes for the lease item", len(packed))
+    return packed
+
+
+class InMemoryCoalesceBackend:
+    """Thread-safe, process-local coalescing state."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def try_acquire(self, key: str, owner: str, ttl_seconds: float) -> Optional[str]:
+        """Take the lease for ``key``. Returns None if acquired, else the leader's id."""
+        now = time.time()
+        with self._cond:
+            # Finished leases are only kept for late duplicates until they expire.
+            expired = [
+                k
+                for k, e in self._entries.items()
+                if e["result"] is not None and e["expires_at"] <= now
+            ]
+            for k in expired:
+                del self._entries[k]
+            entry = self._entries.get(key)
+            if entry and entry["expires_at"] > now:
+                return entry["owner"]
+            self._entries[key] = {
+                "owner": owner,
+                "expires_at": now + ttl_seconds,
+                "attached": [],
+                "result": None,
+            }
+            return None
+
+    def attach(self, key: str, alarm_id: str) -> None:
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["attached"].append(alarm_id)
+
+    def attached(self, key: str) -> List[str]:
+        with self._cond:
+            entry = self._entries.get(key)
+            return list(entry["attached"]) if entry else []
+
+    def publish(self, key: str, result: Dict) -> None:
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["result"] = result
+            self._cond.notify_all()
+
+    def release(self, key: str) -> None:
+        with self._cond:
+            self._entries.pop(key, None)
+            self._cond.notify_all()
+
+    def wait(self, key: str, timeout: float) -> Optional[Dict]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                entry = self._entries.get(key)
+                if entry is None or entry["result"] is not None:
+                    return entry["result"] if entry else None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+
+class DynamoDBCoalesceBackend:
+    """Lease items (``PK=COALESCE#<key>``) in the incident state table."""
+
+    def __init__(self, table_name: str, dynamodb=None):
+        self._table = (dynamodb or boto3.resource("dynamodb")).Table(table_name)
+
+    @staticmethod
+    def _pk(key: str) -> Dict[str, str]:
+        return {"PK": f"COALESCE#{key}", "SK": "LEASE"}
+
+    def try_acquire(self, key: str, owner: str, ttl_seconds: float) -> Optional[str]:
+        now = int(time.time())
+        try:
+            self._table.put_item(
+                Item={
+                    **self._pk(key),
+                    "owner": owner,
+                    "expires_at": now + int(ttl_seconds),
+                    "attached": [],
+                },
+                ConditionExpression="attribute_not_exists(PK) OR expires_at < :now",
+                ExpressionAttributeValues={":now": now},
+            )
+            return None
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+        item = self._table.get_item(Key=self._pk(key), ConsistentRead=True).get("Item")
+        return item["owner"] if item else owner
+
+    def attach(self, key: str, alarm_id: str) -> None:
+        self._table.update_item(
+            Key=self._pk(key),
+            UpdateExpression="SET attached = list_append(attached, :a)",
+            ExpressionAttributeValues={":a": [alarm_id]},
+        )
+
+    def attached(self, key: str) -> List[str]:
+        item = self._table.get_item(Key=self._pk(key), ConsistentRead=True).get("Item")
+        return list(item.get("attached", [])) if item else []
+
+    def publish(self, key: str, result: Dict) -> None:
+        self._table.update_item(
+            Key=self._pk(key),
+            UpdateExpression="SET #r = :r",
+            ExpressionAttributeNames={"#r": "result"},
+            ExpressionAttributeValues={":r": Binary(lease_result(result))},
+        )
+
+    def release(self, key: str) -> None:
+        self._table.delete_item(Key=self._pk(key))
+
+    def wait(self, key: str, timeout: float) -> Optional[Dict]:
+        deadline = time.monotonic() + timeout
+        while True:
+            item = self._table.get_item(Key=self._pk(key), ConsistentRead=True).get("Item")
+            if item is None:
+                return None
+            raw = item.get("result")
+            if raw:
+                # Older leases stored the result as a JSON string.
+                return json.loads(raw) if isinstance(raw, str) else unpack(raw.value)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(COALESCE_POLL_SECONDS)
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def default_backend():
+    """DynamoDB when ``STATE_TABLE_NAME`` is set, otherwise process-local."""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            table_name = os.getenv("STATE_TABLE_NAME")
+            _default_backend = (
+                DynamoDBCoalesceBackend(table_name)
+                if table_name
+                else InMemoryCoalesceBackend()
+            )
+        return _default_backend
+
+
+def run_coalesced(
+    incident: Dict,
+    run: Callable[[], Dict],
+    backend=None,
+    window_seconds: int = COALESCE_WINDOW_SECONDS,
+    wait_seconds: float = COALESCE_WAIT_SECONDS,
+) -> Dict:
+    """Run ``run()`` once per coalesce key; duplicates get the leader's result.
+
+    The lease lives for two windows so late duplicates in the same bucket still
+    find the finished result. If the leader fails the lease is released and
+    waiting duplicates get ``status: "leader_failed"``.
+    """
+    backend = backend or default_backend()
+    key = coalesce_key(incident, window_seconds)
+    incident_id = incident["incident_id"]
+
+    leader = backend.try_acquire(key, incident_id, ttl_seconds=2 * window_seconds)
+    if leader is None:
+        try:
+            result = run()
+        except Exception:
+            backend.release(key)
+            raise
+        result = {**result, "coalesced_alarms": backend.attached(key)}
+        backend.publish(key, result)
+        return result
+
+    logger.info("Alarm %s coalesced into in-flight investigation %s", incident_id, leader)
+    backend.attach(key, incident_id)
+    with tracing.span("coalesce.wait", kind="wait", leader=leader):
+        result = backend.wait(key, wait_seconds)
+    if result is None:
+        status = "in_progress" if backend.attached(key) else "leader_failed"
+        return {"coalesced_with": leader, "coalesce_key": key, "status": status}
+    return {**result, "coalesced_with": leader, "coalesce_key": key}
@@ -0,0 +1,301 @@
+"""Per-incident time budgets, split across phases and handed down to agents and tools.
+
+The Lambda has 15 minutes per invocation (plan.md), and one hung Logs
+Insights query or one slow sub-agent must not use them all. The handler
+opens an ``incident_budget``, and every phase may run until its cumulative
+share of it (``PHASE_SHARES``) has passed:
+
+  DETECT 5% → PLAN 10% → INVESTIGATE 55% → DECIDE 10% → REPORT 20%
+
+Time a phase does not use passes on to the next. Inside INVESTIGATE, each
+sub-agent gets an even share of what is left when it starts: the
+INVESTIGATE time remaining, divided by the sub-agents not yet run. Once a
+sub-agent's slice expires, the ADK callbacks below stop it:
+
+  tool_started    skips the tool and answers with a ``failed`` envelope
+  tool_failed     answers with a ``failed`` envelope when the tool itself
+                  raised ``DeadlineExceeded`` part way through
+  model_started   ends the sub-agent with a ``failed`` envelope as its text
+
+The envelopes are built with ``build_response_envelope``. So the Commander
+sees a failed agent, the same as one that crashed, and
+``compute_confidence_score(failed_agents=...)`` covers the gap. Once
+INVESTIGATE is over, the Commander is told to decide on the evidence it
+has. Once the whole budget is spent, it is told to write the report now.
+Both notes go at the end of the conversation for that turn only, after the
+prompt cache point. The callbacks only act between calls, so a model call that
+hangs would still run on into the Lambda timeout. ``until_hard_stop`` cuts the
+Commander's event stream off ``GRACE_SECONDS`` after the budget ends, still
+inside ``RESERVE_SECONDS``.
+
+Long-running tools call ``remaining()`` or ``check()`` to stop themselves
+in time. Without an active budget (tests, local scripts), every entry
+point is a no-op.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.tools.envelope import agent_start_time, build_response_envelope, mark_reported
+
+logger = logging.getLogger(__name__)
+
+INCIDENT_BUDGET_SECONDS = float(os.getenv("AIC_INCIDENT_BUDGET_SECONDS", "780"))
+# Left over after the budget for report upload, notification and state flush.
+RESERVE_SECONDS = 60.0
+# Of the reserve, how long the Commander may run past the budget to write the
+# report it was told to write; the rest stays for upload and flush.
+GRACE_SECONDS = 30.0
+
+PHASE_SHARES = {"DETECT": 0.05, "PLAN": 0.10, "INVESTIGATE": 0.55, "DECIDE": 0.10, "REPORT": 0.20}
+SUB_AGENTS = ("logs_agent", "metrics_agent", "deploy_agent")
+# Request label counting the per-turn notes appended to the conversation.
+STEERING_LABEL = "aic_steering_messages"
+
+_WRAP_UP = (
+    "The investigation time budget is spent. Do not transfer to any more sub-agents. "
+    "Go straight to DECIDE with the evidence you have, and count every sub-agent "
+    "that has not reported as a failed agent."
+)
+_REPORT_NOW = (
+    "The incident time budget is exhausted. Call `generate_rca_markdown` now with the "
+    "evidence you have, and recommend escalate unless the evidence is conclusive."
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A tool or agent ran past its slice of the incident budget."""
+
+
+class Budget:
+    """Deadlines for one incident, on the monotonic clock."""
+
+    def __init__(self, incident_id: str, seconds: float):
+        self.incident_id = incident_id
+        self.seconds = seconds
+        self.start = time.monotonic()
+        self.end = self.start + seconds
+        self._phase_ends: Dict[str, float] = {}
+        elapsed = 0.0
+        for phase, share in PHASE_SHARES.items():
+            elapsed += share
+            self._phase_ends[phase] = self.start + seconds * elapsed
+        self._agent_ends: Dict[str, float] = {}
+        self._active_agent: Optional[str] = None
+        self._failures: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return time.monotonic() >= self.end
+
+    @property
+    def hard_stop(self) -> float:
+        """When the run is cut off even mid-call: the budget end plus ``GRACE_SECONDS``."""
+        return self.end + GRACE_SECONDS
+
+    def phase_end(self, phase: str) -> float:
+        return self._phase_ends[phase]
+
+    def start_agent(self, agent: str) -> float:
+        """Give ``agent`` its slice of what is left of INVESTIGATE; returns its deadline."""
+        now = time.monotonic()
+        with self._lock:
+            waiting = [a for a in SUB_AGENTS if a not in self._agent_ends and a != agent]
+            left = max(0.0, self._phase_ends["INVESTIGATE"] - now)
+            end = now + left / (len(waiting) + 1)
+            self._agent_ends[agent] = end
+            self._active_agent = agent
+        return end
+
+    def finish_agent(self, agent: str) -> None:
+        with self._lock:
+            if self._active_agent == agent:
+                self._active_agent = None
+
+    def deadline(self, agent: Optional[str] = None) -> float:
+        """When ``agent`` (default: the running sub-agent, else the incident) must stop."""
+        agent = agent or self._active_agent
+        end = self.end
+        if agent in self._agent_ends:
+            end = min(end, self._agent_ends[agent])
+        return end
+
+    def remaining(self, agent: Optional[str] = None) -> float:
+        return self.deadline(agent) - time.monotonic()
+
+    def record_failure(self, envelope: Dict[str, Any]) -> None:
+        with self._lock:
+            self._failures.append(envelope)
+
+    def drain_failures(self) -> List[Dict[str, Any]]:
+        """Failed envelopes that ended a sub-agent, since the last call."""
+        with self._lock:
+            failures, self._failures = self._failures, []
+        return failures
+
+
+_current_budget: contextvars.ContextVar[Optional[Budget]] = contextvars.ContextVar(
+    "aic_budget", default=None
+)
+
+
+def current_budget() -> Optional[Budget]:
+    return _current_budget.get()
+
+
+def budget_seconds(context: Any = None) -> float:
+    """The incident budget: ``AIC_INCIDENT_BUDGET_SECONDS``, capped by the Lambda's time left."""
+    seconds = INCIDENT_BUDGET_SECONDS
+    remaining_ms = getattr(context, "get_remaining_time_in_millis", None)
+    if callable(remaining_ms):
+        seconds = min(seconds, remaining_ms() / 1000.0 - RESERVE_SECONDS)
+    return max(0.0, seconds)
+
+
+@contextlib.contextmanager
+def incident_budget(incident_id: str, seconds: Optional[float] = None):
+    """Make a Budget current for one incident run. Yields the Budget."""
+    budget = Budget(incident_id, INCIDENT_BUDGET_SECONDS if seconds is None else seconds)
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+async def until_hard_stop(events: AsyncIterator, budget: Budget) -> AsyncIterator:
+    """Yield from ``events`` until ``budget.hard_stop``, then cancel and close it.
+
+    Only the wait for the next event is timed, never the caller's work between
+    events.
+    """
+    try:
+        while True:
+            try:
+                async with asyncio.timeout(max(0.0, budget.hard_stop - time.monotonic())):
+                    event = await anext(events)
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                logger.warning(
+                    "Incident %s still running %.0fs past its budget; stopping it",
+                    budget.incident_id,
+                    GRACE_SECONDS,
+                )
+                return
+            yield event
+    finally:
+        await events.aclose()
+
+
+def remaining() -> Optional[float]:
+    """Seconds the running tool has left, or None when there is no budget."""
+    budget = _current_budget.get()
+    return None if budget is None else budget.remaining()
+
+
+def check(what: str) -> None:
+    """Raise DeadlineExceeded if the running tool's slice has already expired."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"{what}: time budget exhausted ({-left:.1f}s over)")
+
+
+def _failed_envelope(budget: Budget, agent: str, tool_context, error: str) -> Dict[str, Any]:
+    return build_response_envelope(
+        agent_name=agent,
+        incident_id=budget.incident_id,
+        findings=[],
+        start_time=agent_start_time(tool_context, agent),
+        error=error,
+    )
+
+
+# ── ADK agent callbacks ────────────────────────────────────────────────────────
+
+
+def agent_started(callback_context):
+    budget = _current_budget.get()
+    if budget is not None and callback_context.agent_name in SUB_AGENTS:
+        end = budget.start_agent(callback_context.agent_name)
+        logger.info(
+            "%s has %.0fs of the incident budget", callback_context.agent_name, end - time.monotonic()
+        )
+    return None
+
+
+def agent_finished(callback_context):
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.finish_agent(callback_context.agent_name)
+    return None
+
+
+def model_started(callback_context, llm_request):
+    """Stop a sub-agent whose slice has expired; steer the Commander to wrap up."""
+    budget = _current_budget.get()
+    if budget is None:
+        return None
+    agent = callback_context.agent_name
+    now = time.monotonic()
+    if agent in SUB_AGENTS:
+        if budget.remaining(agent) > 0:
+            return None
+        # Imported here so the tools package does not need ADK.
+        from google.adk.models.llm_response import LlmResponse
+        from google.genai import types
+
+        envelope = _failed_envelope(
+            budget, agent, callback_context, f"{agent} stopped: its time budget expired"
+        )
+        # A tool response reaches the handler as a finding; this text does not.
+        budget.record_failure(envelope)
+        mark_reported(callback_context)
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(envelope))])
+        )
+    if now >= budget.end:
+        _steer(llm_request, _REPORT_NOW)
+    elif now >= budget.phase_end("INVESTIGATE"):
+        _steer(llm_request, _WRAP_UP)
+    return None
+
+
+def _steer(llm_request, text: str) -> None:
+    # Appended to the conversation, not the system prompt, which stays
+    # identical across turns so the prompt cache can serve it. The note is
+    # for this turn only, so it is counted under STEERING_LABEL and
+    # agents.models keeps the cache point on the last persisted message.
+    from google.genai import types
+
+    llm_request.contents.append(types.Content(role="user", parts=[types.Part(text=text)]))
+    labels = llm_request.config.labels = dict(llm_request.config.labels or {})
+    labels[STEERING_LABEL] = str(int(labels.get(STEERING_LABEL, "0")) + 1)
+
+
+def tool_started(tool, args, tool_context):
+    """Skip a sub-agent tool when the agent's slice has expired."""
+    budget = _current_budget.get()
+    agent = tool_context.agent_name
+    if budget is None or agent not in SUB_AGENTS or budget.remaining(agent) > 0:
+        return None
+    return _failed_envelope(
+        budget, agent, tool_context, f"{tool.name} skipped: {agent}'s time budget expired"
+    )
+
+
+def tool_failed(tool, args, tool_context, error):
+    """on_tool_error_callback: a tool that ran out of time mid-call fails its agent."""
+    budget = _current_budget.get()
+    agent = tool_context.agent_name
+    if budget is None or agent not in SUB_AGENTS or not isinstance(error, DeadlineExceeded):
+        return None
+    return _failed_envelope(budget, agent, tool_context, f"{tool.name} stopped: {error}")
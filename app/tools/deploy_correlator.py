@@ -1,6 +1,7 @@
-import datetime
 from typing import Dict, List
 
+from app.tools import timeutil
+
 
 def correlate_deploy_to_incident(
     deployments: List[Dict], anomaly_start: str, error_keywords: List[str] = None
@@ -11,9 +12,7 @@ def correlate_deploy_to_incident(
     if not deployments:
         return {"highest_risk_deploy": None, "correlations": []}
 
-    incident_time = datetime.datetime.fromisoformat(
-        anomaly_start.replace("Z", "+00:00")
-    )
+    incident_ms = timeutil.datetime_to_ms(timeutil.parse_iso(anomaly_start))
     correlations = []
 
     # Common risky keywords defined in plan.md
@@ -30,12 +29,10 @@ def correlate_deploy_to_incident(
         risk_keywords.extend([k.lower() for k in error_keywords])
 
     for d in deployments:
-        deploy_time = datetime.datetime.fromisoformat(
-            d["timestamp"].replace("Z", "+00:00")
-        )
+        deploy_ms = timeutil.datetime_to_ms(timeutil.parse_iso(d["timestamp"]))
 
         # 1. Proximity Scoring (Plan.md: 0-0.3)
-        time_diff = (incident_time - deploy_time).total_seconds() / 60
+        time_diff = (incident_ms - deploy_ms) / 60000
         proximity_score = 0.0
         if 0 <= time_diff <= 15:
             proximity_score = 0.3
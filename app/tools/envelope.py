@@ -1,5 +1,125 @@
 import datetime
 
+from app.tools import llm_scheduler
+
+AGENT_STARTED_AT_KEY = "{agent}_started_at"
+# What the agent's analysis tool found, for emit_envelope.
+AGENT_EVIDENCE_KEY = "{agent}_evidence"
+# Set once a response envelope for the current run has reached the handler.
+AGENT_REPORTED_KEY = "{agent}_reported"
+# The envelope emit_envelope built; the handler reads it from the state delta.
+AGENT_ENVELOPE_KEY = "{agent}_envelope"
+_ENVELOPE_SUFFIX = AGENT_ENVELOPE_KEY.format(agent="")
+
+
+def record_agent_start(callback_context):
+    """before_agent_callback: remember when a sub-agent began its investigation."""
+    agent = callback_context.agent_name
+    state = callback_context.state
+    state[AGENT_STARTED_AT_KEY.format(agent=agent)] = datetime.datetime.now(
+        datetime.timezone.utc
+    ).isoformat()
+    # Forget the previous run's evidence if the Commander delegates again.
+    if state.get(AGENT_EVIDENCE_KEY.format(agent=agent)) is not None:
+        state[AGENT_EVIDENCE_KEY.format(agent=agent)] = None
+    if state.get(AGENT_REPORTED_KEY.format(agent=agent)):
+        state[AGENT_REPORTED_KEY.format(agent=agent)] = False
+    return None
+
+
+def mark_reported(callback_context) -> None:
+    """Note that this run's envelope already went out (a tool returned it, or the deadline stopped the agent)."""
+    callback_context.state[AGENT_REPORTED_KEY.format(agent=callback_context.agent_name)] = True
+
+
+def incident_id_for(time_window: dict = None) -> str:
+    """The running incident's id, from the handler's incident context.
+
+    Falls back to the ``incident_id`` the model put in ``time_window``
+    (direct tool calls in tests and scripts), then to ``INC-UNKNOWN``.
+    """
+    return (
+        llm_scheduler.current_incident()
+        or (time_window or {}).get("incident_id")
+        or "INC-UNKNOWN"
+    )
+
+
+def collect_findings(tool_name: str, field: str):
+    """after_tool_callback: keep ``tool_response[field]`` from ``tool_name`` as the agent's findings.
+
+    A tool that answers with an ``error`` is kept as the error instead. A
+    tool that answers with a full envelope (a skipped tool, see deadline)
+    has already been reported.
+    """
+
+    def collect(tool, args, tool_context, tool_response):
+        if not isinstance(tool_response, dict):
+            return None
+        if "agent" in tool_response and "status" in tool_response:
+            mark_reported(tool_context)
+            return None
+        if tool.name != tool_name:
+            return None
+        evidence = {"incident_id": incident_id_for((args or {}).get("time_window"))}
+        if tool_response.get("error"):
+            evidence["error"] = str(tool_response["error"])
+        else:
+            evidence["findings"] = list(tool_response.get(field) or [])
+        tool_context.state[AGENT_EVIDENCE_KEY.format(agent=tool_context.agent_name)] = evidence
+        return None
+
+    return collect
+
+
+def emit_envelope(output_key: str):
+    """after_agent_callback: build the agent's envelope from its findings and final text.
+
+    The findings come from ``collect_findings``, and the summary is the
+    agent's final answer (``output_key``), so reporting takes no tool call
+    and no extra model turn. An agent that ends without evidence reports as
+    failed.
+    """
+
+    def emit(callback_context):
+        agent = callback_context.agent_name
+        state = callback_context.state
+        if state.get(AGENT_REPORTED_KEY.format(agent=agent)):
+            return None
+        evidence = state.get(AGENT_EVIDENCE_KEY.format(agent=agent))
+        summary = state.get(output_key)
+        envelope = build_response_envelope(
+            agent_name=agent,
+            incident_id=(evidence or {}).get("incident_id") or incident_id_for(),
+            findings=(evidence or {}).get("findings") or [],
+            start_time=agent_start_time(callback_context, agent),
+            error=(evidence or {}).get("error")
+            or (None if evidence else f"{agent} finished without running its analysis"),
+            summary=summary.strip() if isinstance(summary, str) and summary.strip() else None,
+        )
+        state[AGENT_ENVELOPE_KEY.format(agent=agent)] = envelope
+        state[AGENT_REPORTED_KEY.format(agent=agent)] = True
+        return None
+
+    return emit
+
+
+def emitted_envelopes(event) -> list:
+    """Envelopes ``emit_envelope`` put in this event's state delta."""
+    actions = getattr(event, "actions", None)
+    delta = (actions.state_delta if actions is not None else None) or {}
+    return [v for k, v in delta.items() if k.endswith(_ENVELOPE_SUFFIX) and isinstance(v, dict)]
+
+
+def agent_start_time(tool_context, agent_name: str) -> datetime.datetime:
+    """Start of the agent's current run, or now if it was not recorded."""
+    started_at = None
+    if tool_context is not None:
+        started_at = tool_context.state.get(AGENT_STARTED_AT_KEY.format(agent=agent_name))
+    if started_at:
+        return datetime.datetime.fromisoformat(started_at)
+    return datetime.datetime.now(datetime.timezone.utc)
+
 
 def build_response_envelope(
     agent_name: str,
@@ -0,0 +1,393 @@
+"""Local analytical store for incident evidence — Parquet, partitioned by service/date.
+
+Every finished investigation appends its evidence under ``AIC_EVIDENCE_DIR``:
+  incidents/service=<svc>/date=<YYYY-MM-DD>/<incident_id>.parquet
+      one row: alarm, error codes and counts, stack root frames, anomalous
+      metrics, top deploy, decision and recommended action
+  metrics/service=<svc>/date=<YYYY-MM-DD>/<incident_id>.parquet
+      one row per datapoint of the anomalous series the agents looked at
+  deployments/service=<svc>/date=<YYYY-MM-DD>/<incident_id>.parquet
+      one row per correlated deploy, with its score and matched keywords
+
+One file per incident makes appends lock-free, and a re-run replaces its
+own file. Reads go through ``pyarrow.dataset`` over a memory-mapped local
+filesystem. The service/date partitions are pruned before any file is
+opened, so repeat-incident lookup and confidence calibration are columnar
+scans rather than fresh CloudWatch queries.
+
+Disabled (every call is a no-op) unless ``AIC_EVIDENCE_DIR`` is set and
+pyarrow is installed.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.tools import timeutil
+from app.tools.deploy_correlator import correlate_deploy_to_incident
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+EVIDENCE_DIR = os.getenv("AIC_EVIDENCE_DIR")
+TABLES = ("incidents", "metrics", "deployments")
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    ts = pa.timestamp("ms", tz="UTC")
+    return {
+        "incidents": pa.schema(
+            [
+                ("incident_id", pa.string()),
+                ("detected_at", ts),
+                ("alarm_name", pa.string()),
+                ("metric_name", pa.string()),
+                ("error_codes", pa.list_(pa.string())),
+                ("error_counts", pa.list_(pa.int64())),
+                ("log_matches", pa.int64()),
+                ("log_summary", pa.string()),
+                ("stack_frames", pa.list_(pa.string())),
+                ("anomalous_metrics", pa.list_(pa.string())),
+                ("top_deploy_id", pa.string()),
+                ("top_deploy_score", pa.float64()),
+                ("deploy_keywords", pa.list_(pa.string())),
+                ("root_cause", pa.string()),
+                ("recommended_action", pa.string()),
+                ("confidence", pa.float64()),
+                ("decision", pa.string()),  # the full decision as JSON
+            ]
+        ),
+        "metrics": pa.schema(
+            [
+                ("incident_id", pa.string()),
+                ("metric_name", pa.string()),
+                ("timestamp", ts),
+                ("value", pa.float64()),
+                ("anomalous", pa.bool_()),
+            ]
+        ),
+        "deployments": pa.schema(
+            [
+                ("incident_id", pa.string()),
+                ("deploy_id", pa.string()),
+                ("deploy_service", pa.string()),
+                ("timestamp", ts),
+                ("correlation_score", pa.float64()),
+                ("minutes_before_incident", pa.float64()),
+                ("matched_keywords", pa.list_(pa.string())),
+                ("message", pa.string()),
+                ("has_config_diff", pa.bool_()),
+            ]
+        ),
+    }
+
+
+def _partitioning() -> "ds.Partitioning":
+    return ds.partitioning(pa.schema([("service", pa.string()), ("date", pa.string())]), flavor="hive")
+
+
+def _envelopes(evidence: Dict[str, Any], agent: str) -> List[Dict]:
+    return [e for e in evidence.get("findings") or [] if e.get("agent") == agent]
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _scored(deploys: List[Dict], anomaly_starts: List[Any], error_codes: List[str]) -> List[Dict]:
+    """Deploy findings, with correlation scores added where they are missing.
+
+    The deploy agent reports raw ``get_deployments`` rows: risk_flag and
+    minutes_before_incident, but no score or matched keywords. Those are
+    scored here the way the pipeline does, against the earliest anomaly start.
+    """
+    raw = [d for d in deploys if d.get("correlation_score") is None and d.get("timestamp")]
+    starts = [s for s in anomaly_starts if timeutil.to_epoch_ms(s) is not None]
+    if not raw or not starts:
+        return deploys
+    correlated = correlate_deploy_to_incident(
+        [{**d, "message": d.get("message") or d.get("change_summary") or ""} for d in raw],
+        min(starts, key=timeutil.to_epoch_ms),
+        error_codes,
+    )["correlations"]
+    # Only the score and keywords are taken: minutes_before_incident stays
+    # measured from the incident time, as get_deployments reported it.
+    scores = {
+        c["deploy_id"]: {"correlation_score": c["correlation_score"], "matched_keywords": c["matched_keywords"]}
+        for c in correlated
+    }
+    return [{**d, **scores[d["deploy_id"]]} if d in raw else d for d in deploys]
+
+
+def evidence_rows(incident: Dict[str, Any], evidence: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    """Flatten the handler's evidence bundle into rows for each table.
+
+    ``evidence`` is what the handler collects: ``findings`` (response
+    envelopes from the sub-agents), ``decision`` (compute_confidence_score)
+    and ``action`` (the recommended action and root cause).
+    """
+    incident_id = incident["incident_id"]
+    detected_ms = timeutil.to_epoch_ms(incident.get("detected_at"))
+    action = evidence.get("action") or {}
+    decision = evidence.get("decision") or {}
+
+    error_counts: Dict[str, int] = {}
+    stack_frames: Dict[str, None] = {}  # ordered set
+    log_matches, log_summary = 0, None
+    for envelope in _envelopes(evidence, "logs_agent"):
+        log_summary = envelope.get("summary") or log_summary
+        for finding in envelope.get("findings") or []:
+            log_matches += int(finding.get("matched_entries") or 0)
+            for code, stats in (finding.get("error_summary") or {}).items():
+                error_counts[code] = error_counts.get(code, 0) + int((stats or {}).get("count") or 0)
+            for entry in finding.get("sample_entries") or []:
+                frame = ((entry.get("parsed_stack_trace") or {}).get("root_frame") or {}).get("full_path")
+                if frame:
+                    stack_frames[frame] = None
+
+    metric_rows, anomalous, anomaly_starts = [], [], []
+    for envelope in _envelopes(evidence, "metrics_agent"):
+        for anomaly in envelope.get("findings") or []:
+            name = anomaly.get("metric_name") if isinstance(anomaly, dict) else None
+            if not name:
+                continue
+            anomalous.append(name)
+            anomaly_starts.append(anomaly.get("anomaly_start"))
+            start_ms = timeutil.to_epoch_ms(anomaly.get("anomaly_start"))
+            for point in anomaly.get("raw_datapoints") or []:
+                at_ms = timeutil.to_epoch_ms(point.get("timestamp"))
+                value = _float(point.get("value"))
+                if at_ms is None or value is None:
+                    continue
+                metric_rows.append(
+                    {
+                        "incident_id": incident_id,
+                        "metric_name": name,
+                        "timestamp": at_ms,
+                        "value": value,
+                        "anomalous": start_ms is not None and at_ms >= start_ms,
+                    }
+                )
+
+    deploys = [
+        d
+        for envelope in _envelopes(evidence, "deploy_agent")
+        for d in envelope.get("findings") or []
+        if isinstance(d, dict) and d.get("deploy_id")
+    ]
+    deploys = _scored(deploys, anomaly_starts or [incident.get("detected_at")], list(error_counts))
+    deploy_rows = [
+        {
+            "incident_id": incident_id,
+            "deploy_id": deploy["deploy_id"],
+            "deploy_service": deploy.get("service"),
+            "timestamp": timeutil.to_epoch_ms(deploy.get("timestamp")),
+            "correlation_score": _float(deploy.get("correlation_score")),
+            "minutes_before_incident": _float(deploy.get("minutes_before_incident")),
+            "matched_keywords": list(deploy.get("matched_keywords") or []),
+            "message": deploy.get("message") or deploy.get("change_summary"),
+            "has_config_diff": bool(deploy.get("config_diff")),
+        }
+        for deploy in deploys
+    ]
+    # Unscored rows (no incident time to score against) fall back on the risk flag.
+    top = max(
+        zip(deploys, deploy_rows),
+        key=lambda pair: (pair[1]["correlation_score"] or 0.0, bool(pair[0].get("risk_flag"))),
+        default=(None, {}),
+    )[1]
+
+    incident_row = {
+        "incident_id": incident_id,
+        "detected_at": detected_ms,
+        "alarm_name": incident.get("alarm_name"),
+        "metric_name": incident.get("metric_name"),
+        "error_codes": list(error_counts),
+        "error_counts": list(error_counts.values()),
+        "log_matches": log_matches,
+        "log_summary": log_summary,
+        "stack_frames": list(stack_frames),
+        "anomalous_metrics": anomalous,
+        "top_deploy_id": top.get("deploy_id"),
+        "top_deploy_score": top.get("correlation_score"),
+        "deploy_keywords": top.get("matched_keywords") or [],
+        "root_cause": action.get("root_cause"),
+        "recommended_action": action.get("recommended_action"),
+        "confidence": _float(action.get("confidence", decision.get("base_confidence"))),
+        "decision": json.dumps(decision, default=str),
+    }
+    return {"incidents": [incident_row], "metrics": metric_rows, "deployments": deploy_rows}
+
+
+class EvidenceStore:
+    """Appends and scans the evidence dataset under one root directory."""
+
+    def __init__(self, root: str):
+        if pa is None:
+            raise RuntimeError("EvidenceStore needs pyarrow (pip install pyarrow)")
+        self.root = Path(root)
+        self._schemas = _schemas()
+        self._fs = pafs.LocalFileSystem(use_mmap=True)
+
+    def append(self, incident: Dict[str, Any], evidence: Dict[str, Any]) -> Dict[str, int]:
+        """Write one incident's rows; returns the row count per table."""
+        service = incident.get("service") or "unknown"
+        detected_ms = timeutil.to_epoch_ms(incident.get("detected_at"))
+        date = timeutil.iso_from_ms(detected_ms)[:10] if detected_ms is not None else "unknown"
+        written = {}
+        for table, rows in evidence_rows(incident, evidence).items():
+            written[table] = len(rows)
+            if not rows:
+                continue
+            directory = self.root / table / f"service={service}" / f"date={date}"
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{incident['incident_id']}.parquet"
+            # Write then rename, so a concurrent scan never sees half a file.
+            tmp = directory / f".{path.name}.{uuid.uuid4().hex}.tmp"
+            pq.write_table(pa.Table.from_pylist(rows, schema=self._schemas[table]), tmp)
+            os.replace(tmp, path)
+        return written
+
+    def scan(
+        self,
+        table: str,
+        service: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        filter: Optional["ds.Expression"] = None,
+    ) -> "pa.Table":
+        """Rows of ``table``, pruned by service and by date (``YYYY-MM-DD``, inclusive)."""
+        schema = self._schemas[table]
+        directory = self.root / table
+        if not directory.exists():
+            return schema.empty_table()
+        dataset = ds.dataset(
+            str(directory),
+            schema=pa.unify_schemas([schema, _partitioning().schema]),
+            format="parquet",
+            partitioning=_partitioning(),
+            filesystem=self._fs,
+        )
+        expression = filter
+        for condition in (
+            ds.field("service") == service if service else None,
+            ds.field("date") >= since[:10] if since else None,
+            ds.field("date") <= until[:10] if until else None,
+        ):
+            if condition is not None:
+                expression = condition if expression is None else expression & condition
+        return dataset.to_table(columns=columns, filter=expression)
+
+    def repeat_incidents(
+        self, service: str, error_codes: Iterable[str], since: Optional[str] = None, limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Past incidents of ``service`` sharing the most error codes, best first."""
+        wanted = sorted(set(error_codes))
+        table = self.scan(
+            "incidents",
+            service=service,
+            since=since,
+            columns=[
+                "incident_id", "detected_at", "error_codes", "top_deploy_id",
+                "root_cause", "recommended_action", "confidence",
+            ],
+        )
+        if not wanted or table.num_rows == 0:
+            return []
+        codes = table["error_codes"]
+        hits = pc.is_in(pc.list_flatten(codes), value_set=pa.array(wanted))
+        parents = pc.list_parent_indices(codes)
+        overlap = [0] * table.num_rows
+        for parent, hit in zip(parents.to_pylist(), hits.to_pylist()):
+            overlap[parent] += hit
+        ranked = sorted(
+            (i for i, n in enumerate(overlap) if n),
+            key=lambda i: (overlap[i], table["detected_at"][i].value),
+            reverse=True,
+        )[:limit]
+        rows = table.take(ranked).to_pylist()
+        for row, i in zip(rows, ranked):
+            row["shared_error_codes"] = overlap[i]
+            row["detected_at"] = timeutil.iso_from_ms(timeutil.to_epoch_ms(row["detected_at"]))
+        return rows
+
+    def confidence_calibration(self, service: Optional[str] = None, bins: int = 10) -> List[Dict[str, Any]]:
+        """Incidents per confidence bin, with the rollback rate and mean deploy score in each."""
+        table = self.scan(
+            "incidents", service=service, columns=["confidence", "recommended_action", "top_deploy_score"]
+        ).filter(pc.is_valid(pc.field("confidence")))
+        if table.num_rows == 0:
+            return []
+        bucket = pc.divide(
+            pc.floor(pc.multiply(pc.min_element_wise(table["confidence"], 0.999999), bins)), float(bins)
+        )
+        rollback = pc.equal(table["recommended_action"], "rollback").cast(pa.float64())
+        grouped = (
+            pa.table(
+                {
+                    "bin": bucket,
+                    "confidence": table["confidence"],
+                    "rollback": pc.fill_null(rollback, 0.0),
+                    "deploy_score": table["top_deploy_score"],
+                }
+            )
+            .group_by("bin")
+            .aggregate(
+                [
+                    ("confidence", "count"),
+                    ("confidence", "mean"),
+                    ("rollback", "mean"),
+                    ("deploy_score", "mean"),
+                ]
+            )
+            .sort_by("bin")
+        )
+        return [
+            {
+                "bin": row["bin"],
+                "incidents": row["confidence_count"],
+                "mean_confidence": row["confidence_mean"],
+                "rollback_rate": row["rollback_mean"],
+                "mean_deploy_score": row["deploy_score_mean"],
+            }
+            for row in grouped.to_pylist()
+        ]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store() -> Optional[EvidenceStore]:
+    """Process-wide store under ``AIC_EVIDENCE_DIR``, or None when disabled."""
+    global _default_store
+    if not EVIDENCE_DIR or pa is None:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = EvidenceStore(EVIDENCE_DIR)
+        return _default_store
+
+
+def record_evidence(incident: Dict[str, Any], evidence: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """Append one investigation to the default store; a no-op when it is disabled."""
+    store = default_store()
+    if store is None:
+        return None
+    return store.append(incident, evidence)
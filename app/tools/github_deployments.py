@@ -1,7 +1,8 @@
 import subprocess
-import datetime
 from typing import List, Dict
 
+from app.tools import timeutil, tracing
+
 
 def get_github_deployments(service: str, time_window: dict) -> List[Dict]:
     """
@@ -9,17 +10,14 @@ def get_github_deployments(service: str, time_window: dict) -> List[Dict]:
     Heuristically filters for relevant service if provided.
     """
     # Convert window to datetime for comparison
-    start_time = datetime.datetime.fromisoformat(
-        time_window["start"].replace("Z", "+00:00")
-    )
-    end_time = datetime.datetime.fromisoformat(
-        time_window["end"].replace("Z", "+00:00")
-    )
+    start_ms = timeutil.datetime_to_ms(timeutil.parse_iso(time_window["start"]))
+    end_ms = timeutil.datetime_to_ms(timeutil.parse_iso(time_window["end"]))
 
     # 1. Fetch hashes and dates for commits in the window
     try:
         cmd = ["git", "log", "--pretty=format:%H|%ad", "--date=iso-strict"]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        with tracing.span("git log", kind="subprocess"):
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
         raw_log = result.stdout.strip()
     except Exception as e:
         raise Exception(f"Error fetching git log: {e}")
@@ -32,8 +30,8 @@ def get_github_deployments(service: str, time_window: dict) -> List[Dict]:
         if "|" not in line:
             continue
         chash, date_str = line.split("|")
-        commit_date = datetime.datetime.fromisoformat(date_str)
-        if start_time <= commit_date <= end_time:
+        commit_ms = timeutil.to_epoch_ms(date_str)
+        if commit_ms is not None and start_ms <= commit_ms <= end_ms:
             relevant_hashes.append(chash)
 
     deployments = []
@@ -49,9 +47,10 @@ def get_github_deployments(service: str, time_window: dict) -> List[Dict]:
                 "--name-only",
                 chash,
             ]
-            show_result = subprocess.run(
-                show_cmd, capture_output=True, text=True, check=True
-            )
+            with tracing.span("git show", kind="subprocess", commit=chash[:8]):
+                show_result = subprocess.run(
+                    show_cmd, capture_output=True, text=True, check=True
+                )
             show_output = show_result.stdout.strip()
 
             lines = show_output.split("\n")
@@ -0,0 +1,384 @@
+"""Process-wide admission control for LLM calls, against per-model Bedrock quotas.
+
+Every model call waits for a grant before it starts. Each model has a
+request bucket (requests/min), a token bucket (tokens/min, charged an
+estimate up front and settled against the reported usage) and a cap on
+calls in flight. Waiting calls are served:
+
+  1. by priority: Commander calls made after INVESTIGATE began (the next
+     delegation, DECIDE, REPORT) come before the Commander's opening
+     calls, and those come before sub-agent calls;
+  2. within a priority, round-robin across incidents, so one alarm storm
+     cannot starve another incident;
+  3. within an incident, first come first served.
+
+A throttling error from the backend empties that model's buckets, so the
+calls queued behind it back off instead of retrying into the same limit.
+
+The scheduler is shared by every event loop in the process (the handler
+runs one per invocation, the streaming handler one per worker thread), so
+its state sits behind a threading lock. Grants are delivered to each
+waiter's own loop.
+
+Queue wait shows up in traces as ``queue`` spans. ``emit_metrics`` writes
+queue depth and wait time as CloudWatch Embedded Metric Format lines, one
+per model.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, TextIO
+
+PRIORITY_DECIDE = 0
+PRIORITY_COMMANDER = 1
+PRIORITY_SUB_AGENT = 2
+PRIORITIES = (PRIORITY_DECIDE, PRIORITY_COMMANDER, PRIORITY_SUB_AGENT)
+
+METRICS_NAMESPACE = "AIC/LLMScheduler"
+METRICS_ENABLED = os.getenv(
+    "AIC_LLM_METRICS", "1" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "0"
+) == "1"
+_WAIT_SAMPLES = 100  # EMF takes at most 100 values per metric
+
+
+class ModelLimits(NamedTuple):
+    requests_per_minute: float
+    tokens_per_minute: float
+    max_concurrency: int
+
+
+DEFAULT_LIMITS = ModelLimits(
+    requests_per_minute=float(os.getenv("AIC_LLM_RPM", "50")),
+    tokens_per_minute=float(os.getenv("AIC_LLM_TPM", "200000")),
+    max_concurrency=int(os.getenv("AIC_LLM_CONCURRENCY", "8")),
+)
+
+
+def _limits_from_env() -> Dict[str, ModelLimits]:
+    """``AIC_LLM_LIMITS``: {"<model id>": {"rpm": .., "tpm": .., "concurrency": ..}}."""
+    raw = json.loads(os.getenv("AIC_LLM_LIMITS") or "{}")
+    return {
+        model: ModelLimits(
+            float(spec.get("rpm", DEFAULT_LIMITS.requests_per_minute)),
+            float(spec.get("tpm", DEFAULT_LIMITS.tokens_per_minute)),
+            int(spec.get("concurrency", DEFAULT_LIMITS.max_concurrency)),
+        )
+        for model, spec in raw.items()
+    }
+
+
+class TokenBucket:
+    """Refills at ``per_minute`` up to one minute's worth; may run negative after a correction."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (an oversized amount waits for a full bucket)."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+
+
+class Grant(NamedTuple):
+    model: str
+    tokens: int
+    wait_s: float
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "incident", "priority", "tokens", "granted")
+
+    def __init__(self, loop, incident: str, priority: int, tokens: int):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.incident = incident
+        self.priority = priority
+        self.tokens = tokens
+        self.granted = False
+
+
+def _resolve(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _ModelQueue:
+    def __init__(self, limits: ModelLimits, now: float):
+        self.limits = limits
+        self.requests = TokenBucket(limits.requests_per_minute, now)
+        self.tokens = TokenBucket(limits.tokens_per_minute, now)
+        self.in_flight = 0
+        # One round-robin ring of incidents per priority level.
+        self.levels: List["OrderedDict[str, Deque[_Waiter]]"] = [OrderedDict() for _ in PRIORITIES]
+        self.queued = 0
+        # The pending refill timer: when it fires and the loop it runs on.
+        self.wake_at: Optional[float] = None
+        self.wake_loop = None
+        self.max_queued = 0
+        self.waits_ms: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.granted = 0
+        self.throttled = 0
+
+    def push(self, waiter: _Waiter) -> None:
+        self.levels[waiter.priority].setdefault(waiter.incident, deque()).append(waiter)
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+
+    def head(self) -> Optional[_Waiter]:
+        for ring in self.levels:
+            if ring:
+                return ring[next(iter(ring))][0]
+        return None
+
+    def pop_head(self) -> None:
+        for ring in self.levels:
+            if ring:
+                incident, waiters = next(iter(ring.items()))
+                waiters.popleft()
+                # Served: this incident goes to the back of the ring.
+                del ring[incident]
+                if waiters:
+                    ring[incident] = waiters
+                self.queued -= 1
+                return
+
+    def remove(self, waiter: _Waiter) -> None:
+        ring = self.levels[waiter.priority]
+        waiters = ring.get(waiter.incident)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del ring[waiter.incident]
+            self.queued -= 1
+
+
+class LlmScheduler:
+    """Grants model calls within per-model request, token and concurrency limits."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, ModelLimits]] = None,
+        default_limits: ModelLimits = DEFAULT_LIMITS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._limits = dict(limits or {})
+        self._default_limits = default_limits
+        self._clock = clock
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            limits = self._limits.get(model, self._default_limits)
+            queue = self._queues[model] = _ModelQueue(limits, self._clock())
+        return queue
+
+    async def acquire(
+        self, model: str, incident: str = "", priority: int = PRIORITY_SUB_AGENT, tokens: int = 0
+    ) -> Grant:
+        """Wait until ``model`` may take a call of about ``tokens`` tokens."""
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop, incident, priority, tokens)
+        started = self._clock()
+        with self._lock:
+            queue = self._queue(model)
+            queue.push(waiter)
+            self._dispatch(queue)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    # Granted while being cancelled: hand the slot back.
+                    queue.in_flight -= 1
+                    queue.tokens.adjust(tokens, self._clock())
+                else:
+                    queue.remove(waiter)
+                    if queue.wake_loop is loop:
+                        # The refill timer lives on this loop, which may close
+                        # before it fires: let the next head schedule its own.
+                        queue.wake_at = queue.wake_loop = None
+                self._dispatch(queue)
+            raise
+        wait_s = self._clock() - started
+        with self._lock:
+            queue.waits_ms.append(round(wait_s * 1000, 1))
+        return Grant(model, tokens, wait_s)
+
+    def release(self, grant: Grant, used_tokens: Optional[int] = None) -> None:
+        """Free the call's slot; ``used_tokens`` settles the estimate it was charged."""
+        with self._lock:
+            queue = self._queue(grant.model)
+            queue.in_flight -= 1
+            if used_tokens is not None:
+                queue.tokens.adjust(grant.tokens - used_tokens, self._clock())
+            self._dispatch(queue)
+
+    def throttled(self, model: str) -> None:
+        """The backend throttled ``model``: make everyone queued behind it back off."""
+        with self._lock:
+            queue = self._queue(model)
+            now = self._clock()
+            queue.requests.drain(now)
+            queue.tokens.drain(now)
+            queue.throttled += 1
+
+    def _dispatch(self, queue: _ModelQueue) -> None:
+        # Called with the lock held. Strict priority: if the head waiter has
+        # to wait for its bucket, nobody behind it overtakes.
+        now = self._clock()
+        while queue.in_flight < queue.limits.max_concurrency:
+            waiter = queue.head()
+            if waiter is None:
+                return
+            delay = max(queue.requests.delay(1, now), queue.tokens.delay(waiter.tokens, now))
+            if delay > 0:
+                self._wake_later(queue, waiter.loop, now, delay)
+                return
+            queue.pop_head()
+            queue.requests.take(1, now)
+            queue.tokens.take(waiter.tokens, now)
+            queue.in_flight += 1
+            queue.granted += 1
+            waiter.granted = True
+            waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def _wake_later(self, queue: _ModelQueue, loop, now: float, delay: float) -> None:
+        if (
+            queue.wake_at is not None
+            and queue.wake_at <= now + delay
+            and not queue.wake_loop.is_closed()
+        ):
+            return
+        queue.wake_at, queue.wake_loop = now + delay, loop
+
+        def wake() -> None:
+            with self._lock:
+                if queue.wake_loop is loop:
+                    queue.wake_at = queue.wake_loop = None
+                self._dispatch(queue)
+
+        try:
+            loop.call_soon_threadsafe(loop.call_later, delay, wake)
+        except RuntimeError:  # the waiter's loop has closed; the next acquire/release retries
+            queue.wake_at = queue.wake_loop = None
+
+    def stats(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Per model: queued, in_flight, max_queued, waits_ms samples, granted, throttled."""
+        with self._lock:
+            snapshot = {
+                model: {
+                    "queued": q.queued,
+                    "in_flight": q.in_flight,
+                    "max_queued": q.max_queued,
+                    "waits_ms": list(q.waits_ms),
+                    "granted": q.granted,
+                    "throttled": q.throttled,
+                }
+                for model, q in self._queues.items()
+            }
+            if reset:
+                for q in self._queues.values():
+                    q.max_queued, q.granted, q.throttled = q.queued, 0, 0
+                    q.waits_ms.clear()
+        return snapshot
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def default_scheduler() -> LlmScheduler:
+    """Process-wide scheduler, so every concurrent incident shares one set of quotas."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LlmScheduler(_limits_from_env())
+        return _default_scheduler
+
+
+_current_incident: contextvars.ContextVar[str] = contextvars.ContextVar("aic_llm_incident", default="")
+
+
+@contextlib.contextmanager
+def incident(incident_id: str):
+    """Attribute the model calls made inside to ``incident_id`` (for fair queueing)."""
+    token = _current_incident.set(incident_id)
+    try:
+        yield
+    finally:
+        _current_incident.reset(token)
+
+
+def current_incident() -> str:
+    return _current_incident.get()
+
+
+def emit_metrics(out: Optional[TextIO] = None, scheduler: Optional[LlmScheduler] = None) -> int:
+    """Write one EMF line per model (queue depth, wait, throttles) and reset the window.
+
+    Returns the number of lines written.
+    """
+    if out is None and not METRICS_ENABLED:
+        return 0
+    out = out or sys.stdout
+    scheduler = scheduler or default_scheduler()
+    now_ms = int(time.time() * 1000)
+    lines = 0
+    for model, stats in scheduler.stats(reset=True).items():
+        if not stats["granted"] and not stats["max_queued"]:
+            continue
+        record = {
+            "_aws": {
+                "Timestamp": now_ms,
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [["Model"]],
+                        "Metrics": [
+                            {"Name": "QueueDepth", "Unit": "Count"},
+                            {"Name": "QueueWait", "Unit": "Milliseconds"},
+                            {"Name": "Calls", "Unit": "Count"},
+                            {"Name": "Throttles", "Unit": "Count"},
+                        ],
+                    }
+                ],
+            },
+            "Model": model,
+            "QueueDepth": stats["max_queued"],
+            "QueueWait": stats["waits_ms"] or [0.0],
+            "Calls": stats["granted"],
+            "Throttles": stats["throttled"],
+        }
+        out.write(json.dumps(record) + "\n")
+        lines += 1
+    out.flush()
+    return lines
@@ -0,0 +1,241 @@
+"""Model tiering: each sub-agent call goes to the smallest model its evidence needs.
+
+Every sub-agent is pinned to one model, but most of its calls do not need
+it. Choosing the first tool, or summarising a ``no_findings`` envelope or
+logs dominated by one error code, is work for a small, fast model. Before
+each call, ``route`` counts the independent signals in the tool results
+the sub-agent has seen so far:
+
+  failed / no_findings envelope        0 signals
+  error codes in a logs finding        1 if one code has ``DOMINANT_SHARE``
+                                       of the matches, else one per code
+  metric anomalies                     one per anomalous metric
+  deployments                          one per risk-flagged deploy (at least
+                                       1 when any were found)
+  anything else                        1
+
+Up to ``MAX_SMALL_SIGNALS`` signals goes to ``SMALL_MODEL``. Anything more
+is an ambiguous, multi-signal incident and stays on the pinned model.
+The Commander is never tiered down.
+
+Each decision is recorded in the incident's ``RoutingLog``, which the
+handler opens with ``incident()``. The log holds the model, the reason,
+tokens and latency of every call. ``RoutingLog.summary()`` reports the
+calls routed down and the estimated cost and latency they saved against
+the pinned model. Cost comes from ``PRICES``. Latency is measured against
+the pinned model's running mean in this process. ``AIC_SMALL_MODEL=""``
+turns tiering off.
+"""
+
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SMALL_MODEL = os.getenv("AIC_SMALL_MODEL", "bedrock/anthropic.claude-haiku-4-5-20251001-v1:0")
+MAX_SMALL_SIGNALS = 1
+DOMINANT_SHARE = 0.8
+
+# USD per million (input, output) tokens, matched by model family.
+PRICES = {
+    "haiku": (1.0, 5.0),
+    "sonnet": (3.0, 15.0),
+    "opus": (5.0, 25.0),
+}
+# Input tokens read from the prompt cache cost a tenth of the input price.
+CACHE_READ_PRICE_FACTOR = 0.1
+
+TIER_SMALL = "small"
+TIER_PINNED = "pinned"
+
+
+def price(model: str) -> Optional[Tuple[float, float]]:
+    for family, prices in PRICES.items():
+        if family in model:
+            return prices
+    return None
+
+
+def cost_usd(
+    model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0
+) -> Optional[float]:
+    """Estimated cost of one call; ``prompt_tokens`` includes the ``cached_tokens``."""
+    prices = price(model)
+    if prices is None:
+        return None
+    uncached = prompt_tokens - cached_tokens
+    input_cost = (uncached + cached_tokens * CACHE_READ_PRICE_FACTOR) * prices[0]
+    return (input_cost + completion_tokens * prices[1]) / 1_000_000
+
+
+def _error_signals(error_summary: Dict[str, Any]) -> Tuple[int, Optional[str]]:
+    counts = {code: int((stats or {}).get("count") or 0) for code, stats in error_summary.items()}
+    total = sum(counts.values())
+    if not counts or not total:
+        return len(counts), None
+    code, top = max(counts.items(), key=lambda item: item[1])
+    if top / total >= DOMINANT_SHARE:
+        return 1, f"dominant {code} {top / total:.0%}"
+    return len(counts), None
+
+
+def evidence_signals(response: Any) -> Tuple[int, Optional[str]]:
+    """Independent signals in one tool result, and a note on how they were counted."""
+    if not isinstance(response, dict):
+        return 1, None
+    if response.get("error") or response.get("status") == "failed":
+        return 0, "failed"
+    if response.get("status") == "no_findings":
+        return 0, "no findings"
+    if "findings" in response:
+        signals, notes = 0, []
+        for finding in response.get("findings") or []:
+            if isinstance(finding, dict) and "error_summary" in finding:
+                count, note = _error_signals(finding.get("error_summary") or {})
+                signals += count
+                if note:
+                    notes.append(note)
+            else:
+                signals += 1
+        return signals, ", ".join(notes) or None
+    if "anomalies" in response:
+        return len(response.get("anomalies") or []), None
+    if "deployments" in response:
+        deploys = response.get("deployments") or []
+        flagged = sum(1 for d in deploys if isinstance(d, dict) and d.get("risk_flag"))
+        return max(flagged, 1 if deploys else 0), None
+    if "deployment_data" in response:
+        # The latest push event: context for the deploy history, not a signal of its own.
+        return 0, None
+    return 1, None
+
+
+def route(
+    pinned_model: str, small_model: Optional[str], responses: Iterable[Any]
+) -> Tuple[str, str, str]:
+    """(model, tier, reason) for a call whose agent has seen tool results ``responses``."""
+    responses = list(responses)
+    signals, notes = 0, []
+    for response in responses:
+        count, note = evidence_signals(response)
+        signals += count
+        if note:
+            notes.append(note)
+    if not responses:
+        reason = "no evidence yet"
+    else:
+        reason = f"{signals} signal{'' if signals == 1 else 's'}"
+        if notes:
+            reason += f" ({'; '.join(notes)})"
+    if not small_model or small_model == pinned_model or signals > MAX_SMALL_SIGNALS:
+        return pinned_model, TIER_PINNED, reason
+    return small_model, TIER_SMALL, reason
+
+
+class _LatencyStats:
+    """Running mean call latency per model, shared by every incident in the process."""
+
+    def __init__(self):
+        self._totals: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model: str, latency_ms: float) -> None:
+        with self._lock:
+            total, count = self._totals.get(model, (0.0, 0))
+            self._totals[model] = (total + latency_ms, count + 1)
+
+    def mean(self, model: str) -> Optional[float]:
+        with self._lock:
+            total, count = self._totals.get(model, (0.0, 0))
+        return total / count if count else None
+
+
+_latency = _LatencyStats()
+
+
+class RoutingLog:
+    """Routing decisions for one incident."""
+
+    def __init__(self, incident_id: str):
+        self.incident_id = incident_id
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        agent: str,
+        pinned_model: str,
+        model: str,
+        tier: str,
+        reason: str,
+        latency_ms: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> None:
+        _latency.add(model, latency_ms)
+        call = {
+            "agent": agent,
+            "model": model,
+            "pinned_model": pinned_model,
+            "tier": tier,
+            "reason": reason,
+            "latency_ms": round(latency_ms, 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+        }
+        with self._lock:
+            self.calls.append(call)
+        logger.debug("%s: %s → %s (%s)", self.incident_id, agent, model, reason)
+
+    def summary(self) -> Dict[str, Any]:
+        """Calls per tier and the estimated cost and latency saved by routing down."""
+        with self._lock:
+            calls = list(self.calls)
+        cost, saved_usd, saved_ms = 0.0, 0.0, 0.0
+        for call in calls:
+            tokens = (call["prompt_tokens"], call["completion_tokens"], call["cached_tokens"])
+            actual = cost_usd(call["model"], *tokens) or 0.0
+            cost += actual
+            if call["tier"] != TIER_SMALL:
+                continue
+            pinned = cost_usd(call["pinned_model"], *tokens)
+            if pinned is not None:
+                saved_usd += pinned - actual
+            pinned_ms = _latency.mean(call["pinned_model"])
+            if pinned_ms is not None:
+                saved_ms += max(0.0, pinned_ms - call["latency_ms"])
+        return {
+            "calls": len(calls),
+            "small_calls": sum(1 for c in calls if c["tier"] == TIER_SMALL),
+            "cached_tokens": sum(c["cached_tokens"] for c in calls),
+            "cost_usd": round(cost, 6),
+            "est_cost_saved_usd": round(saved_usd, 6),
+            "est_latency_saved_ms": round(saved_ms, 1),
+            "decisions": calls,
+        }
+
+
+_current_log: contextvars.ContextVar[Optional[RoutingLog]] = contextvars.ContextVar(
+    "aic_routing_log", default=None
+)
+
+
+def current_log() -> Optional[RoutingLog]:
+    return _current_log.get()
+
+
+@contextlib.contextmanager
+def incident(incident_id: str):
+    """Make a RoutingLog current for one incident run. Yields the RoutingLog."""
+    log = RoutingLog(incident_id)
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
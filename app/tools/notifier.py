@@ -1 +1,281 @@
-#!/usr/bin/env python3
+"""send_notification — incident alerts to SNS, batched and deduplicated.
+
+Each notification is a tools.md Tool 13 payload (incident_id, summary,
+report_url, severity, recommended_action, plus service). It goes out with
+``MessageStructure="json"``, so email, Lambda and other subscribers each get
+their own format.
+
+During an alarm storm the notifier keeps SNS calls and pages down in two ways:
+  dedup     — a notification whose fingerprint (service + alarm + action + root
+              cause) was already sent or queued within ``DEDUP_TTL_SECONDS`` is
+              dropped. With ``STATE_TABLE_NAME`` set, the fingerprint is claimed
+              with a conditional put in the incident state table
+              (``PK=NOTIFY#<fingerprint>``), so duplicates are caught across
+              Lambda containers, not just within one process
+  batching  — queued notifications go out through ``PublishBatch``, 10 per call
+
+A Lambda invocation handles one incident and the handler flushes before it
+returns, so there it is one ``Publish`` per incident. Batching pays off in
+long-lived processes (the local server, replays) that queue several alerts.
+
+Publishing is retried with exponential backoff. Entries SNS reports as
+retryable in ``Failed`` are retried, and so are throttling errors and
+connection failures or timeouts (``BotoCoreError``) on the whole call.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+from app.tools import tracing
+
+logger = logging.getLogger(__name__)
+
+SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN")
+DEDUP_TTL_SECONDS = float(os.getenv("AIC_NOTIFY_DEDUP_SECONDS", "900"))
+BATCH_SIZE = 10  # PublishBatch limit
+MAX_RETRIES = 5
+RETRY_BASE_SECONDS = 0.1
+RETRY_MAX_SECONDS = 2.0
+SUBJECT_LIMIT = 100  # SNS rejects longer subjects
+_RETRYABLE_ERRORS = {"Throttling", "ThrottledException", "InternalError", "ServiceUnavailable"}
+
+
+def fingerprint(notification: Dict[str, Any]) -> str:
+    """Stable id for "the same problem": service, alarm, action and root cause."""
+    if notification.get("fingerprint"):
+        return notification["fingerprint"]
+    parts = [
+        notification.get(k) or ""
+        for k in ("service", "alarm_name", "recommended_action", "root_cause")
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _subject(text: str) -> str:
+    return text if len(text) <= SUBJECT_LIMIT else text[: SUBJECT_LIMIT - 1] + "…"
+
+
+def build_message(notification: Dict[str, Any]) -> Dict[str, str]:
+    """Subject + ``MessageStructure=json`` body for one incident (tools.md Tool 13)."""
+    incident_id = notification["incident_id"]
+    severity = (notification.get("severity") or "critical").upper()
+    action = (notification.get("recommended_action") or "escalate").title()
+    report_url = notification.get("report_url") or "n/a"
+    duplicates = notification.get("duplicates") or []
+    headline = f"[{severity}] Incident {incident_id} — {action} recommended."
+    also = f" Also seen as: {', '.join(duplicates)}." if duplicates else ""
+    message = {
+        "default": f"🚨 {headline} Report: {report_url}{also}",
+        "email": (
+            f"{headline}\n\n"
+            f"Service: {notification.get('service') or 'unknown'}\n"
+            f"Summary: {notification.get('summary') or ''}\n"
+            f"Report: {report_url}\n"
+            + (f"Duplicate incidents: {', '.join(duplicates)}\n" if duplicates else "")
+        ),
+        "lambda": json.dumps(notification, default=str),
+    }
+    return {
+        "Subject": _subject(f"[AIC] {severity} — {incident_id} — {action} Recommended"),
+        "Message": json.dumps(message, ensure_ascii=False),
+        "MessageStructure": "json",
+    }
+
+
+class Notifier:
+    """Queues notifications for one topic and publishes them in batches."""
+
+    def __init__(
+        self,
+        topic_arn: str,
+        sns=None,
+        dedup_table=None,
+        dedup_ttl: float = DEDUP_TTL_SECONDS,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.topic_arn = topic_arn
+        self.dedup_ttl = dedup_ttl
+        self.batch_size = min(batch_size, BATCH_SIZE)
+        self._sns = sns or tracing.instrument_client(boto3.client("sns"))
+        self._dedup_table = dedup_table  # shared across containers; None = this process only
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._seen: Dict[str, Dict[str, Any]] = {}  # fingerprint -> {expires, notification}
+        self.published = 0
+        self.suppressed = 0
+        self.failed = 0
+
+    def notify(self, notification: Dict[str, Any]) -> str:
+        """Queue one notification. Returns "queued" or "duplicate"."""
+        now = time.monotonic()
+        key = fingerprint(notification)
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen and seen["expires"] > now:
+                self.suppressed += 1
+                # Only shows up if the first one has not been published yet.
+                seen["notification"].setdefault("duplicates", []).append(
+                    notification["incident_id"]
+                )
+                return "duplicate"
+            notification = {**notification, "fingerprint": key}
+            self._seen[key] = {"expires": now + self.dedup_ttl, "notification": notification}
+            if len(self._seen) > 4096:
+                self._seen = {k: v for k, v in self._seen.items() if v["expires"] > now}
+        if not self._claim(key, notification["incident_id"]):
+            with self._lock:
+                self.suppressed += 1
+            return "duplicate"
+        with self._lock:
+            self._pending.append(notification)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+        return "queued"
+
+    def _claim(self, key: str, incident_id: str) -> bool:
+        """Claim ``key`` in the shared table. False if another container holds it.
+
+        Fails open: if DynamoDB is unreachable the alert is sent anyway.
+        """
+        if self._dedup_table is None:
+            return True
+        now = int(time.time())
+        try:
+            self._dedup_table.put_item(
+                Item={
+                    "PK": f"NOTIFY#{key}",
+                    "SK": "DEDUP",
+                    "incident_id": incident_id,
+                    "expires_at": now + int(self.dedup_ttl),
+                },
+                ConditionExpression="attribute_not_exists(PK) OR expires_at < :now",
+                ExpressionAttributeValues={":now": now},
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            logger.warning("Shared dedup check failed, sending %s anyway: %s", incident_id, e)
+        except BotoCoreError as e:
+            logger.warning("Shared dedup check failed, sending %s anyway: %s", incident_id, e)
+        return True
+
+    def flush(self) -> int:
+        """Publish every queued notification. Returns the number of SNS messages published."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, []
+        entries = [build_message(n) for n in pending]
+        sent = 0
+        with tracing.span("notify.publish", kind="internal"):
+            for i in range(0, len(entries), self.batch_size):
+                sent += self._publish(entries[i : i + self.batch_size])
+        with self._lock:
+            self.published += sent
+            self.failed += len(entries) - sent
+        return sent
+
+    def _publish(self, messages: List[Dict[str, str]]) -> int:
+        if len(messages) == 1:
+            return self._publish_single(messages[0])
+        entries = {str(i): {"Id": str(i), **m} for i, m in enumerate(messages)}
+        sent = 0
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = self._sns.publish_batch(
+                    TopicArn=self.topic_arn, PublishBatchRequestEntries=list(entries.values())
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in _RETRYABLE_ERRORS:
+                    logger.error("PublishBatch failed, dropping %d messages: %s", len(entries), e)
+                    return sent
+            except BotoCoreError as e:  # connection failure or timeout: retry
+                logger.warning("PublishBatch attempt %d failed: %s", attempt + 1, e)
+            else:
+                for ok in response.get("Successful", []):
+                    entries.pop(ok["Id"], None)
+                    sent += 1
+                for failure in response.get("Failed", []):
+                    if failure.get("SenderFault"):
+                        logger.error(
+                            "SNS rejected notification: %s", failure.get("Message") or failure["Code"]
+                        )
+                        entries.pop(failure["Id"], None)
+            if not entries:
+                return sent
+            if attempt < MAX_RETRIES:
+                time.sleep(min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt))
+        logger.error("%d notifications still failing after %d retries", len(entries), MAX_RETRIES)
+        return sent
+
+    def _publish_single(self, message: Dict[str, str]) -> int:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self._sns.publish(TopicArn=self.topic_arn, **message)
+                return 1
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in _RETRYABLE_ERRORS:
+                    logger.error("Publish failed: %s", e)
+                    return 0
+            except BotoCoreError as e:  # connection failure or timeout: retry
+                logger.warning("Publish attempt %d failed: %s", attempt + 1, e)
+            if attempt < MAX_RETRIES:
+                time.sleep(min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt))
+        logger.error("Notification still failing after %d retries", MAX_RETRIES)
+        return 0
+
+
+_default_notifier = None
+_default_notifier_lock = threading.Lock()
+
+
+def default_notifier() -> Optional[Notifier]:
+    """Notifier for ``SNS_TOPIC_ARN``, or None when no topic is configured."""
+    global _default_notifier
+    with _default_notifier_lock:
+        if _default_notifier is None and SNS_TOPIC_ARN:
+            table_name = os.getenv("STATE_TABLE_NAME")
+            table = boto3.resource("dynamodb").Table(table_name) if table_name else None
+            _default_notifier = Notifier(SNS_TOPIC_ARN, dedup_table=table)
+            atexit.register(_default_notifier.flush)
+        return _default_notifier
+
+
+def send_notification(
+    incident_id: str,
+    summary: str,
+    report_url: Optional[str] = None,
+    severity: str = "critical",
+    recommended_action: str = "escalate",
+    **extra: Any,
+) -> Dict[str, str]:
+    """Queue an incident alert (tools.md Tool 13). Returns its status and fingerprint."""
+    notifier = default_notifier()
+    notification = {
+        "incident_id": incident_id,
+        "summary": summary,
+        "report_url": report_url,
+        "severity": severity,
+        "recommended_action": recommended_action,
+        **extra,
+    }
+    if notifier is None:
+        logger.info("SNS_TOPIC_ARN not set; notification for %s not sent", incident_id)
+        return {"status": "skipped", "fingerprint": fingerprint(notification)}
+    return {"status": notifier.notify(notification), "fingerprint": fingerprint(notification)}
+
+
+def flush_notifications() -> int:
+    """Publish every queued notification. Returns messages published."""
+    notifier = default_notifier()
+    return notifier.flush() if notifier is not None else 0
@@ -3,6 +3,8 @@
 import json
 from datetime import datetime, timezone
 
+from app.tools.timeutil import parse_iso
+
 
 def parse_alarm_event(event: dict) -> dict:
     """Extracts structured incident context from a CloudWatch Alarm EventBridge event.
@@ -47,9 +49,7 @@ def parse_alarm_event(event: dict) -> dict:
         detected_at += "Z"
 
     try:
-        dt = datetime.fromisoformat(
-            detected_at.replace("Z", "+00:00").replace("+0000", "+00:00")
-        )
+        dt = parse_iso(detected_at)
     except (ValueError, AttributeError):
         dt = datetime.now(timezone.utc)
     incident_id = f"INC-{dt.strftime('%Y%m%d-%H%M%S')}"
@@ -0,0 +1,349 @@
+"""Compiled RCA report templates — Markdown, HTML and JSON.
+
+Templates are parsed once at import, i.e. once per Lambda container, into
+flat lists of literal / field / section ops. Rendering walks those ops and
+writes straight into a list of parts or any writable stream. Repeated
+sections (evidence chain, metric summaries, error clusters) are rendered row
+by row from whatever iterable the caller passes, each row through a
+positional ``str.format`` string built from the section's row template. A
+report with thousands of evidence rows therefore never builds one giant
+string, and when ``out`` is a file its memory stays bounded.
+
+Template syntax: ``{field}`` or ``{field:spec}`` inserts a context value
+(``format(value, spec)``), ``{@section}`` expands a repeated section.
+"""
+
+import datetime
+import html
+import itertools
+import json
+import operator
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+_TOKEN = re.compile(r"\{(@?)(\w+)(?::([^{}]*))?\}")
+
+
+class Template:
+    """A template compiled to (kind, value, spec) ops."""
+
+    __slots__ = ("ops",)
+
+    def __init__(self, source: str):
+        self.ops: List[tuple] = []
+        pos = 0
+        for match in _TOKEN.finditer(source):
+            if match.start() > pos:
+                self.ops.append(("text", source[pos : match.start()], None))
+            kind = "section" if match.group(1) else "field"
+            self.ops.append((kind, match.group(2), match.group(3) or ""))
+            pos = match.end()
+        if pos < len(source):
+            self.ops.append(("text", source[pos:], None))
+
+    def render_to(
+        self,
+        write: Callable[[str], Any],
+        context: Dict[str, Any],
+        sections: Optional[Dict[str, Callable]] = None,
+        escape: Callable[[str], str] = str,
+    ) -> None:
+        for kind, value, spec in self.ops:
+            if kind == "text":
+                write(value)
+            elif kind == "field":
+                write(escape(format(context[value], spec)))
+            else:
+                sections[value](write)
+
+    def row_format(self, fields: Tuple[str, ...]) -> str:
+        """The template as a positional ``str.format`` string over ``fields``."""
+        body = []
+        for kind, value, spec in self.ops:
+            if kind == "text":
+                body.append(value.replace("{", "{{").replace("}", "}}"))
+            else:
+                if value not in fields:
+                    raise ValueError(f"Row field '{value}' not in {fields}")
+                body.append("{" + str(fields.index(value)) + (":" + spec if spec else "") + "}")
+        return "".join(body)
+
+
+class Section:
+    """A repeated block: header, one row per item, separator, footer.
+
+    Each row is a tuple of ``fields`` or a dict holding them. Rows are
+    formatted in chunks of ``CHUNK_ROWS`` and written per chunk, so memory is
+    bounded by one chunk regardless of how many rows there are.
+    """
+
+    CHUNK_ROWS = 512
+    __slots__ = ("row", "fields", "header", "footer", "sep", "empty", "_format")
+
+    def __init__(
+        self,
+        row: str,
+        fields: Tuple[str, ...],
+        header: str = "",
+        footer: str = "",
+        sep: str = "",
+        empty: str = "",
+    ):
+        self.row = Template(row)
+        self.fields = fields
+        self.header, self.footer, self.sep, self.empty = header, footer, sep, empty
+        self._format = self.row.row_format(fields).format
+
+    def render_to(self, write, rows: Iterable[Any], escape=str, tuples: bool = False) -> None:
+        format_row = self._format
+        if escape is not str:
+            fmt = self._format
+
+            def format_row(*values):
+                # Escape string values only, so numbers keep their format specs.
+                return fmt(*[escape(v) if isinstance(v, str) else v for v in values])
+
+        if not tuples:
+            rows = map(operator.itemgetter(*self.fields), rows)
+            if len(self.fields) == 1:
+                rows = ((value,) for value in rows)
+        formatted = itertools.starmap(format_row, rows)
+        started = False
+        while True:
+            chunk = list(itertools.islice(formatted, self.CHUNK_ROWS))
+            if not chunk:
+                break
+            write((self.sep if started else self.header) + self.sep.join(chunk))
+            started = True
+        write(self.footer if started else self.empty)
+
+
+_CLUSTER_FIELDS = ("label", "count", "first_seen", "last_seen")
+_METRIC_FIELDS = ("metric_name", "baseline_avg", "peak_value", "change_factor")
+
+# ── Markdown ───────────────────────────────────────────────────────────────────
+
+MARKDOWN = Template(
+    """# Incident Report: {incident_id}
+
+## Summary
+| Field | Value |
+|-------|-------|
+| Incident ID | {incident_id} |
+| Service | {service} |
+| Detected At | {detected_at} |
+| Root Cause | {root_cause} |
+| Confidence | {confidence:.0%} |
+| Recommended Action | {recommended_action} |
+| Report Generated | {generated_at} |
+
+## Evidence Chain
+{@evidence_chain}
+
+## Log Analysis
+{logs_summary}
+{@clusters}
+## Metric Analysis
+{metrics_summary}
+{@metric_summaries}
+## Deployment Correlation
+{deploy_summary}
+
+## Recommended Action
+**{action_upper}** — {action_text}
+
+## Agent Chain of Thought
+1. DETECT — Alarm received for {service}
+2. PLAN — Investigation plan generated, 3 agents dispatched via A2A
+3. INVESTIGATE — Logs, Metrics, Deploy agents analyzed data
+4. DECIDE — Root cause identified (confidence: {confidence:.0%})
+5. ACT — {action_upper} recommended
+6. REPORT — This document generated at {generated_at}
+
+---
+*Generated by Autonomous Incident Commander (AIC)*
+"""
+)
+
+MARKDOWN_SECTIONS = {
+    "evidence_chain": Section("  {n}. {text}", ("n", "text"), sep="\n"),
+    "clusters": Section(
+        "| {label} | {count} | {first_seen} | {last_seen} |\n",
+        _CLUSTER_FIELDS,
+        header="\n| Error Cluster | Count | First Seen | Last Seen |\n|---|---|---|---|\n",
+    ),
+    "metric_summaries": Section(
+        "| {metric_name} | {baseline_avg:.2f} | {peak_value:.2f} | {change_factor:.1f}x |\n",
+        _METRIC_FIELDS,
+        header="\n| Metric | Baseline | Peak | Change |\n|---|---|---|---|\n",
+    ),
+}
+
+# ── HTML ───────────────────────────────────────────────────────────────────────
+
+HTML = Template(
+    """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Incident Report: {incident_id}</title></head>
+<body>
+<h1>Incident Report: {incident_id}</h1>
+<h2>Summary</h2>
+<table>
+<tr><th>Incident ID</th><td>{incident_id}</td></tr>
+<tr><th>Service</th><td>{service}</td></tr>
+<tr><th>Detected At</th><td>{detected_at}</td></tr>
+<tr><th>Root Cause</th><td>{root_cause}</td></tr>
+<tr><th>Confidence</th><td>{confidence:.0%}</td></tr>
+<tr><th>Recommended Action</th><td>{recommended_action}</td></tr>
+<tr><th>Report Generated</th><td>{generated_at}</td></tr>
+</table>
+<h2>Evidence Chain</h2>
+{@evidence_chain}
+<h2>Log Analysis</h2>
+<p>{logs_summary}</p>
+{@clusters}
+<h2>Metric Analysis</h2>
+<p>{metrics_summary}</p>
+{@metric_summaries}
+<h2>Deployment Correlation</h2>
+<p>{deploy_summary}</p>
+<h2>Recommended Action</h2>
+<p><strong>{action_upper}</strong> — {action_text}</p>
+<hr><p><em>Generated by Autonomous Incident Commander (AIC)</em></p>
+</body></html>
+"""
+)
+
+HTML_SECTIONS = {
+    "evidence_chain": Section("<li>{text}</li>\n", ("n", "text"), header="<ol>\n", footer="</ol>"),
+    "clusters": Section(
+        "<tr><td>{label}</td><td>{count}</td><td>{first_seen}</td><td>{last_seen}</td></tr>\n",
+        _CLUSTER_FIELDS,
+        header="<table>\n<tr><th>Error Cluster</th><th>Count</th><th>First Seen</th><th>Last Seen</th></tr>\n",
+        footer="</table>",
+    ),
+    "metric_summaries": Section(
+        "<tr><td>{metric_name}</td><td>{baseline_avg:.2f}</td><td>{peak_value:.2f}</td>"
+        "<td>{change_factor:.1f}x</td></tr>\n",
+        _METRIC_FIELDS,
+        header="<table>\n<tr><th>Metric</th><th>Baseline</th><th>Peak</th><th>Change</th></tr>\n",
+        footer="</table>",
+    ),
+}
+
+FORMATS = ("markdown", "html", "json")
+
+
+def _context(
+    incident_id: str,
+    service: str,
+    detected_at: str,
+    root_cause: str,
+    confidence: float,
+    recommended_action: str,
+    logs_summary: str,
+    metrics_summary: str,
+    deploy_summary: str,
+    generated_at: Optional[str],
+) -> Dict[str, Any]:
+    return {
+        "incident_id": incident_id,
+        "service": service,
+        "detected_at": detected_at,
+        "root_cause": root_cause,
+        "confidence": confidence,
+        "recommended_action": recommended_action,
+        "generated_at": generated_at
+        or datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "logs_summary": logs_summary or "No log findings available.",
+        "metrics_summary": metrics_summary or "No metric findings available.",
+        "deploy_summary": deploy_summary or "No deployment findings available.",
+        "action_upper": recommended_action.upper(),
+        "action_text": "Roll back " + service + " to previous version"
+        if recommended_action == "rollback"
+        else "Escalate to human on-call team for further investigation",
+    }
+
+
+def _render_json(write, context: Dict[str, Any], rows: Dict[str, Iterable]) -> None:
+    encode = json.JSONEncoder(default=str).encode
+    write("{")
+    write(",".join(f"{encode(k)}:{encode(v)}" for k, v in context.items()))
+    for name, items in rows.items():
+        write(f",{encode(name)}:[")
+        for i, item in enumerate(items):
+            write(("," if i else "") + encode(item))
+        write("]")
+    write("}")
+
+
+def render_rca(
+    fmt: str = "markdown",
+    out: Optional[TextIO] = None,
+    *,
+    incident_id: str,
+    service: str,
+    detected_at: str,
+    root_cause: str,
+    confidence: float,
+    recommended_action: str,
+    evidence_chain: Iterable[str],
+    logs_summary: str = "",
+    metrics_summary: str = "",
+    deploy_summary: str = "",
+    metric_summaries: Iterable[Dict[str, Any]] = (),
+    clusters: Iterable[Dict[str, Any]] = (),
+    generated_at: Optional[str] = None,
+) -> Optional[str]:
+    """Render an RCA report as ``fmt``.
+
+    Writes into ``out`` and returns None when a stream is given, otherwise
+    returns the rendered string. ``metric_summaries`` rows carry
+    metric_name / baseline_avg / peak_value / change_factor (as in the metrics
+    agent's anomalies); ``clusters`` rows carry label / count / first_seen /
+    last_seen. Row iterables are consumed lazily.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format '{fmt}', expected one of {FORMATS}")
+    # Without a stream, parts are joined once at the end.
+    parts: List[str] = []
+    write = out.write if out is not None else parts.append
+    context = _context(
+        incident_id,
+        service,
+        detected_at,
+        root_cause,
+        confidence,
+        recommended_action,
+        logs_summary,
+        metrics_summary,
+        deploy_summary,
+        generated_at,
+    )
+
+    if fmt == "json":
+        _render_json(
+            write,
+            context,
+            {
+                "evidence_chain": evidence_chain,
+                "metric_summaries": metric_summaries,
+                "clusters": clusters,
+            },
+        )
+    else:
+        template, sections, escape = (
+            (MARKDOWN, MARKDOWN_SECTIONS, str)
+            if fmt == "markdown"
+            else (HTML, HTML_SECTIONS, html.escape)
+        )
+        rows = {"clusters": clusters, "metric_summaries": metric_summaries}
+        renderers = {
+            name: (lambda w, s=section, r=rows.get(name): s.render_to(w, r, escape))
+            for name, section in sections.items()
+        }
+        # The chain is fed as (n, text) tuples; no per-row dict is built.
+        renderers["evidence_chain"] = lambda w: sections["evidence_chain"].render_to(
+            w, enumerate(evidence_chain, 1), escape, tuples=True
+        )
+        template.render_to(write, context, renderers, escape)
+    return "".join(parts) if out is None else None
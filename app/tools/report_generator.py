@@ -1 +1,247 @@
-#!/usr/bin/env python3
+"""generate_rca_report — publishes the RCA and its evidence bundle to S3.
+
+Per incident, under the ``REPORTS_BUCKET`` (tools.md Tool 12):
+  <incident_id>/rca.md                 the Markdown report
+  <incident_id>/evidence.json.gz|.zst  machine-readable bundle: incident,
+                                       decision, agent findings (with their
+                                       series and samples), trace summary
+  index/<service>/<YYYY-MM-DD>/<HHMMSS>_<incident_id>.json
+                                       small pointer object, so listing a
+                                       service's reports for a day is a single
+                                       prefix LIST
+
+The bundle is JSON-encoded incrementally and compressed as it streams. Once
+the compressed output passes one part size it switches to a multipart
+upload, so big bundles never sit fully in memory. zstd is used when the
+``zstandard`` package is installed, otherwise gzip.
+"""
+
+import datetime
+import json
+import logging
+import os
+import zlib
+from typing import Any, Dict, List, Optional
+
+import boto3
+
+from app.tools import state_store, timeutil, tracing
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+REPORTS_BUCKET = os.getenv("REPORTS_BUCKET")
+PART_SIZE = 8 * 1024 * 1024  # S3 minimum is 5 MiB for every part but the last
+_ENCODER = json.JSONEncoder(default=str)
+
+
+def _compressor(compression: str):
+    if compression == "zstd":
+        if zstandard is not None:
+            return zstandard.ZstdCompressor().compressobj(), ".zst"
+        logger.warning("zstandard not installed; compressing evidence with gzip")
+        compression = "gzip"
+    if compression == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31), ".gz"  # wbits 31 = gzip container
+    raise ValueError(f"Unsupported compression '{compression}'")
+
+
+class _StreamingUpload:
+    """Buffers bytes into parts; single PutObject if it never fills one."""
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int = PART_SIZE, **put_kwargs):
+        self.s3, self.bucket, self.key = s3, bucket, key
+        self.part_size = part_size
+        self.put_kwargs = put_kwargs
+        self.size = 0
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Dict] = []
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+
+    def _upload_part(self, data: bytes) -> None:
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.put_kwargs
+            )["UploadId"]
+        number = len(self._parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=number, Body=data
+        )
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def close(self) -> None:
+        if self._upload_id is None:
+            self.s3.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.put_kwargs
+            )
+            return
+        if self._buffer:
+            self._upload_part(bytes(self._buffer))
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self) -> None:
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+            )
+
+
+def _iter_json(evidence: Dict[str, Any]):
+    # Top-level lists are emitted item by item so a large findings list is
+    # never encoded into one string.
+    yield "{"
+    for i, (name, value) in enumerate(evidence.items()):
+        yield ("," if i else "") + json.dumps(name) + ":"
+        if isinstance(value, list):
+            yield "["
+            for j, item in enumerate(value):
+                yield ("," if j else "") + _ENCODER.encode(item)
+            yield "]"
+        else:
+            yield _ENCODER.encode(value)
+    yield "}"
+
+
+def upload_evidence_bundle(
+    s3,
+    bucket: str,
+    key_prefix: str,
+    evidence: Dict[str, Any],
+    compression: str = "gzip",
+    part_size: int = PART_SIZE,
+) -> Dict[str, Any]:
+    """Stream ``evidence`` as compressed JSON to ``<key_prefix>evidence.json<ext>``."""
+    compressor, ext = _compressor(compression)
+    key = f"{key_prefix}evidence.json{ext}"
+    upload = _StreamingUpload(
+        s3,
+        bucket,
+        key,
+        part_size,
+        ContentType="application/json",
+        ContentEncoding="gzip" if ext == ".gz" else "zstd",
+    )
+    raw_bytes = 0
+    try:
+        chunk = bytearray()
+        for text in _iter_json(evidence):
+            encoded = text.encode("utf-8")
+            raw_bytes += len(encoded)
+            chunk += encoded
+            if len(chunk) >= 64 * 1024:
+                upload.write(compressor.compress(bytes(chunk)))
+                chunk.clear()
+        upload.write(compressor.compress(bytes(chunk)) + compressor.flush())
+        upload.close()
+    except Exception:
+        upload.abort()
+        raise
+    return {
+        "key": key,
+        "raw_bytes": raw_bytes,
+        "compressed_bytes": upload.size,
+        "parts": len(upload._parts) or 1,
+    }
+
+
+def _index_key(service: str, detected_at: str, incident_id: str) -> str:
+    try:
+        dt = timeutil.parse_iso(detected_at)
+    except ValueError:
+        dt = datetime.datetime.now(datetime.timezone.utc)
+    return f"index/{service}/{dt:%Y-%m-%d}/{dt:%H%M%S}_{incident_id}.json"
+
+
+def generate_rca_report(
+    incident_id: str,
+    service: str,
+    detected_at: str,
+    markdown: str,
+    evidence: Dict[str, Any],
+    summary: str = "",
+    bucket: Optional[str] = None,
+    s3=None,
+    compression: str = "gzip",
+) -> Dict[str, Any]:
+    """Upload the RCA Markdown, the evidence bundle and the index entry.
+
+    Returns the tools.md Tool 12 output plus the bundle location and sizes,
+    and records a ``REPORT`` state entry once the objects are in S3.
+    """
+    bucket = bucket or REPORTS_BUCKET
+    if not bucket:
+        raise ValueError("REPORTS_BUCKET is not set")
+    s3 = s3 or tracing.instrument_client(boto3.client("s3"))
+
+    prefix = f"{incident_id}/"
+    with tracing.span("report.upload", kind="internal"):
+        s3.put_object(
+            Bucket=bucket,
+            Key=f"{prefix}rca.md",
+            Body=markdown.encode("utf-8"),
+            ContentType="text/markdown",
+        )
+        bundle = upload_evidence_bundle(s3, bucket, prefix, evidence, compression)
+
+        result = {
+            "incident_id": incident_id,
+            "service": service,
+            "detected_at": detected_at,
+            "report_s3_uri": f"s3://{bucket}/{prefix}rca.md",
+            "report_url": f"https://{bucket}.s3.amazonaws.com/{prefix}rca.md",
+            "evidence_s3_uri": f"s3://{bucket}/{bundle['key']}",
+            "evidence_bytes": bundle["compressed_bytes"],
+            "summary": summary,
+        }
+        s3.put_object(
+            Bucket=bucket,
+            Key=_index_key(service, detected_at, incident_id),
+            Body=json.dumps(result).encode("utf-8"),
+            ContentType="application/json",
+        )
+    state_store.save_state(incident_id, "REPORT", result)
+    return result
+
+
+def list_reports(
+    service: str, date: str, bucket: Optional[str] = None, s3=None
+) -> List[Dict[str, str]]:
+    """Reports for ``service`` on ``date`` (YYYY-MM-DD), oldest first, from the index keys."""
+    bucket = bucket or REPORTS_BUCKET
+    s3 = s3 or tracing.instrument_client(boto3.client("s3"))
+    prefix = f"index/{service}/{date}/"
+    reports, token = [], None
+    while True:
+        kwargs = {"Bucket": bucket, "Prefix": prefix}
+        if token:
+            kwargs["ContinuationToken"] = token
+        page = s3.list_objects_v2(**kwargs)
+        for obj in page.get("Contents", []):
+            time_part, incident_id = obj["Key"][len(prefix) :].removesuffix(".json").split("_", 1)
+            reports.append(
+                {
+                    "incident_id": incident_id,
+                    "detected_at": f"{date}T{time_part[:2]}:{time_part[2:4]}:{time_part[4:]}Z",
+                    "index_key": obj["Key"],
+                    "report_s3_uri": f"s3://{bucket}/{incident_id}/rca.md",
+                }
+            )
+        if not page.get("IsTruncated"):
+            return reports
+        token = page["NextContinuationToken"]
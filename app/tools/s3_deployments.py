@@ -1 +1,272 @@
-#!/usr/bin/env python3
+"""get_deployments — deployment history from S3, cached per container.
+
+Deploy history lives in ``MOCK_DATA_BUCKET``. Every key holds
+``{"deployments": [...]}``, and ``DEPLOY_KEY_LAYOUT`` selects the layout:
+  single   deployments/deploy-history.json             (tools.md Tool 10)
+  daily    deployments/<YYYY-MM-DD>.json               one key per UTC day
+  service  deployments/<service>/<YYYY-MM-DD>.json     one key per service per day
+
+With the daily and service layouts, only keys whose day overlaps the
+requested window are fetched. Asking the service layout for all services
+costs one extra LIST.
+
+Parsed keys are kept in memory as a ``DeployIndex``, timestamp-sorted per
+service, together with their ETag. Once ``REVALIDATE_SECONDS`` have passed,
+a cached key is revalidated with a conditional GET (``IfNoneMatch``). A
+``304`` keeps the parsed index, so a warm container downloads and parses a
+key again only when it changed. Missing keys are cached as empty.
+"""
+
+import bisect
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+from app.tools import deadline, timeutil, tracing
+
+logger = logging.getLogger(__name__)
+
+MOCK_DATA_BUCKET = os.getenv("MOCK_DATA_BUCKET", "aic-mock-data")
+DEPLOY_KEY_LAYOUT = os.getenv("DEPLOY_KEY_LAYOUT", "single")
+DEPLOY_HISTORY_KEY = "deployments/deploy-history.json"
+REVALIDATE_SECONDS = float(os.getenv("AIC_DEPLOY_REVALIDATE_SECONDS", "60"))
+LAYOUTS = ("single", "daily", "service")
+# tools.md Tool 10: config keys that make a deploy high risk
+RISKY_CONFIG_KEYWORDS = ("pool", "connection", "timeout", "memory", "limit")
+
+
+def _iso(dt: datetime.datetime) -> str:
+    return dt.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class DeployIndex:
+    """Deployments grouped by service, sorted by timestamp, for range lookups."""
+
+    __slots__ = ("_times", "_records")
+
+    def __init__(self, deployments: List[Dict[str, Any]]):
+        by_service: Dict[str, List[Tuple[str, Dict]]] = {}
+        for d in deployments:
+            # Normalized so timestamps compare as strings.
+            record = {**d, "timestamp": _iso(timeutil.parse_iso(d["timestamp"]))}
+            record.setdefault("message", record.get("change_summary", ""))
+            by_service.setdefault(record.get("service", ""), []).append(
+                (record["timestamp"], record)
+            )
+        self._times: Dict[str, List[str]] = {}
+        self._records: Dict[str, List[Dict]] = {}
+        for service, rows in by_service.items():
+            rows.sort(key=lambda r: r[0])
+            self._times[service] = [t for t, _ in rows]
+            self._records[service] = [r for _, r in rows]
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._records.values())
+
+    def between(self, service: Optional[str], start: str, end: str) -> List[Dict]:
+        """Deployments in ``[start, end]`` (oldest first); ``service=None`` means all."""
+        services = self._records if service is None else [service]
+        found: List[Dict] = []
+        for name in services:
+            times = self._times.get(name)
+            if not times:
+                continue
+            lo = bisect.bisect_left(times, start)
+            hi = bisect.bisect_right(times, end)
+            found.extend(self._records[name][lo:hi])
+        if service is None:
+            found.sort(key=lambda d: d["timestamp"])
+        return found
+
+
+class CachedS3Objects:
+    """Parsed S3 objects kept in memory and revalidated by ETag."""
+
+    def __init__(self, s3=None, revalidate_seconds: float = REVALIDATE_SECONDS):
+        self._s3 = s3
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+        # (bucket, key) -> {"etag", "value", "checked"}
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.downloads = 0
+        self.not_modified = 0
+
+    def _client(self):
+        # Only built when a request is actually needed; cache hits make no client.
+        return self._s3 or tracing.instrument_client(boto3.client("s3"))
+
+    def get(self, bucket: str, key: str, parse: Callable[[bytes], Any], missing: Any = None) -> Any:
+        """Parsed content of ``s3://bucket/key``; ``missing`` if it does not exist."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((bucket, key))
+        if entry is not None and now - entry["checked"] < self.revalidate_seconds:
+            return entry["value"]
+
+        kwargs = {"Bucket": bucket, "Key": key}
+        if entry is not None and entry["etag"]:
+            kwargs["IfNoneMatch"] = entry["etag"]
+        try:
+            response = self._client().get_object(**kwargs)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("304", "NotModified"):
+                self.not_modified += 1
+                fresh = {**entry, "checked": now}
+            elif code in ("NoSuchKey", "404"):
+                fresh = {"etag": None, "value": missing, "checked": now}
+            else:
+                raise
+        else:
+            self.downloads += 1
+            fresh = {
+                "etag": response.get("ETag"),
+                "value": parse(response["Body"].read()),
+                "checked": now,
+            }
+        with self._lock:
+            self._entries[(bucket, key)] = fresh
+        return fresh["value"]
+
+    def list_keys(self, bucket: str, prefix: str) -> List[str]:
+        s3, keys, kwargs = self._client(), [], {"Bucket": bucket, "Prefix": prefix}
+        while True:
+            page = s3.list_objects_v2(**kwargs)
+            keys.extend(obj["Key"] for obj in page.get("Contents", []))
+            if not page.get("IsTruncated"):
+                return keys
+            kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _parse_history(body: bytes) -> DeployIndex:
+    return DeployIndex(json.loads(body).get("deployments", []))
+
+
+_EMPTY = DeployIndex([])
+
+
+class DeploymentSource:
+    """Deploy history for one bucket and key layout."""
+
+    def __init__(
+        self,
+        bucket: str = MOCK_DATA_BUCKET,
+        layout: str = DEPLOY_KEY_LAYOUT,
+        cache: Optional[CachedS3Objects] = None,
+    ):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown deploy key layout '{layout}', expected one of {LAYOUTS}")
+        self.bucket = bucket
+        self.layout = layout
+        self.cache = cache or CachedS3Objects()
+
+    def keys(self, service: Optional[str], start: str, end: str) -> List[str]:
+        """The S3 keys that can hold deploys for ``service`` within ``[start, end]``."""
+        if self.layout == "single":
+            return [DEPLOY_HISTORY_KEY]
+        day, last = timeutil.parse_iso(start).date(), timeutil.parse_iso(end).date()
+        days = []
+        while day <= last:
+            days.append(day.isoformat())
+            day += datetime.timedelta(days=1)
+        if self.layout == "daily":
+            return [f"deployments/{d}.json" for d in days]
+        if service is None:
+            # Per-service keys for every service: one LIST to find them.
+            suffixes = tuple(f"/{d}.json" for d in days)
+            return [
+                k
+                for k in self.cache.list_keys(self.bucket, "deployments/")
+                if k.count("/") == 2 and k.endswith(suffixes)
+            ]
+        return [f"deployments/{service}/{d}.json" for d in days]
+
+    def between(self, service: Optional[str], start: str, end: str) -> List[Dict]:
+        """Deployments for ``service`` (all services if None) in the window, oldest first."""
+        start, end = _iso(timeutil.parse_iso(start)), _iso(timeutil.parse_iso(end))
+        keys = self.keys(service, start, end)
+        found: List[Dict] = []
+        for key in keys:
+            deadline.check(f"deploy history s3://{self.bucket}/{key}")
+            index = self.cache.get(self.bucket, key, _parse_history, missing=_EMPTY)
+            found.extend(index.between(service, start, end))
+        if service is None and len(keys) > 1:
+            found.sort(key=lambda d: d["timestamp"])
+        return found
+
+
+def _risky_keys(deploy: Dict[str, Any]) -> List[str]:
+    return [
+        key
+        for key in deploy.get("config_diff") or {}
+        if any(keyword in key.lower() for keyword in RISKY_CONFIG_KEYWORDS)
+    ]
+
+
+def _risk_flag(deploy: Dict[str, Any], risky_keys: List[str]) -> Optional[str]:
+    if deploy.get("risk_flag"):
+        return deploy["risk_flag"]
+    for keyword in RISKY_CONFIG_KEYWORDS:
+        if any(keyword in key.lower() for key in risky_keys):
+            return f"CONFIG_CHANGE_{keyword.upper()}"
+    return None
+
+
+_default_source = None
+_default_source_lock = threading.Lock()
+
+
+def default_source() -> DeploymentSource:
+    """Process-wide source, so the parsed history survives across invocations."""
+    global _default_source
+    with _default_source_lock:
+        if _default_source is None:
+            _default_source = DeploymentSource()
+        return _default_source
+
+
+def get_deployments(
+    service: str,
+    time_window: Dict[str, str],
+    include_all_services: bool = False,
+    incident_time: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Deployments for ``service`` within ``time_window`` (tools.md Tool 10).
+
+    Most recent first, each with ``minutes_before_incident`` (measured from
+    ``incident_time``, default the window end), ``risk_flag`` and ``message``,
+    which is the shape ``correlate_deploy_to_incident`` takes.
+    """
+    source = default_source()
+    with tracing.span("deploy.history", kind="internal"):
+        deploys = source.between(
+            None if include_all_services else service, time_window["start"], time_window["end"]
+        )
+    reference = timeutil.parse_iso(incident_time or time_window["end"])
+    results, risk = [], {}
+    for d in reversed(deploys):
+        minutes = (reference - timeutil.parse_iso(d["timestamp"])).total_seconds() / 60
+        risky_keys = _risky_keys(d)
+        risk[d["deploy_id"]] = len(risky_keys)
+        results.append(
+            {**d, "risk_flag": _risk_flag(d, risky_keys), "minutes_before_incident": round(minutes, 1)}
+        )
+    # Most risky config keys wins; max() keeps the most recent on ties.
+    own = [d for d in results if d.get("service") == service]
+    highest = max(own, key=lambda d: (bool(d["risk_flag"]), risk[d["deploy_id"]]), default={})
+    return {
+        "deployments_found": len(results),
+        "deployments": results,
+        "highest_risk_deploy": highest.get("deploy_id"),
+    }
@@ -0,0 +1,199 @@
+"""Compact, schema-backed encoding for response envelopes.
+
+``build_response_envelope`` dicts are serialized again and again — into
+prompts, logs, state and S3 — and most of those bytes are repeated key names.
+``Envelope`` is a slotted dataclass mirroring the envelope dict; it encodes
+positionally, and a findings list whose dicts all share one key order is
+stored as a key header plus value rows.
+
+Encoding uses msgpack when it is installed, else compact JSON (orjson when
+available, stdlib otherwise). ``unpack`` reads either format, and
+``decode_envelope(encode_envelope(d)) == d`` for any JSON-compatible
+envelope, including unknown extra keys.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+SCHEMA_VERSION = 1
+_STATUSES = ("completed", "no_findings", "failed")
+_ENVELOPE_KEYS = (
+    "agent",
+    "incident_id",
+    "timestamp",
+    "status",
+    "findings",
+    "summary",
+    "metadata",
+    "error",
+)
+
+
+@dataclass(slots=True)
+class EnvelopeMetadata:
+    execution_time_ms: int = 0
+    findings_count: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "EnvelopeMetadata":
+        extra = {k: v for k, v in d.items() if k not in ("execution_time_ms", "findings_count")}
+        return cls(d.get("execution_time_ms", 0), d.get("findings_count", 0), extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "execution_time_ms": self.execution_time_ms,
+            "findings_count": self.findings_count,
+            **self.extra,
+        }
+
+
+@dataclass(slots=True)
+class Envelope:
+    """Typed view of a ``build_response_envelope`` dict."""
+
+    agent: str
+    incident_id: str
+    timestamp: str
+    status: str
+    findings: List[Any] = field(default_factory=list)
+    summary: Optional[str] = None
+    metadata: EnvelopeMetadata = field(default_factory=EnvelopeMetadata)
+    error: Optional[str] = None
+    has_error: bool = False  # "error" key present (it is omitted on success)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Envelope":
+        return cls(
+            agent=d["agent"],
+            incident_id=d["incident_id"],
+            timestamp=d["timestamp"],
+            status=d["status"],
+            findings=d.get("findings", []),
+            summary=d.get("summary"),
+            metadata=EnvelopeMetadata.from_dict(d.get("metadata", {})),
+            error=d.get("error"),
+            has_error="error" in d,
+            extra={k: v for k, v in d.items() if k not in _ENVELOPE_KEYS},
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {
+            "agent": self.agent,
+            "incident_id": self.incident_id,
+            "timestamp": self.timestamp,
+            "status": self.status,
+            "findings": self.findings,
+            "summary": self.summary,
+            "metadata": self.metadata.to_dict(),
+        }
+        if self.has_error:
+            d["error"] = self.error
+        d.update(self.extra)
+        return d
+
+    # ── Positional form ────────────────────────────────────────────────────────
+
+    def to_row(self) -> list:
+        status = _STATUSES.index(self.status) if self.status in _STATUSES else self.status
+        return [
+            SCHEMA_VERSION,
+            self.agent,
+            self.incident_id,
+            self.timestamp,
+            status,
+            _pack_rows(self.findings),
+            self.summary,
+            self.metadata.execution_time_ms,
+            self.metadata.findings_count,
+            self.metadata.extra or None,
+            [self.error] if self.has_error else None,
+            self.extra or None,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "Envelope":
+        version, agent, incident_id, timestamp, status, findings, summary, *rest = row
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported envelope schema version {version}")
+        exec_ms, count, meta_extra, error, extra = rest
+        return cls(
+            agent=agent,
+            incident_id=incident_id,
+            timestamp=timestamp,
+            status=_STATUSES[status] if isinstance(status, int) else status,
+            findings=_unpack_rows(findings),
+            summary=summary,
+            metadata=EnvelopeMetadata(exec_ms, count, meta_extra or {}),
+            error=error[0] if error else None,
+            has_error=error is not None,
+            extra=extra or {},
+        )
+
+
+def _pack_rows(items: List[Any]) -> Any:
+    # [[keys...], [values...], ...] when every item is a dict with the same keys.
+    if len(items) < 2 or not all(isinstance(i, dict) for i in items):
+        return {"items": items}
+    keys = list(items[0])
+    if any(list(i) != keys for i in items):
+        return {"items": items}
+    return [keys, *([i[k] for k in keys] for i in items)]
+
+
+def _unpack_rows(packed: Any) -> List[Any]:
+    if isinstance(packed, dict):
+        return packed["items"]
+    keys, *rows = packed
+    return [dict(zip(keys, row)) for row in rows]
+
+
+# ── Bytes ──────────────────────────────────────────────────────────────────────
+
+
+def codec_name() -> str:
+    """The encoding ``pack`` currently produces."""
+    if msgpack is not None:
+        return "msgpack"
+    return "orjson" if orjson is not None else "json"
+
+
+def pack(obj: Any) -> bytes:
+    """Serialize a JSON-compatible list or dict: msgpack if available, else compact JSON."""
+    if msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True, default=str)
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def unpack(data: bytes) -> Any:
+    """Inverse of ``pack`` for lists and dicts; reads either encoding."""
+    data = bytes(data)
+    if data[:1] in (b"[", b"{"):
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    if msgpack is None:
+        raise ValueError("Payload is msgpack-encoded but msgpack is not installed")
+    return msgpack.unpackb(data, raw=False)
+
+
+def encode_envelope(envelope: Dict[str, Any]) -> bytes:
+    """Compact bytes for an envelope dict."""
+    return pack(Envelope.from_dict(envelope).to_row())
+
+
+def decode_envelope(data: bytes) -> Dict[str, Any]:
+    """Envelope dict back from ``encode_envelope`` output."""
+    return Envelope.from_row(unpack(data)).to_dict()
@@ -0,0 +1,355 @@
+"""Similarity index over past incidents — MinHash signatures, LSH buckets.
+
+Each incident in the evidence store becomes a set of feature tokens:
+  svc:<service>     alarm:<metric>     err:<error_code>
+  frame:<stack root frame>   metric:<anomalous metric>   kw:<deploy keyword>
+
+A MinHash signature of ``NUM_PERM`` values approximates Jaccard similarity
+between two sets. The signature is cut into bands of ``ROWS_PER_BAND``
+values, and incidents that agree on a whole band share a bucket. A query
+hashes its own tokens, gathers the incidents in its buckets, and ranks only
+those candidates by exact Jaccard. The cost stays at a few dozen dict
+lookups however many incidents are indexed. With 32 bands of 3 rows, a
+pair at Jaccard 0.5 becomes a candidate with probability 0.98. A pair at
+0.1 becomes one with probability of about 0.03.
+
+The index is rebuilt from the incident files under ``AIC_EVIDENCE_DIR``.
+It re-reads only files that are new or changed since the last sync, at most
+once every ``SYNC_SECONDS``. Without an evidence store, lookups return no
+matches.
+
+The Commander gets the matches without spending a turn on them. The
+handler looks them up for the alarm and puts them in the opening message
+(``SimilarIncidents.opening``). Once logs_agent's analysis is in,
+``logs_reported`` repeats the lookup with that evidence and adds the
+sharper matches to the tool result as ``similar_incidents``. That result
+is part of the conversation from then on, so the matches are sent once
+and stay in the cached prefix.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.tools import evidence_store, timeutil
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 96
+ROWS_PER_BAND = 3
+MIN_SIMILARITY = 0.3
+SYNC_SECONDS = float(os.getenv("AIC_SIMILARITY_SYNC_SECONDS", "30"))
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x41C)  # fixed seed: signatures must be stable across processes
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_PAYLOAD_COLUMNS = [
+    "incident_id", "detected_at", "root_cause", "recommended_action",
+    "confidence", "top_deploy_id",
+]
+_FEATURE_COLUMNS = [
+    "metric_name", "error_codes", "stack_frames", "anomalous_metrics", "deploy_keywords",
+]
+
+
+def incident_features(
+    service: Optional[str] = None,
+    metric_name: Optional[str] = None,
+    error_codes: Iterable[str] = (),
+    stack_frames: Iterable[str] = (),
+    anomalous_metrics: Iterable[str] = (),
+    deploy_keywords: Iterable[str] = (),
+) -> FrozenSet[str]:
+    """The token set one incident is compared by."""
+    tokens = {f"svc:{service}"} if service else set()
+    if metric_name:
+        tokens.add(f"alarm:{metric_name}")
+    tokens.update(f"err:{code}" for code in error_codes if code)
+    tokens.update(f"frame:{frame}" for frame in stack_frames if frame)
+    tokens.update(f"metric:{name}" for name in anomalous_metrics if name)
+    tokens.update(f"kw:{keyword.lower()}" for keyword in deploy_keywords if keyword)
+    return frozenset(tokens)
+
+
+@lru_cache(maxsize=16384)
+def _token_minhashes(token: str) -> Tuple[int, ...]:
+    # Python's hash() is salted per process; signatures must not be.
+    h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+    return tuple((a * h + b) % _PRIME for a, b in _PERMUTATIONS)
+
+
+def signature(tokens: Iterable[str]) -> Tuple[int, ...]:
+    """MinHash signature of a token set (empty sets get an all-max signature)."""
+    rows = [_token_minhashes(t) for t in tokens]
+    if not rows:
+        return (_PRIME,) * NUM_PERM
+    return tuple(map(min, zip(*rows)))
+
+
+def _bands(sig: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(i, sig[i : i + ROWS_PER_BAND]) for i in range(0, NUM_PERM, ROWS_PER_BAND)]
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class SimilarityIndex:
+    """In-memory MinHash/LSH index of incidents, keyed by incident_id."""
+
+    def __init__(self):
+        self._tokens: Dict[str, FrozenSet[str]] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._keys: Dict[str, List[Tuple[int, Tuple[int, ...]]]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], set] = {}
+        self._files: Dict[str, int] = {}  # path -> mtime_ns at the last sync
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def add(self, incident_id: str, tokens: FrozenSet[str], payload: Dict[str, Any]) -> None:
+        """Index one incident, replacing any earlier entry with the same id."""
+        keys = _bands(signature(tokens))
+        with self._lock:
+            self._remove(incident_id)
+            self._tokens[incident_id] = tokens
+            self._payloads[incident_id] = payload
+            self._keys[incident_id] = keys
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(incident_id)
+
+    def _remove(self, incident_id: str) -> None:
+        for key in self._keys.pop(incident_id, ()):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(incident_id)
+                if not bucket:
+                    del self._buckets[key]
+        self._tokens.pop(incident_id, None)
+        self._payloads.pop(incident_id, None)
+
+    def query(
+        self,
+        tokens: FrozenSet[str],
+        top_k: int = 3,
+        min_similarity: float = MIN_SIMILARITY,
+        exclude: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Up to ``top_k`` indexed incidents most similar to ``tokens``, best first."""
+        if not tokens:
+            return []
+        keys = _bands(signature(tokens))
+        with self._lock:
+            candidates = set()
+            for key in keys:
+                candidates.update(self._buckets.get(key, ()))
+            candidates.discard(exclude)
+            scored = [(_jaccard(tokens, self._tokens[c]), c) for c in candidates]
+            scored = sorted((s for s in scored if s[0] >= min_similarity), reverse=True)[:top_k]
+            return [
+                {
+                    **self._payloads[c],
+                    "similarity": round(score, 3),
+                    "shared_features": sorted(tokens & self._tokens[c]),
+                }
+                for score, c in scored
+            ]
+
+    def sync(self, store: "evidence_store.EvidenceStore") -> int:
+        """Index incident files that are new or changed since the last sync; returns how many."""
+        root = store.root / "incidents"
+        if pq is None or not root.exists():
+            return 0
+        changed = []
+        for service_dir in os.scandir(root):
+            if not service_dir.is_dir() or not service_dir.name.startswith("service="):
+                continue
+            service = service_dir.name[len("service="):]
+            for date_dir in os.scandir(service_dir.path):
+                if not date_dir.is_dir():
+                    continue
+                for entry in os.scandir(date_dir.path):
+                    if not entry.name.endswith(".parquet") or entry.name.startswith("."):
+                        continue
+                    mtime = entry.stat().st_mtime_ns
+                    if self._files.get(entry.path) != mtime:
+                        changed.append((entry.path, mtime, service))
+        for path, mtime, service in changed:
+            # Read only the columns the index needs. Files written before a
+            # column existed are read without it.
+            try:
+                names = set(pq.read_schema(path).names)
+                columns = [c for c in _PAYLOAD_COLUMNS + _FEATURE_COLUMNS if c in names]
+                rows = pq.read_table(path, columns=columns).to_pylist()
+            except (OSError, ValueError) as e:  # corrupt, or still being written
+                # Marked as seen; a rewrite changes its mtime and it is read again.
+                logger.warning("Skipping unreadable incident file %s: %s", path, e)
+                self._files[path] = mtime
+                continue
+            for row in rows:
+                detected_ms = timeutil.to_epoch_ms(row.get("detected_at"))
+                self.add(
+                    row["incident_id"],
+                    incident_features(
+                        service,
+                        row.get("metric_name"),
+                        row.get("error_codes") or (),
+                        row.get("stack_frames") or (),
+                        row.get("anomalous_metrics") or (),
+                        row.get("deploy_keywords") or (),
+                    ),
+                    {
+                        "incident_id": row["incident_id"],
+                        "service": service,
+                        "detected_at": timeutil.iso_from_ms(detected_ms) if detected_ms is not None else None,
+                        "root_cause": row.get("root_cause"),
+                        "recommended_action": row.get("recommended_action"),
+                        "confidence": row.get("confidence"),
+                        "top_deploy_id": row.get("top_deploy_id"),
+                    },
+                )
+            self._files[path] = mtime
+        return len(changed)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+_last_sync = float("-inf")
+
+
+def default_index() -> Optional[SimilarityIndex]:
+    """Process-wide index over the default evidence store, or None when it is disabled."""
+    global _default_index, _last_sync
+    store = evidence_store.default_store()
+    if store is None:
+        return None
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = SimilarityIndex()
+        now = time.monotonic()
+        if now - _last_sync >= SYNC_SECONDS:
+            _default_index.sync(store)
+            _last_sync = now
+        return _default_index
+
+
+def lookup(
+    incident: Dict[str, Any],
+    error_codes: Iterable[str] = (),
+    stack_frames: Iterable[str] = (),
+    anomalous_metrics: Iterable[str] = (),
+    deploy_keywords: Iterable[str] = (),
+    top_k: int = 3,
+) -> List[Dict[str, Any]]:
+    """Past incidents most like ``incident`` (a parse_alarm_event context) plus the given features."""
+    index = default_index()
+    if index is None:
+        return []
+    tokens = incident_features(
+        incident.get("service"),
+        incident.get("metric_name"),
+        error_codes,
+        stack_frames,
+        anomalous_metrics,
+        deploy_keywords,
+    )
+    return index.query(tokens, top_k=top_k, exclude=incident.get("incident_id"))
+
+
+def similar_incidents(
+    incident: Dict[str, Any], findings: Optional[List[Dict]] = None, top_k: int = 3
+) -> List[Dict[str, Any]]:
+    """``lookup`` with the features taken from sub-agent response envelopes.
+
+    Matching on the alarm alone is coarse, and each envelope that is already
+    available sharpens it.
+    """
+    row = evidence_store.evidence_rows(
+        {"incident_id": incident.get("incident_id", "INC-UNKNOWN"), **incident},
+        {"findings": findings or []},
+    )["incidents"][0]
+    return lookup(
+        incident,
+        row["error_codes"],
+        row["stack_frames"],
+        row["anomalous_metrics"],
+        row["deploy_keywords"],
+        top_k=top_k,
+    )
+
+
+def similar_incidents_prompt(matches: List[Dict[str, Any]]) -> str:
+    """``matches`` as a paragraph for the Commander's opening message; "" when empty."""
+    if not matches:
+        return ""
+    return (
+        "Past incidents that look like this alarm, best first:\n\n"
+        f"```json\n{json.dumps(matches, indent=2, default=str)}\n```"
+    )
+
+
+class SimilarIncidents:
+    """Similar past incidents for one incident run.
+
+    ``opening`` is the paragraph for the opening message, from the alarm alone.
+    """
+
+    def __init__(self, incident: Dict[str, Any]):
+        self.incident = incident
+        self.opening = similar_incidents_prompt(self.lookup())
+
+    def lookup(self, findings: Optional[List[Dict]] = None) -> List[Dict[str, Any]]:
+        # Only a hint: a bad history file or malformed evidence must not fail the incident.
+        try:
+            return similar_incidents(self.incident, findings)
+        except Exception as e:
+            logger.warning("Similar-incident lookup failed for %s: %s", self.incident.get("incident_id"), e)
+            return []
+
+
+_current: contextvars.ContextVar[Optional[SimilarIncidents]] = contextvars.ContextVar(
+    "aic_similar_incidents", default=None
+)
+
+
+@contextlib.contextmanager
+def incident(matches: SimilarIncidents):
+    """Make ``matches`` current for one incident run. Yields it."""
+    token = _current.set(matches)
+    try:
+        yield matches
+    finally:
+        _current.reset(token)
+
+
+async def logs_reported(tool, args, tool_context, tool_response):
+    """after_tool_callback for logs_agent: add matches sharpened by its evidence to its result."""
+    matches = _current.get()
+    if (
+        matches is None
+        or not isinstance(tool_response, dict)
+        or tool_response.get("agent") != "logs_agent"
+        or tool_response.get("status") != "completed"
+    ):
+        return None
+    found = await asyncio.to_thread(matches.lookup, [tool_response])
+    return {**tool_response, "similar_incidents": found} if found else None
@@ -1 +1,250 @@
-#!/usr/bin/env python3
+"""Incident state in DynamoDB — save_state / load_state with write-behind batching.
+
+Items live in the ``AIC-IncidentState`` table (tools.md Tools 2-3):
+  PK = INCIDENT#<incident_id>
+  SK = <entity_type>#<timestamp>     e.g. FINDING#logs_agent#2026-02-06T14:31:00.123456Z
+
+``save_state`` never touches the network: it buffers the item and returns.
+A background writer drains the buffer with ``BatchWriteItem`` (25 items per
+call), retrying ``UnprocessedItems`` with backoff, so state writes stay off
+the investigation path. ``flush_state`` blocks until everything buffered is
+durable — the handler calls it before the Lambda returns — and returns False
+if any batch was dropped since the last flush. ``load_state`` is a
+single-partition ``Query`` and waits for that incident's writes first so reads
+see their own writes.
+
+Without ``STATE_TABLE_NAME`` the store is a process-local stand-in, for local
+runs and tests only; inside Lambda a missing table name is an error.
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+logger = logging.getLogger(__name__)
+
+STATE_TABLE_NAME = os.getenv("STATE_TABLE_NAME")
+LOCAL_TABLE_NAME = "AIC-IncidentState"
+BATCH_SIZE = 25  # BatchWriteItem limit
+MAX_RETRIES = 8
+RETRY_BASE_SECONDS = 0.05
+RETRY_MAX_SECONDS = 1.0
+
+
+def _pk(incident_id: str) -> str:
+    return f"INCIDENT#{incident_id}"
+
+
+def _to_dynamo(data: Dict) -> Dict:
+    # The resource API rejects floats; round-trip through JSON into Decimals.
+    return json.loads(json.dumps(data, default=str), parse_float=Decimal)
+
+
+def _from_dynamo(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: _from_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_dynamo(v) for v in value]
+    return value
+
+
+class StateStore:
+    """Buffered writer and reader for one incident-state table."""
+
+    def __init__(self, table_name: str, dynamodb=None, batch_size: int = BATCH_SIZE):
+        self.table_name = table_name
+        self.batch_size = min(batch_size, BATCH_SIZE)
+        self._dynamodb = dynamodb or boto3.resource("dynamodb")
+        self._table = self._dynamodb.Table(table_name)
+        self._cond = threading.Condition()
+        # incident_id -> items not yet handed to the writer, in save order
+        self._buffers: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._pending: Dict[str, int] = {}  # incident_id -> items not yet durable
+        self._failed: Dict[str, int] = {}  # incident_id -> items dropped since the last flush
+        self._writer: Optional[threading.Thread] = None
+        self.failed_items = 0
+
+    # ── Writes ─────────────────────────────────────────────────────────────────
+
+    def save(
+        self, incident_id: str, entity_type: str, data: Dict, timestamped: bool = True
+    ) -> Dict[str, str]:
+        """Buffer one entity and return its key. Returns before the write happens."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        created_at = now.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        key = {
+            "PK": _pk(incident_id),
+            "SK": f"{entity_type}#{created_at}" if timestamped else entity_type,
+        }
+        item = {**_to_dynamo(data), **key, "created_at": created_at}
+        with self._cond:
+            self._buffers.setdefault(incident_id, []).append(item)
+            self._pending[incident_id] = self._pending.get(incident_id, 0) + 1
+            self._ensure_writer()
+            self._cond.notify_all()
+        return key
+
+    def flush(self, incident_id: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Wait until buffered items (for one incident, or all) are written.
+
+        Returns False on timeout, or if any of those items were dropped after
+        their retries ran out since the last flush.
+        """
+        if not self._wait(incident_id, timeout):
+            return False
+        with self._cond:
+            if incident_id:
+                dropped = self._failed.pop(incident_id, 0)
+            else:
+                dropped, self._failed = sum(self._failed.values()), {}
+        if dropped:
+            logger.error("State flush: %d items were dropped and are not in DynamoDB", dropped)
+            return False
+        return True
+
+    def _wait(self, incident_id: Optional[str], timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                outstanding = (
+                    self._pending.get(incident_id, 0)
+                    if incident_id
+                    else sum(self._pending.values())
+                )
+                if not outstanding:
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    logger.warning("State flush timed out with %d items pending", outstanding)
+                    return False
+                self._cond.wait(remaining)
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(
+                target=self._drain, name="state-store-writer", daemon=True
+            )
+            self._writer.start()
+
+    def _next_batch(self) -> List[Dict]:
+        # Fill one BatchWriteItem call, oldest incident first.
+        batch: List[Dict] = []
+        while self._buffers and len(batch) < self.batch_size:
+            incident_id, items = next(iter(self._buffers.items()))
+            take = self.batch_size - len(batch)
+            batch.extend((incident_id, item) for item in items[:take])
+            del items[:take]
+            if not items:
+                del self._buffers[incident_id]
+        return batch
+
+    def _drain(self) -> None:
+        while True:
+            with self._cond:
+                while not self._buffers:
+                    self._cond.wait()
+                batch = self._next_batch()
+            failed = False
+            try:
+                self._write_batch([item for _, item in batch])
+            except Exception as e:
+                self.failed_items += len(batch)
+                logger.error("Dropped %d state items: %s", len(batch), e)
+                failed = True
+            with self._cond:
+                for incident_id, _ in batch:
+                    if failed:
+                        self._failed[incident_id] = self._failed.get(incident_id, 0) + 1
+                    self._pending[incident_id] -= 1
+                    if not self._pending[incident_id]:
+                        del self._pending[incident_id]
+                self._cond.notify_all()
+
+    def _write_batch(self, items: List[Dict]) -> None:
+        # BatchWriteItem rejects duplicate keys in one call; the last save wins.
+        unique = {(item["PK"], item["SK"]): item for item in items}
+        requests = [{"PutRequest": {"Item": item}} for item in unique.values()]
+        for attempt in range(MAX_RETRIES + 1):
+            response = self._dynamodb.batch_write_item(
+                RequestItems={self.table_name: requests}
+            )
+            requests = response.get("UnprocessedItems", {}).get(self.table_name, [])
+            if not requests:
+                return
+            time.sleep(min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt))
+        raise RuntimeError(f"{len(requests)} items still unprocessed after {MAX_RETRIES} retries")
+
+    # ── Reads ──────────────────────────────────────────────────────────────────
+
+    def load(
+        self, incident_id: str, entity_prefix: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Entities for one incident in SK order, optionally filtered by SK prefix."""
+        self._wait(incident_id, None)
+        condition = Key("PK").eq(_pk(incident_id))
+        if entity_prefix:
+            condition = condition & Key("SK").begins_with(entity_prefix)
+        items: List[Dict] = []
+        kwargs: Dict[str, Any] = {"KeyConditionExpression": condition, "ScanIndexForward": True}
+        while True:
+            if limit is not None:
+                kwargs["Limit"] = limit - len(items)
+            response = self._table.query(**kwargs)
+            items.extend(_from_dynamo(i) for i in response.get("Items", []))
+            if "LastEvaluatedKey" not in response or (limit is not None and len(items) >= limit):
+                return items
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store() -> StateStore:
+    """DynamoDB when ``STATE_TABLE_NAME`` is set, otherwise a process-local stand-in.
+
+    Raises RuntimeError inside Lambda without ``STATE_TABLE_NAME``: state kept
+    in a container's memory would be lost with it.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            if STATE_TABLE_NAME:
+                _default_store = StateStore(STATE_TABLE_NAME)
+            elif os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+                raise RuntimeError("STATE_TABLE_NAME is not set; incident state has nowhere to go")
+            else:
+                from app.local.dynamodb import LocalDynamoDB
+
+                _default_store = StateStore(LOCAL_TABLE_NAME, dynamodb=LocalDynamoDB())
+        return _default_store
+
+
+def save_state(
+    incident_id: str, entity_type: str, data: Dict, timestamped: bool = True
+) -> Dict[str, str]:
+    """Buffer an entity for ``incident_id`` (tools.md Tool 2). Returns its PK/SK."""
+    return default_store().save(incident_id, entity_type, data, timestamped)
+
+
+def load_state(
+    incident_id: str, entity_prefix: Optional[str] = None, limit: Optional[int] = None
+) -> List[Dict]:
+    """Read an incident's entities, optionally by SK prefix (tools.md Tool 3)."""
+    return default_store().load(incident_id, entity_prefix, limit)
+
+
+def flush_state(incident_id: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+    """Block until buffered state writes are durable. False on timeout or dropped writes."""
+    return default_store().flush(incident_id, timeout)
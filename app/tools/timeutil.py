@@ -0,0 +1,117 @@
+"""Timestamp parsing shared by the tools, the local stand-ins and the seeders.
+
+Timestamps arrive as ISO-8601 strings (``...Z``, ``+00:00`` or ``+0000``),
+as epoch seconds, milliseconds or nanoseconds, or as datetimes. Internally
+they are epoch milliseconds (UTC ints), which compare and subtract without
+re-parsing. A datetime is built only when an API wants one.
+
+``to_epoch_ms`` and ``parse_iso`` memoize string inputs, because the same
+window bounds and datapoint timestamps are parsed again and again.
+``bulk_epoch_ms`` parses a whole column at once through NumPy ``datetime64``
+when NumPy is installed. Otherwise it uses the memoized scalar path.
+"""
+
+import datetime
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install numpy
+    np = None
+
+CACHE_SIZE = 8192
+BULK_MIN_ITEMS = 64  # below this the NumPy array setup costs more than it saves
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MILLISECOND = datetime.timedelta(milliseconds=1)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_iso(text: str) -> datetime.datetime:
+    """Parse an ISO-8601 timestamp, keeping its offset; naive values are UTC.
+
+    Raises ``ValueError`` for anything that is not an ISO timestamp.
+    """
+    normalized = text.strip()
+    if normalized.endswith("Z"):
+        normalized = normalized[:-1] + "+00:00"
+    elif normalized.endswith("+0000"):
+        normalized = normalized[:-5] + "+00:00"
+    parsed = datetime.datetime.fromisoformat(normalized)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def datetime_to_ms(value: datetime.datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return (value - _EPOCH) // _MILLISECOND
+
+
+def _number_to_ms(value: float) -> int:
+    # Magnitude tells the unit: nanoseconds, milliseconds, else seconds.
+    if value > 1e14:
+        return int(value / 1e6)
+    if value > 1e12:
+        return int(value)
+    return int(value * 1000)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _text_to_ms(text: str) -> Optional[int]:
+    if not text.strip():
+        return None
+    try:
+        return datetime_to_ms(parse_iso(text))
+    except ValueError:
+        pass
+    try:
+        return _number_to_ms(float(text))
+    except ValueError:
+        return None
+
+
+def to_epoch_ms(value: Any) -> Optional[int]:
+    """Epoch milliseconds for an ISO string, epoch number or datetime; None if unparseable."""
+    if isinstance(value, str):
+        return _text_to_ms(value)
+    if isinstance(value, datetime.datetime):
+        return datetime_to_ms(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _number_to_ms(float(value))
+    return None
+
+
+def from_epoch_ms(ms: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(milliseconds=ms)
+
+
+def iso_from_ms(ms: int) -> str:
+    """``YYYY-MM-DDTHH:MM:SSZ``, the format the mock data and tool windows use."""
+    return from_epoch_ms(ms).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def bulk_epoch_ms(values: Sequence[Any]) -> List[Optional[int]]:
+    """``to_epoch_ms`` over a column of timestamps.
+
+    If every value is a UTC ``...Z`` string, NumPy parses the column in one
+    call. Mixed offsets, numbers and bad values take the scalar path.
+    """
+    if (
+        np is not None
+        and len(values) >= BULK_MIN_ITEMS
+        and all(isinstance(v, str) and v.endswith("Z") for v in values)
+    ):
+        try:
+            parsed = np.array([v[:-1] for v in values], dtype="datetime64[ms]")
+        except ValueError:
+            pass
+        else:
+            missing = np.isnat(parsed).tolist()
+            return [
+                None if nat else ms
+                for ms, nat in zip(parsed.astype("int64").tolist(), missing)
+            ]
+    return [to_epoch_ms(v) for v in values]
@@ -0,0 +1,390 @@
+"""Span tracing for the incident pipeline.
+
+Records where an investigation spends its time: Commander phases
+(DETECT → PLAN → INVESTIGATE → DECIDE → REPORT), sub-agent runs, tool calls,
+AWS API calls and LLM calls, with token counts and bytes transferred.
+Each LLM span splits its input tokens into ``cached_input_tokens`` (read
+from the prompt cache) and ``uncached_input_tokens``.
+
+Tracing is off unless ``AIC_TRACE=1``. When off, every entry point returns
+after a single ContextVar lookup, so the hooks can stay wired in production.
+Finished traces are written as JSON to ``AIC_TRACE_DIR``.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENABLED = os.getenv("AIC_TRACE", "0") == "1"
+TRACE_DIR = os.getenv("AIC_TRACE_DIR", "/tmp/aic-traces")
+
+PHASES = ("DETECT", "PLAN", "INVESTIGATE", "DECIDE", "REPORT")
+
+# (event part, function name) → phase entered when the Commander emits it.
+_PHASE_TRIGGERS = {
+    ("response", "parse_alarm"): "PLAN",
+    ("call", "transfer_to_agent"): "INVESTIGATE",
+    ("call", "compute_confidence_score"): "DECIDE",
+    ("call", "generate_rca_markdown"): "REPORT",
+}
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "aic_trace", default=None
+)
+_NOOP = contextlib.nullcontext()
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attrs")
+
+    def __init__(self, name: str, kind: str, parent_id: Optional[str], attrs: Dict):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attrs = attrs
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """All spans recorded for one incident run."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.spans: List[Span] = []
+        self.phase: Optional[str] = None
+        self._t0_ns = time.perf_counter_ns()
+        self._open: List[Span] = []
+        self._pending: Dict[Any, Span] = {}
+        self._phase_span: Optional[Span] = None
+        self.file: Optional[str] = None
+        self._end_ns: Optional[int] = None
+
+    def start_span(self, name: str, kind: str = "internal", **attrs) -> Span:
+        parent = self._open[-1] if self._open else self._phase_span
+        span = Span(name, kind, parent.span_id if parent else None, attrs)
+        if self.phase:
+            span.attrs.setdefault("phase", self.phase)
+        self.spans.append(span)
+        self._open.append(span)
+        return span
+
+    def end_span(self, span: Span, **attrs) -> None:
+        if span.end_ns is not None:
+            return
+        span.end_ns = time.perf_counter_ns()
+        span.attrs.update(attrs)
+        try:
+            self._open.remove(span)
+        except ValueError:
+            pass
+
+    def enter_phase(self, phase: str) -> None:
+        """Close the current phase span and open one for ``phase``."""
+        if phase == self.phase:
+            return
+        if self._phase_span is not None:
+            self._phase_span.end_ns = time.perf_counter_ns()
+        self.phase = phase
+        self._phase_span = Span(phase, "phase", None, {})
+        self.spans.append(self._phase_span)
+
+    def finish(self) -> None:
+        for span in reversed(list(self._open)):
+            self.end_span(span, incomplete=True)
+        self._end_ns = time.perf_counter_ns()
+        if self._phase_span is not None and self._phase_span.end_ns is None:
+            self._phase_span.end_ns = self._end_ns
+
+    def summary(self) -> Dict[str, Any]:
+        phases: Dict[str, float] = {}
+        by_kind: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            if span.kind == "phase":
+                phases[span.name] = round(phases.get(span.name, 0.0) + span.duration_ms, 1)
+                continue
+            totals = by_kind.setdefault(span.kind, {"calls": 0, "duration_ms": 0.0})
+            totals["calls"] += 1
+            totals["duration_ms"] += span.duration_ms
+            for key in (
+                "input_tokens",
+                "output_tokens",
+                "cached_input_tokens",
+                "uncached_input_tokens",
+                "bytes_sent",
+                "bytes_received",
+            ):
+                if key in span.attrs:
+                    totals[key] = totals.get(key, 0) + (span.attrs[key] or 0)
+        for totals in by_kind.values():
+            totals["duration_ms"] = round(totals["duration_ms"], 1)
+            if totals.get("input_tokens"):
+                totals["cache_hit_ratio"] = round(
+                    totals.get("cached_input_tokens", 0) / totals["input_tokens"], 3
+                )
+        end_ns = self._end_ns or time.perf_counter_ns()
+        summary = {
+            "trace_id": self.trace_id,
+            "duration_ms": round((end_ns - self._t0_ns) / 1e6, 1),
+            "phases": phases,
+            **by_kind,
+        }
+        if self.file:
+            summary["trace_file"] = self.file
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "summary": self.summary(),
+            "spans": [
+                {
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "kind": s.kind,
+                    "start_ms": round((s.start_ns - self._t0_ns) / 1e6, 3),
+                    "duration_ms": round(s.duration_ms, 3),
+                    "attrs": s.attrs,
+                }
+                for s in self.spans
+            ],
+        }
+
+    def export(self, directory: Optional[str] = None) -> str:
+        directory = directory or TRACE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.trace_id}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        self.file = path
+        return path
+
+
+# ── Trace lifecycle ────────────────────────────────────────────────────────────
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def trace_incident(trace_id: str, enabled: Optional[bool] = None, export: bool = True):
+    """Collect spans for one incident run. Yields the Trace, or None if disabled."""
+    if not (TRACE_ENABLED if enabled is None else enabled):
+        yield None
+        return
+    trace = Trace(trace_id)
+    token = _current_trace.set(trace)
+    trace.enter_phase(PHASES[0])
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        _current_trace.reset(token)
+        if export:
+            try:
+                trace.export()
+            except OSError as e:
+                logger.warning("Could not write trace %s: %s", trace_id, e)
+
+
+def span(name: str, kind: str = "internal", **attrs):
+    """Context manager that records a span under the current trace (if any)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return _span(trace, name, kind, attrs)
+
+
+@contextlib.contextmanager
+def _span(trace: Trace, name: str, kind: str, attrs: Dict):
+    s = trace.start_span(name, kind, **attrs)
+    try:
+        yield s
+    except Exception as e:
+        s.attrs["error"] = str(e)
+        raise
+    finally:
+        trace.end_span(s)
+
+
+def enter_phase(phase: str) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.enter_phase(phase)
+
+
+def observe_event(event: Any) -> Optional[str]:
+    """Advance the Commander phase from a runner event. Returns the new phase, if any."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    phase = phase_for_event(event, trace.phase)
+    if phase:
+        trace.enter_phase(phase)
+    return phase
+
+
+def phase_for_event(event: Any, current: Optional[str]) -> Optional[str]:
+    """Return the phase an ADK event moves the run into, or None if unchanged."""
+    triggered = [
+        _PHASE_TRIGGERS.get(("call", c.name)) for c in event.get_function_calls()
+    ] + [
+        _PHASE_TRIGGERS.get(("response", r.name))
+        for r in event.get_function_responses()
+    ]
+    current_idx = PHASES.index(current) if current in PHASES else -1
+    best = None
+    for phase in triggered:
+        if phase and PHASES.index(phase) > current_idx:
+            best = phase
+            current_idx = PHASES.index(phase)
+    return best
+
+
+# ── AWS API calls ──────────────────────────────────────────────────────────────
+
+
+def instrument_client(client):
+    """Register botocore hooks that record a span per API call on ``client``."""
+    events = getattr(getattr(client, "meta", None), "events", None)
+    if events is None:
+        return client
+    # register_first on the wildcard node so we run ahead of handlers that
+    # short-circuit before-call (e.g. botocore's Stubber).
+    events.register_first("before-call.*.*", _before_aws_call)
+    events.register_first("after-call.*.*", _after_aws_call)
+    events.register_first("after-call-error.*.*", _after_aws_call_error)
+    return client
+
+
+def _before_aws_call(model=None, params=None, context=None, **kwargs):
+    trace = _current_trace.get()
+    if trace is None or context is None:
+        return None
+    body = (params or {}).get("body") or b""
+    if isinstance(body, dict):
+        body = urlencode(body, doseq=True)
+    sent = len(body) if isinstance(body, (bytes, bytearray, str)) else 0
+    context["aic_span"] = trace.start_span(
+        f"{model.service_model.service_name}.{model.name}", kind="aws", bytes_sent=sent
+    )
+    return None
+
+
+def _after_aws_call(http_response=None, context=None, **kwargs):
+    trace = _current_trace.get()
+    s = (context or {}).pop("aic_span", None)
+    if trace is None or s is None:
+        return
+    headers = getattr(http_response, "headers", None) or {}
+    received = int(headers.get("content-length") or 0)
+    trace.end_span(
+        s,
+        bytes_received=received,
+        status_code=getattr(http_response, "status_code", None),
+    )
+
+
+def _after_aws_call_error(exception=None, context=None, **kwargs):
+    trace = _current_trace.get()
+    s = (context or {}).pop("aic_span", None)
+    if trace is not None and s is not None:
+        trace.end_span(s, error=str(exception))
+
+
+# ── ADK agent callbacks ────────────────────────────────────────────────────────
+
+
+def agent_started(callback_context):
+    trace = _current_trace.get()
+    if trace is not None:
+        key = ("agent", callback_context.invocation_id, callback_context.agent_name)
+        trace._pending[key] = trace.start_span(callback_context.agent_name, kind="agent")
+    return None
+
+
+def agent_finished(callback_context):
+    trace = _current_trace.get()
+    if trace is not None:
+        key = ("agent", callback_context.invocation_id, callback_context.agent_name)
+        s = trace._pending.pop(key, None)
+        if s is not None:
+            trace.end_span(s)
+    return None
+
+
+def model_started(callback_context, llm_request):
+    trace = _current_trace.get()
+    if trace is not None:
+        sent = sum(
+            len(c.model_dump_json(exclude_none=True)) for c in llm_request.contents or []
+        )
+        key = ("llm", callback_context.invocation_id, callback_context.agent_name)
+        trace._pending[key] = trace.start_span(
+            llm_request.model or "llm",
+            kind="llm",
+            agent=callback_context.agent_name,
+            bytes_sent=sent,
+        )
+    return None
+
+
+def model_finished(callback_context, llm_response):
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    key = ("llm", callback_context.invocation_id, callback_context.agent_name)
+    s = trace._pending.pop(key, None)
+    if s is None:
+        return None
+    usage = llm_response.usage_metadata
+    input_tokens = (usage.prompt_token_count or 0) if usage else 0
+    cached = (usage.cached_content_token_count or 0) if usage else 0
+    trace.end_span(
+        s,
+        input_tokens=input_tokens,
+        output_tokens=(usage.candidates_token_count or 0) if usage else 0,
+        cached_input_tokens=cached,
+        uncached_input_tokens=input_tokens - cached,
+        error=llm_response.error_message,
+    )
+    return None
+
+
+def tool_started(tool, args, tool_context):
+    trace = _current_trace.get()
+    if trace is not None:
+        key = ("tool", tool_context.function_call_id, tool.name)
+        trace._pending[key] = trace.start_span(
+            tool.name, kind="tool", agent=tool_context.agent_name
+        )
+    return None
+
+
+def tool_finished(tool, args, tool_context, tool_response):
+    trace = _current_trace.get()
+    if trace is not None:
+        s = trace._pending.pop(("tool", tool_context.function_call_id, tool.name), None)
+        if s is not None:
+            status = tool_response.get("status") if isinstance(tool_response, dict) else None
+            trace.end_span(s, status=status)
+    return None
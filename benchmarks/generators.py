@@ -0,0 +1,165 @@
+"""Synthetic data scaled up from the mock_data/ shapes.
+
+Every generator is seeded so two runs on the same commit see identical input.
+Sizes default to a realistic production incident and shrink with ``scale``:
+
+  logs         1,000,000 entries (~8% ERROR/FATAL with Java stack traces)
+  metrics      100 metrics x 20,000 datapoints, with a late spike
+  deployments  50,000 records across the mock services
+"""
+
+import datetime
+import random
+from typing import Dict, List
+
+LOG_ENTRIES = 1_000_000
+METRIC_COUNT = 100
+METRIC_POINTS = 20_000
+DEPLOYMENTS = 50_000
+ALARM_EVENTS = 100_000
+
+SERVICES = ["checkout-service", "payment-service", "inventory-service"]
+ERROR_CODES = ["DB_CONN_TIMEOUT", "POOL_EXHAUSTED", "UPSTREAM_5XX", "RATE_LIMITED"]
+CHANGE_SUMMARIES = [
+    "Config change: tuned db-connection-pool settings (max_connections: 100->50)",
+    "Patch: updated Stripe SDK for PCI compliance",
+    "feat: add gift card support to checkout",
+    "fix: retry on transient inventory lookups",
+    "Config-only deploy: enabled request rate limiting",
+    "chore: bump base image",
+]
+EPOCH = datetime.datetime(2026, 2, 6, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def _scaled(n: int, scale: float) -> int:
+    return max(1, int(n * scale))
+
+
+def _iso(dt: datetime.datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _stack_trace(rng: random.Random, service: str) -> str:
+    pkg = "com.bayer." + service.split("-")[0]
+    frames = [
+        f"{pkg}.db.ConnectionPool.acquire(ConnectionPool.java:{rng.randint(100, 200)})",
+        f"{pkg}.db.ConnectionManager.getConnection(ConnectionManager.java:68)",
+        f"{pkg}.repository.OrderRepository.save(OrderRepository.java:55)",
+        f"{pkg}.service.OrderService.processOrder(OrderService.java:{rng.randint(80, 120)})",
+        f"{pkg}.api.OrderController.create(OrderController.java:41)",
+        "org.springframework.web.servlet.FrameworkServlet.service(FrameworkServlet.java:897)",
+    ]
+    return "\n  at ".join(frames[: rng.randint(3, len(frames))])
+
+
+def log_entries(scale: float = 1.0, seed: int = 7) -> List[Dict]:
+    """Log entries shaped like mock_data/logs/<service>/*.json."""
+    rng = random.Random(seed)
+    # A pool of traces keeps memory bounded; entries share the strings.
+    traces = {s: [_stack_trace(rng, s) for _ in range(64)] for s in SERVICES}
+    entries = []
+    for i in range(_scaled(LOG_ENTRIES, scale)):
+        service = SERVICES[i % len(SERVICES)]
+        entry = {
+            "timestamp": _iso(EPOCH + datetime.timedelta(milliseconds=i * 9)),
+            "level": "INFO",
+            "service": service,
+            "instance_id": f"i-0abc{i % 16:04x}",
+            "trace_id": f"1-67a4c000-{i:012x}",
+            "message": "Order processed successfully",
+            "request_id": f"req-{i}",
+        }
+        if rng.random() < 0.08:
+            entry["level"] = "ERROR" if rng.random() < 0.9 else "FATAL"
+            entry["error_code"] = rng.choice(ERROR_CODES)
+            entry["message"] = "Connection pool exhausted, waited 30000ms"
+            entry["stack_trace"] = rng.choice(traces[service])
+        entries.append(entry)
+    return entries
+
+
+def metric_series(scale: float = 1.0, seed: int = 11) -> Dict[str, List[Dict]]:
+    """``{metric_name: [{timestamp, value}, ...]}`` like get_metric_data returns."""
+    rng = random.Random(seed)
+    points = _scaled(METRIC_POINTS, scale)
+    spike_at = int(points * 0.9)
+    series = {}
+    for m in range(_scaled(METRIC_COUNT, scale)):
+        base = rng.uniform(10, 500)
+        series[f"metric_{m:03d}"] = [
+            {
+                "timestamp": _iso(EPOCH + datetime.timedelta(minutes=p)),
+                "value": base * (8.0 if p >= spike_at else 1.0) + rng.gauss(0, base * 0.05),
+            }
+            for p in range(points)
+        ]
+    return series
+
+
+def deployments(scale: float = 1.0, seed: int = 13) -> List[Dict]:
+    """Deploy records like mock_data/deployments, with ``message`` set as the tools expect."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(_scaled(DEPLOYMENTS, scale)):
+        summary = rng.choice(CHANGE_SUMMARIES)
+        records.append(
+            {
+                "deploy_id": f"deploy-{i:06d}",
+                "timestamp": (EPOCH - datetime.timedelta(minutes=i)).strftime(
+                    "%Y-%m-%dT%H:%M:%SZ"
+                ),
+                "service": SERVICES[i % len(SERVICES)],
+                "commit_sha": f"{rng.getrandbits(48):012x}",
+                "change_summary": summary,
+                "message": summary,
+                "status": "success",
+            }
+        )
+    return records
+
+
+def alarm_events(scale: float = 1.0, seed: int = 17) -> List[Dict]:
+    """EventBridge alarm events like mock_data/cloudwatch_alarm.json."""
+    rng = random.Random(seed)
+    events = []
+    for i in range(_scaled(ALARM_EVENTS, scale)):
+        service = SERVICES[i % len(SERVICES)]
+        at = EPOCH + datetime.timedelta(seconds=i)
+        values = [round(rng.uniform(2000, 3000), 1) for _ in range(2)]
+        events.append(
+            {
+                "version": "0",
+                "id": f"evt-{i}",
+                "detail-type": "CloudWatch Alarm State Change",
+                "source": "aws.cloudwatch",
+                "account": "123456789012",
+                "time": at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "region": "us-east-1",
+                "detail": {
+                    "alarmName": f"{service}-p99-latency-critical",
+                    "state": {
+                        "value": "ALARM",
+                        "reason": f"Threshold Crossed: 2 datapoints {values}",
+                        "reasonData": (
+                            '{"version":"1.0","queryDate":"%s","recentDatapoints":%s,'
+                            '"threshold":2000.0}' % (at.isoformat(), values)
+                        ),
+                        "timestamp": at.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+                    },
+                    "previousState": {"value": "OK"},
+                    "configuration": {
+                        "metrics": [
+                            {
+                                "metricStat": {
+                                    "metric": {
+                                        "namespace": "Bayer/CheckoutService",
+                                        "name": "p99_latency_ms",
+                                    }
+                                }
+                            }
+                        ]
+                    },
+                },
+            }
+        )
+    return events
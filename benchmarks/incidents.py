@@ -0,0 +1,445 @@
+"""
+Synthetic incidents at production scale, written in the mock_data/ layout.
+
+  python -m benchmarks.incidents --out /tmp/incident                     # 3 services, 1h
+  python -m benchmarks.incidents --out /tmp/big --services 20 --minutes 360 \\
+      --events-per-second 50 --fault rate_limit --format parquet
+
+Each run writes logs/<service>/<hour>.ndjson (or .parquet),
+metrics/<service>/timeseries.json, deployments/deploy-history.json and
+cloudwatch_alarm.json with the same schemas as mock_data/. It also writes
+ground_truth.json: the faulty service, the root-cause deploy, the fault
+onset and the alarm time, so a run can be scored. Output is seeded and
+streamed file by file, so memory stays flat however many events are
+requested. ``MockDataStore(root=out)`` serves it to the stub AWS clients.
+"""
+
+import argparse
+import datetime
+import json
+import random
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow (only for --format parquet)
+    pa = pq = None
+
+from app.tools import timeutil
+from benchmarks.generators import EPOCH, _iso, _stack_trace
+
+SERVICE_NAMES = [
+    "checkout-service",
+    "payment-service",
+    "inventory-service",
+    "shipping-service",
+    "pricing-service",
+    "catalog-service",
+    "auth-service",
+    "search-service",
+    "cart-service",
+    "notification-service",
+]
+PARQUET_ROW_GROUP = 50_000
+DETECTION_DELAY_MINUTES = 4
+BACKGROUND_SUMMARIES = [
+    "Patch: updated Stripe SDK for PCI compliance",
+    "feat: add gift card support to checkout",
+    "fix: retry on transient inventory lookups",
+    "chore: bump base image",
+    "Patch: updated log4j library to 2.24.3",
+]
+
+
+@dataclass(frozen=True)
+class Fault:
+    error_code: str
+    message: str
+    change_summary: str
+    config_diff: Dict[str, str]
+    latency_factor: float  # p99 multiplier once the fault is fully on
+    pool_saturates: bool = False
+
+
+FAULTS = {
+    "db_pool": Fault(
+        error_code="DB_CONN_TIMEOUT",
+        message="DB connection timeout after 30000ms",
+        change_summary="Config change: tuned db-connection-pool settings (max_connections: 100→50, timeout: 60s→30s)",
+        config_diff={"db.pool.max_connections": "100 → 50", "db.pool.connection_timeout_ms": "60000 → 30000"},
+        latency_factor=12.0,
+        pool_saturates=True,
+    ),
+    "rate_limit": Fault(
+        error_code="RATE_LIMITED",
+        message="Request rejected by rate limiter (429)",
+        change_summary="Config-only deploy: enabled request rate limiting (limit: 500→50 rps)",
+        config_diff={"http.rate_limit.rps": "500 → 50"},
+        latency_factor=4.0,
+    ),
+    "memory_leak": Fault(
+        error_code="OUT_OF_MEMORY",
+        message="java.lang.OutOfMemoryError: Java heap space",
+        change_summary="feat: cache customer sessions in memory (memory limit unchanged)",
+        config_diff={"session.cache.max_entries": "0 → unbounded"},
+        latency_factor=6.0,
+    ),
+}
+
+
+@dataclass
+class IncidentSpec:
+    services: int = 3
+    duration_minutes: int = 60
+    events_per_second: float = 10.0  # per service
+    fault: str = "db_pool"
+    faulty_service: int = 0  # index into the generated services
+    onset_fraction: float = 0.75  # fault starts this far into the run
+    deploy_lead_minutes: int = 8  # root-cause deploy lands this long before onset
+    background_deploys: int = 4  # benign deploys per service
+    baseline_error_rate: float = 0.005
+    fault_error_rate: float = 0.4
+    seed: int = 42
+    start: str = _iso(EPOCH)
+
+
+def service_names(count: int) -> List[str]:
+    extra = [f"svc{i:03d}-service" for i in range(len(SERVICE_NAMES), count)]
+    return (SERVICE_NAMES + extra)[:count]
+
+
+def _namespace(service: str) -> str:
+    return "Bayer/" + "".join(word.capitalize() for word in service.split("-"))
+
+
+class _Clock:
+    """Timestamps of one run, as offsets from its start."""
+
+    def __init__(self, spec: IncidentSpec):
+        self.start = timeutil.parse_iso(spec.start)
+        self.end = self.start + datetime.timedelta(minutes=spec.duration_minutes)
+        self.onset = self.start + datetime.timedelta(minutes=spec.duration_minutes * spec.onset_fraction)
+        self.alarm = self.onset + datetime.timedelta(minutes=DETECTION_DELAY_MINUTES)
+        self.onset_ms = timeutil.datetime_to_ms(self.onset)
+
+    def severity(self, at_ms: int) -> float:
+        """0 before onset, ramping to 1 over the detection delay."""
+        if at_ms < self.onset_ms:
+            return 0.0
+        return min(1.0, 0.25 + (at_ms - self.onset_ms) / (DETECTION_DELAY_MINUTES * 60_000))
+
+
+# ── Logs ───────────────────────────────────────────────────────────────────────
+
+
+def _log_entries(spec: IncidentSpec, clock: _Clock, service: str, faulty: bool) -> Iterator[Dict]:
+    rng = random.Random(f"{spec.seed}/logs/{service}")
+    fault = FAULTS[spec.fault]
+    traces = [_stack_trace(rng, service) for _ in range(16)]
+    start_ms = timeutil.datetime_to_ms(clock.start)
+    step_ms = 1000.0 / spec.events_per_second
+    total = int(spec.duration_minutes * 60 * spec.events_per_second)
+    second, prefix = None, ""
+    for i in range(total):
+        at_ms = start_ms + int((i + rng.random()) * step_ms)
+        if at_ms // 1000 != second:  # format the shared seconds part once per second
+            second = at_ms // 1000
+            prefix = timeutil.iso_from_ms(second * 1000)[:-1]
+        severity = clock.severity(at_ms) if faulty else 0.0
+        latency = int(rng.gauss(170, 15) * (1 + (fault.latency_factor - 1) * severity))
+        saturated = fault.pool_saturates and severity > 0
+        entry = {
+            "timestamp": f"{prefix}.{at_ms % 1000:03d}Z",
+            "level": "INFO",
+            "service": service,
+            "instance_id": f"i-0{service[:3]}{i % 8:04x}",
+            "trace_id": f"1-{second:08x}-{i:012x}",
+            "message": "Order processed successfully",
+            "request_id": f"req-{i}",
+            "metadata": {
+                "order_id": f"ORD-{rng.randrange(10**5):05d}",
+                "customer_id": f"CUST-{rng.randrange(10**4):04d}",
+                "response_time_ms": latency,
+                "pool_active": 50 if saturated else rng.randint(15, 35),
+                "pool_max": 50 if saturated else 100,
+            },
+        }
+        if rng.random() < spec.fault_error_rate * severity:
+            entry.update(
+                level="ERROR",
+                message=fault.message,
+                error_code=fault.error_code,
+                stack_trace=rng.choice(traces),
+            )
+        elif rng.random() < spec.baseline_error_rate:
+            entry.update(level="WARN", message="Upstream retry succeeded", error_code="UPSTREAM_RETRY")
+        yield entry
+
+
+def _parquet_schema():
+    metadata = pa.struct(
+        [
+            ("order_id", pa.string()),
+            ("customer_id", pa.string()),
+            ("response_time_ms", pa.int64()),
+            ("pool_active", pa.int64()),
+            ("pool_max", pa.int64()),
+        ]
+    )
+    return pa.schema(
+        [(name, pa.string()) for name in (
+            "timestamp", "level", "service", "instance_id", "trace_id", "message", "request_id",
+            "error_code", "stack_trace",
+        )]
+        + [("metadata", metadata)]
+    )
+
+
+class _HourlyWriter:
+    """One file per service-hour; parquet rows are flushed in row groups."""
+
+    def __init__(self, directory: Path, fmt: str):
+        self.directory, self.fmt = directory, fmt
+        self.hour: Optional[str] = None
+        self._file = None
+        self._rows: List[Dict] = []
+        self.files = 0
+
+    def write(self, entry: Dict) -> None:
+        hour = entry["timestamp"][:13].replace(":", "-") + "-00"
+        if hour != self.hour:
+            self.close()
+            self.hour = hour
+            path = self.directory / f"{hour}.{self.fmt}"
+            self._file = pq.ParquetWriter(path, _parquet_schema()) if self.fmt == "parquet" else open(path, "w")
+            self.files += 1
+        if self.fmt == "parquet":
+            self._rows.append(entry)
+            if len(self._rows) >= PARQUET_ROW_GROUP:
+                self._flush()
+        else:
+            self._file.write(json.dumps(entry) + "\n")
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._file.write_table(pa.Table.from_pylist(self._rows, schema=_parquet_schema()))
+            self._rows = []
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        if self.fmt == "parquet":
+            self._flush()
+        self._file.close()
+        self._file = None
+
+
+# ── Metrics, deployments, alarm ────────────────────────────────────────────────
+
+
+def _timeseries(spec: IncidentSpec, clock: _Clock, service: str, faulty: bool) -> Dict:
+    rng = random.Random(f"{spec.seed}/metrics/{service}")
+    fault = FAULTS[spec.fault]
+    shapes = [
+        ("p99_latency_ms", _namespace(service), "Milliseconds", rng.uniform(120, 220), fault.latency_factor),
+        ("cpu_utilization_percent", "AWS/EC2", "Percent", rng.uniform(25, 45), 1.8),
+        ("memory_utilization_percent", "CWAgent", "Percent", rng.uniform(40, 60),
+         1.6 if spec.fault == "memory_leak" else 1.05),
+        ("db_connection_pool_active", _namespace(service), "Count", rng.uniform(15, 35),
+         2.0 if fault.pool_saturates else 1.0),
+        ("error_rate_percent", _namespace(service), "Percent", rng.uniform(0.1, 0.5), 80.0),
+    ]
+    metrics = []
+    for name, namespace, unit, base, factor in shapes:
+        datapoints = []
+        for minute in range(spec.duration_minutes):
+            at = clock.start + datetime.timedelta(minutes=minute)
+            severity = clock.severity(timeutil.datetime_to_ms(at)) if faulty else 0.0
+            value = base * (1 + (factor - 1) * severity) * rng.uniform(0.95, 1.05)
+            datapoints.append({"timestamp": _iso(at), "value": round(value, 2), "anomaly": severity > 0})
+        metrics.append({"metric_name": name, "namespace": namespace, "unit": unit, "datapoints": datapoints})
+    return {"service": service, "region": "us-east-1", "collection_period_seconds": 60, "metrics": metrics}
+
+
+def _deploy(service: str, at: datetime.datetime, rng: random.Random, summary: str, config_diff: Dict) -> Dict:
+    minor = rng.randint(1, 20)
+    return {
+        "deploy_id": f"deploy-{at:%Y%m%d-%H%M%S}-{service.split('-')[0][:4]}",
+        "timestamp": at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "service": service,
+        "version_from": f"3.{minor}.0",
+        "version_to": f"3.{minor}.1",
+        "deployer": "ci-pipeline",
+        "pipeline": f"arn:aws:codepipeline:us-east-1:123456789012:{service}-pipeline",
+        "change_summary": summary,
+        "commit_sha": f"{rng.getrandbits(48):012x}",
+        "status": "success",
+        "rollback_target": f"3.{minor}.0",
+        "config_diff": config_diff,
+    }
+
+
+def _deployments(spec: IncidentSpec, clock: _Clock, services: List[str]) -> List[Dict]:
+    rng = random.Random(f"{spec.seed}/deployments")
+    fault = FAULTS[spec.fault]
+    history = []
+    lead = datetime.timedelta(minutes=spec.deploy_lead_minutes)
+    window = (clock.onset - lead - clock.start).total_seconds()
+    for service in services:
+        for _ in range(spec.background_deploys):
+            # Keep benign deploys at least an hour clear of the root cause.
+            at = clock.start - datetime.timedelta(hours=1, seconds=rng.uniform(0, 86_400)) if window < 3600 else (
+                clock.start + datetime.timedelta(seconds=rng.uniform(0, window - 3600))
+            )
+            history.append(_deploy(service, at, rng, rng.choice(BACKGROUND_SUMMARIES), {}))
+    culprit = _deploy(
+        services[spec.faulty_service], clock.onset - lead, rng, fault.change_summary, fault.config_diff
+    )
+    history.append(culprit)
+    if len(services) > 1:
+        # A harmless deploy on another service right next to the real one.
+        decoy_service = services[(spec.faulty_service + 1) % len(services)]
+        history.append(
+            _deploy(decoy_service, clock.onset - lead / 2, rng, "chore: bump base image", {})
+        )
+    history.sort(key=lambda d: d["timestamp"])
+    return history
+
+
+def _alarm_event(clock: _Clock, service: str) -> Dict:
+    stamp = clock.alarm.strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+    values = [2100.0, 2300.0]
+    return {
+        "version": "0",
+        "id": f"synthetic-{service}-{clock.alarm:%Y%m%d%H%M%S}",
+        "detail-type": "CloudWatch Alarm State Change",
+        "source": "aws.cloudwatch",
+        "account": "123456789012",
+        "time": clock.alarm.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "region": "us-east-1",
+        "resources": [f"arn:aws:cloudwatch:us-east-1:123456789012:alarm:{service}-p99-latency-critical"],
+        "detail": {
+            "alarmName": f"{service}-p99-latency-critical",
+            "state": {
+                "value": "ALARM",
+                "reason": f"Threshold Crossed: 2 datapoints {values} were greater than the threshold (2000.0)",
+                "reasonData": json.dumps(
+                    {"version": "1.0", "queryDate": stamp, "statistic": "p99", "period": 60,
+                     "recentDatapoints": values, "threshold": 2000.0}
+                ),
+                "timestamp": stamp,
+            },
+            "previousState": {"value": "OK"},
+            "configuration": {
+                "metrics": [
+                    {
+                        "id": "m1",
+                        "metricStat": {
+                            "metric": {
+                                "namespace": _namespace(service),
+                                "name": "p99_latency_ms",
+                                "dimensions": {"ServiceName": service, "Environment": "production"},
+                            },
+                            "period": 60,
+                            "stat": "p99",
+                        },
+                    }
+                ]
+            },
+        },
+    }
+
+
+# ── Entry point ────────────────────────────────────────────────────────────────
+
+
+def write_incident(spec: IncidentSpec, out: Path, fmt: str = "ndjson") -> Dict:
+    """Write one incident under ``out`` and return its ground truth."""
+    if fmt not in ("ndjson", "parquet"):
+        raise ValueError(f"Unknown format {fmt!r}")
+    if fmt == "parquet" and pq is None:
+        raise RuntimeError("--format parquet needs pyarrow (pip install pyarrow)")
+    if spec.fault not in FAULTS:
+        raise ValueError(f"Unknown fault {spec.fault!r}; choose from {sorted(FAULTS)}")
+    out = Path(out)
+    clock = _Clock(spec)
+    services = service_names(spec.services)
+    faulty_service = services[spec.faulty_service]
+
+    events = log_files = 0
+    for service in services:
+        faulty = service == faulty_service
+        log_dir = out / "logs" / service
+        log_dir.mkdir(parents=True, exist_ok=True)
+        writer = _HourlyWriter(log_dir, fmt)
+        try:
+            for entry in _log_entries(spec, clock, service, faulty):
+                writer.write(entry)
+                events += 1
+        finally:
+            writer.close()
+        log_files += writer.files
+        metric_dir = out / "metrics" / service
+        metric_dir.mkdir(parents=True, exist_ok=True)
+        with open(metric_dir / "timeseries.json", "w") as f:
+            json.dump(_timeseries(spec, clock, service, faulty), f)
+
+    deployments = _deployments(spec, clock, services)
+    (out / "deployments").mkdir(parents=True, exist_ok=True)
+    with open(out / "deployments" / "deploy-history.json", "w") as f:
+        json.dump({"deployments": deployments}, f, indent=1)
+    with open(out / "cloudwatch_alarm.json", "w") as f:
+        json.dump({"alarm_name": f"{faulty_service}-p99-latency-critical",
+                   "mock_alarm_event": _alarm_event(clock, faulty_service)}, f, indent=1)
+
+    culprit = next(d for d in deployments if d["config_diff"])
+    truth = {
+        "incident_id": f"INC-{clock.alarm:%Y%m%d-%H%M%S}",
+        "service": faulty_service,
+        "fault": spec.fault,
+        "error_code": FAULTS[spec.fault].error_code,
+        "root_cause_deploy_id": culprit["deploy_id"],
+        "onset": _iso(clock.onset),
+        "alarm_time": _iso(clock.alarm),
+        "log_events": events,
+        "log_files": log_files,
+        "format": fmt,
+        "spec": asdict(spec),
+    }
+    with open(out / "ground_truth.json", "w") as f:
+        json.dump(truth, f, indent=1)
+    return truth
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = IncidentSpec()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, type=Path)
+    parser.add_argument("--services", type=int, default=defaults.services)
+    parser.add_argument("--minutes", type=int, default=defaults.duration_minutes)
+    parser.add_argument("--events-per-second", type=float, default=defaults.events_per_second)
+    parser.add_argument("--fault", choices=sorted(FAULTS), default=defaults.fault)
+    parser.add_argument("--onset", type=float, default=defaults.onset_fraction, help="fraction of the run")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    args = parser.parse_args(argv)
+
+    spec = IncidentSpec(
+        services=args.services,
+        duration_minutes=args.minutes,
+        events_per_second=args.events_per_second,
+        fault=args.fault,
+        onset_fraction=args.onset,
+        seed=args.seed,
+    )
+    truth = write_incident(spec, args.out, args.format)
+    print(json.dumps({k: v for k, v in truth.items() if k != "spec"}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
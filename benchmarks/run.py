@@ -0,0 +1,365 @@
+"""
+Benchmark runner for the deterministic tool layer.
+
+  python -m benchmarks.run                          # full production sizes
+  python -m benchmarks.run --scale 0.05 --output bench.json
+  python -m benchmarks.run --compare bench.json     # fail on >10% slowdown
+
+Each benchmark builds its input once (untimed, see generators.py), then times
+``--repeat`` runs. Results are written as JSON with the git commit and host
+details so two commits can be compared on the same box.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.local.aws import MockDataStore, StubLogsClient
+from app.local.logs import LocalLogs
+from app.tools.anomaly_detector import detect_anomalies
+from app.tools.deploy_correlator import correlate_deploy_to_incident
+from app.tools.envelope import build_response_envelope
+from app.tools.parse_alarm import parse_alarm_event
+from app.tools.rca_templates import render_rca
+from app.tools.serialization import codec_name, decode_envelope, encode_envelope
+from app.tools.similarity_index import SimilarityIndex, incident_features
+from app.tools.stack_parser import extract_stack_traces
+from benchmarks import generators
+from seeder.log_shipper import LogShipper
+
+# name -> (setup(scale) -> data, run(data) -> items processed [, extra fields])
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+def benchmark(name: str, setup: Callable):
+    def register(fn: Callable[..., int]):
+        BENCHMARKS[name] = (setup, fn)
+        return fn
+
+    return register
+
+
+@benchmark("detect_anomalies", generators.metric_series)
+def bench_detect_anomalies(series: Dict[str, List[Dict]]) -> int:
+    for datapoints in series.values():
+        detect_anomalies(datapoints)
+    return sum(len(p) for p in series.values())
+
+
+@benchmark("extract_stack_traces", generators.log_entries)
+def bench_extract_stack_traces(entries: List[Dict]) -> int:
+    for entry in entries:
+        extract_stack_traces(entry)
+    return len(entries)
+
+
+@benchmark("correlate_deploy_to_incident", generators.deployments)
+def bench_correlate(deployments: List[Dict]) -> int:
+    correlate_deploy_to_incident(deployments, "2026-02-06T14:20:00Z", ["DB_CONN_TIMEOUT"])
+    return len(deployments)
+
+
+@benchmark("parse_alarm_event", generators.alarm_events)
+def bench_parse_alarm(events: List[Dict]) -> int:
+    for event in events:
+        parse_alarm_event(event)
+    return len(events)
+
+
+def _envelope_findings(scale: float) -> List[Dict]:
+    entries = generators.log_entries(scale=scale * 0.01)
+    return [e for e in entries if e.get("stack_trace")]
+
+
+@benchmark("build_response_envelope", _envelope_findings)
+def bench_envelope(findings: List[Dict]) -> int:
+    start = datetime.datetime.now(datetime.timezone.utc)
+    for _ in range(1000):
+        build_response_envelope("logs_agent", "INC-BENCH", findings, start)
+    return 1000
+
+
+def _large_envelope(scale: float) -> Dict:
+    entries = generators.log_entries(scale=scale * 0.05)
+    findings = [e for e in entries if e.get("stack_trace")]
+    start = datetime.datetime.now(datetime.timezone.utc)
+    return build_response_envelope("logs_agent", "INC-BENCH", findings, start)
+
+
+@benchmark("envelope_json_roundtrip", _large_envelope)
+def bench_envelope_json(envelope: Dict):
+    data = json.dumps(envelope).encode("utf-8")
+    json.loads(data)
+    return len(envelope["findings"]), {"bytes": len(data)}
+
+
+@benchmark("envelope_compact_roundtrip", _large_envelope)
+def bench_envelope_compact(envelope: Dict):
+    data = encode_envelope(envelope)
+    decode_envelope(data)
+    return len(envelope["findings"]), {"bytes": len(data), "codec": codec_name()}
+
+
+def _rca_args(scale: float) -> Dict:
+    rows = generators._scaled(20_000, scale)
+    return {
+        "incident_id": "INC-BENCH",
+        "service": "checkout-service",
+        "detected_at": "2026-02-06T14:30:00Z",
+        "root_cause": "Config deploy halved the DB pool",
+        "confidence": 0.91,
+        "recommended_action": "rollback",
+        "evidence_chain": [f"Evidence row {i}: DB_CONN_TIMEOUT on i-{i:05d}" for i in range(rows)],
+        "logs_summary": "Detected errors.",
+    }
+
+
+def _fstring_rca(
+    now: str,
+    incident_id: str,
+    service: str,
+    detected_at: str,
+    root_cause: str,
+    confidence: float,
+    recommended_action: str,
+    evidence_chain: List[str],
+    logs_summary: str = "",
+    metrics_summary: str = "",
+    deploy_summary: str = "",
+) -> str:
+    # The pre-template generate_rca_markdown body, kept whole as the baseline.
+    evidence_lines = "\n".join(f"  {i + 1}. {e}" for i, e in enumerate(evidence_chain))
+
+    return f"""# Incident Report: {incident_id}
+
+## Summary
+| Field | Value |
+|-------|-------|
+| Incident ID | {incident_id} |
+| Service | {service} |
+| Detected At | {detected_at} |
+| Root Cause | {root_cause} |
+| Confidence | {confidence:.0%} |
+| Recommended Action | {recommended_action} |
+| Report Generated | {now} |
+
+## Evidence Chain
+{evidence_lines}
+
+## Log Analysis
+{logs_summary or "No log findings available."}
+
+## Metric Analysis
+{metrics_summary or "No metric findings available."}
+
+## Deployment Correlation
+{deploy_summary or "No deployment findings available."}
+
+## Recommended Action
+**{recommended_action.upper()}** — {"Roll back " + service + " to previous version" if recommended_action == "rollback" else "Escalate to human on-call team for further investigation"}
+
+## Agent Chain of Thought
+1. DETECT — Alarm received for {service}
+2. PLAN — Investigation plan generated, 3 agents dispatched via A2A
+3. INVESTIGATE — Logs, Metrics, Deploy agents analyzed data
+4. DECIDE — Root cause identified (confidence: {confidence:.0%})
+5. ACT — {recommended_action.upper()} recommended
+6. REPORT — This document generated at {now}
+
+---
+*Generated by Autonomous Incident Commander (AIC)*
+"""
+
+
+@benchmark("rca_markdown_fstring", _rca_args)
+def bench_rca_fstring(args: Dict) -> int:
+    _fstring_rca(datetime.datetime.now(datetime.timezone.utc).isoformat(), **args)
+    return len(args["evidence_chain"])
+
+
+@benchmark("rca_markdown_compiled", _rca_args)
+def bench_rca_compiled(args: Dict) -> int:
+    render_rca("markdown", **args)
+    return len(args["evidence_chain"])
+
+
+@benchmark("rca_html_compiled", _rca_args)
+def bench_rca_html(args: Dict) -> int:
+    render_rca("html", **args)
+    return len(args["evidence_chain"])
+
+
+def _log_streams(scale: float) -> Dict[tuple, List[Dict]]:
+    streams: Dict[tuple, List[Dict]] = {}
+    for entry in generators.log_entries(scale=scale):
+        key = (f"/bayer/{entry['service']}", entry["instance_id"])
+        ts = int(datetime.datetime.fromisoformat(entry["timestamp"].replace("Z", "+00:00")).timestamp() * 1000)
+        streams.setdefault(key, []).append({"timestamp": ts, "message": json.dumps(entry)})
+    return streams
+
+
+@benchmark("log_shipper", _log_streams)
+def bench_log_shipper(streams: Dict[tuple, List[Dict]]):
+    # 5 ms per call stands in for the PutLogEvents round trip.
+    logs = LocalLogs(latency_ms=5)
+    stats = LogShipper(logs).ship(streams)
+    return stats["events_pushed"], {"batches": stats["batches"], "api_calls": sum(logs.calls.values())}
+
+
+def _insights_store(scale: float) -> StubLogsClient:
+    store = MockDataStore(root=None)
+    store.add_logs("checkout-service", generators.log_entries(scale=scale))
+    return StubLogsClient(store)
+
+
+@benchmark("insights_query", _insights_store)
+def bench_insights_query(logs: StubLogsClient):
+    # The logs tool's query over the whole store, then an error histogram.
+    columns = logs.store.logs("checkout-service")
+    start, end = columns.epoch_ms[0] // 1000, columns.epoch_ms[-1] // 1000 + 1
+    matched = 0
+    for query in (
+        "fields @timestamp, @message, level, error_code, stack_trace "
+        "| filter level in ['ERROR', 'FATAL', 'WARN'] | filter @message like /pool/ "
+        "| sort @timestamp asc | limit 50",
+        "filter level = 'ERROR' | stats count(*) as errors by error_code, bin(5m) | sort errors desc",
+    ):
+        query_id = logs.start_query(
+            logGroupName="/bayer/checkout-service", startTime=start, endTime=end, queryString=query
+        )["queryId"]
+        matched += int(logs.get_query_results(queryId=query_id)["statistics"]["recordsMatched"])
+    return len(columns), {"matched": matched}
+
+
+def _similarity_index(scale: float):
+    # Incidents drawn from a small vocabulary, so many share some features.
+    rng = random.Random(7)
+    codes = [f"ERR_{i}" for i in range(40)]
+    frames = [f"com.bayer.svc.Module{i}.call" for i in range(30)]
+    metrics = [f"metric_{i}" for i in range(12)]
+    index = SimilarityIndex()
+    incidents = []
+    for n in range(max(1, int(20000 * scale))):
+        tokens = incident_features(
+            rng.choice(generators.SERVICES),
+            rng.choice(metrics),
+            rng.sample(codes, 3),
+            rng.sample(frames, 2),
+            rng.sample(metrics, 2),
+            rng.sample(["pool", "timeout", "cache", "retry", "limit", "heap"], 2),
+        )
+        index.add(f"INC-{n}", tokens, {"incident_id": f"INC-{n}"})
+        incidents.append(tokens)
+    return index, incidents[:1000]
+
+
+@benchmark("similarity_lookup", _similarity_index)
+def bench_similarity_lookup(data):
+    index, queries = data
+    matched = sum(len(index.query(tokens, top_k=3)) for tokens in queries)
+    return len(queries), {"indexed": len(index), "matched": matched}
+
+
+# ── Runner ─────────────────────────────────────────────────────────────────────
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    scale: float = 1.0, repeat: int = 3, only: Optional[List[str]] = None
+) -> Dict:
+    results = {}
+    for name, (setup, fn) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        data = setup(scale)
+        fn(data)  # warm-up: regex cache, allocator
+        timings, items, extra = [], 0, {}
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            items = fn(data)
+            timings.append(time.perf_counter() - t0)
+        if isinstance(items, tuple):
+            items, extra = items
+        results[name] = {
+            "items": items,
+            "min_s": round(min(timings), 6),
+            "median_s": round(statistics.median(timings), 6),
+            "mean_s": round(statistics.mean(timings), 6),
+            "items_per_s": round(items / min(timings), 1) if min(timings) > 0 else None,
+            **extra,
+        }
+        print(f"{name:32s} {results[name]['min_s']:10.4f}s  {items:>10,d} items")
+        del data
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10) -> List[str]:
+    """Names of benchmarks whose min time grew by more than ``threshold``."""
+    regressions = []
+    for name, now in current["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before or not before["min_s"]:
+            continue
+        ratio = now["min_s"] / before["min_s"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:32s} {before['min_s']:10.4f}s -> {now['min_s']:10.4f}s  x{ratio:.2f} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the deterministic tools.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Fraction of production sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS))
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("scale") != args.scale:
+            print(f"warning: baseline scale {baseline['meta'].get('scale')} != {args.scale}")
+
+    results = run_benchmarks(args.scale, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        return 1 if compare(baseline, results, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Local replay runner — pushes a batch of alarm events through the pipeline offline.
+AWS and Bedrock are replaced by the stubs in app/local/, so no credentials needed.
+
+  python replay_local.py mock_data/cloudwatch_alarm.json --repeat 50 --concurrency 8
+  python replay_local.py events/ --mode handler --llm-latency-ms 400
+
+Events can be a directory of .json files, a single .json file (an event, a list
+of events, or a file with a "mock_alarm_event" key) or a .jsonl file.
+
+Modes:
+  tools   — deterministic tool pipeline (app/local/pipeline.py); measures tool
+            and AWS cost per phase with the LLM taken out of the loop
+  handler — full lambda_handler with the Commander on a scripted StubLlm;
+            measures ADK overhead plus simulated model latency
+
+Reports throughput, p50/p95/p99 end-to-end latency and a per-phase breakdown
+taken from the span traces (app/tools/tracing.py).
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.local.aws import patch_aws
+from app.local.llm import install_stub_llm
+from app.tools import cloudwatch_logs, coalescer, tracing
+
+logger = logging.getLogger(__name__)
+
+_MODE = "tools"
+_STUBS = contextlib.ExitStack()
+
+
+# ── Event loading ──────────────────────────────────────────────────────────────
+
+
+def _unwrap(doc: Any) -> List[Dict]:
+    if isinstance(doc, list):
+        return [e for item in doc for e in _unwrap(item)]
+    if isinstance(doc, dict) and "mock_alarm_event" in doc:
+        return [doc["mock_alarm_event"]]
+    return [doc]
+
+
+def load_events(path: str) -> List[Dict]:
+    """Read alarm events from a directory, a .json file or a .jsonl file."""
+    p = Path(path)
+    files = sorted(p.glob("*.json*")) if p.is_dir() else [p]
+    events: List[Dict] = []
+    for f in files:
+        with open(f) as fh:
+            if f.suffix == ".jsonl":
+                events.extend(e for line in fh if line.strip() for e in _unwrap(json.loads(line)))
+            else:
+                events.extend(_unwrap(json.load(fh)))
+    return events
+
+
+# ── Stats ──────────────────────────────────────────────────────────────────────
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(results: List[Dict], wall_s: float) -> Dict:
+    """Throughput, latency percentiles and per-phase mean/p95 for a replay."""
+    ok = [r for r in results if not r.get("error")]
+    latencies = [r["latency_ms"] for r in ok]
+    phases: Dict[str, List[float]] = {}
+    for r in ok:
+        for name, ms in (r.get("phases") or {}).items():
+            phases.setdefault(name, []).append(ms)
+    return {
+        "events": len(results),
+        "errors": len(results) - len(ok),
+        "wall_s": round(wall_s, 3),
+        "throughput_per_s": round(len(results) / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(max(latencies), 1) if latencies else 0.0,
+        },
+        "phases_ms": {
+            name: {
+                "mean": round(statistics.mean(values), 1),
+                "p95": round(percentile(values, 95), 1),
+            }
+            for name, values in phases.items()
+        },
+    }
+
+
+# ── Workers ────────────────────────────────────────────────────────────────────
+
+
+def _install(
+    mode: str,
+    aws_latency_ms: float,
+    llm_latency_ms: float,
+    coalesce: bool,
+    trace_dir: Optional[str],
+    schedule_llm: bool = False,
+):
+    """Swap in the local stubs for this process. Stays active until exit."""
+    global _MODE
+    _MODE = mode
+    if trace_dir:
+        tracing.TRACE_DIR = trace_dir
+    _STUBS.enter_context(patch_aws(latency_ms=aws_latency_ms))
+    cloudwatch_logs.POLL_INTERVAL_SECONDS = 0.0
+    coalescer.COALESCE_ENABLED = coalesce
+    if mode == "handler":
+        tracing.TRACE_ENABLED = True
+        install_stub_llm(llm_latency_ms, scheduled=schedule_llm)
+
+
+def replay_one(index: int, event: Dict) -> Dict:
+    """Run one event in the configured mode; never raises."""
+    t0 = time.perf_counter()
+    result: Dict[str, Any] = {"index": index}
+    try:
+        if _MODE == "handler":
+            from app.handler import lambda_handler
+
+            response = lambda_handler(event)
+            if response["statusCode"] != 200:
+                raise RuntimeError(response["body"].get("error"))
+            result["phases"] = response["body"].get("trace", {}).get("phases")
+        else:
+            from app.local.pipeline import run_pipeline
+
+            with tracing.trace_incident(f"replay-{index}", enabled=True, export=False) as trace:
+                outcome = run_pipeline(event)
+            result["phases"] = trace.summary()["phases"]
+            result["recommended_action"] = outcome["recommended_action"]
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency_ms"] = (time.perf_counter() - t0) * 1000
+    return result
+
+
+def replay(
+    events: List[Dict],
+    mode: str = "tools",
+    concurrency: int = 4,
+    executor: str = "thread",
+    aws_latency_ms: float = 0.0,
+    llm_latency_ms: float = 0.0,
+    coalesce: bool = False,
+    trace_dir: Optional[str] = None,
+    schedule_llm: bool = False,
+) -> Dict:
+    """Replay ``events`` with ``concurrency`` workers and return the summary."""
+    config = (mode, aws_latency_ms, llm_latency_ms, coalesce, trace_dir, schedule_llm)
+    if executor == "process":
+        pool = ProcessPoolExecutor(concurrency, initializer=_install, initargs=config)
+    else:
+        _install(*config)
+        pool = ThreadPoolExecutor(concurrency)
+
+    t0 = time.perf_counter()
+    with pool:
+        results = list(pool.map(replay_one, range(len(events)), events))
+    summary = summarize(results, time.perf_counter() - t0)
+    summary.update(mode=mode, concurrency=concurrency, executor=executor)
+    summary["failures"] = [
+        {"index": r["index"], "error": r["error"]} for r in results if r.get("error")
+    ][:10]
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Replay alarm events locally.")
+    parser.add_argument("events", help="Directory, .json or .jsonl of alarm events")
+    parser.add_argument("--mode", choices=["tools", "handler"], default="tools")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the batch N times")
+    parser.add_argument("--aws-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--coalesce", action="store_true", help="Keep duplicate-alarm coalescing on"
+    )
+    parser.add_argument("--trace-dir", help="Where handler-mode traces are written")
+    parser.add_argument(
+        "--schedule-llm",
+        action="store_true",
+        help="Keep the stub models behind the LLM scheduler (AIC_LLM_RPM/TPM/CONCURRENCY)",
+    )
+    parser.add_argument("--output", help="Also write the summary JSON here")
+    args = parser.parse_args(argv)
+
+    events = load_events(args.events) * args.repeat
+    logger.info("Replaying %d events (%s mode, %d workers)", len(events), args.mode, args.concurrency)
+
+    summary = replay(
+        events,
+        mode=args.mode,
+        concurrency=args.concurrency,
+        executor=args.executor,
+        aws_latency_ms=args.aws_latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        coalesce=args.coalesce,
+        trace_dir=args.trace_dir,
+        schedule_llm=args.schedule_llm,
+    )
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    main()
@@ -0,0 +1,155 @@
+import codecs
+import json
+from typing import Any, BinaryIO, Iterator, Sequence, TextIO, Tuple, Union
+
+CHUNK_SIZE = 1 << 16
+RECORD_KEYS = ("logs", "entries", "records")
+
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",:]}"
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Text buffer over a binary or text stream, refilled on demand."""
+
+    def __init__(self, stream: Union[BinaryIO, TextIO], chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int = 0) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            chunk = self.utf8.decode(b"", final=True) if not isinstance(chunk, str) else ""
+        elif not isinstance(chunk, str):
+            chunk = self.utf8.decode(chunk)
+        # Drop what has been consumed so the buffer stays about one chunk long.
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of input), without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode one complete JSON value, reading more input until it parses."""
+        self.peek()
+        # Each failed attempt re-parses from the value's start, so read ahead
+        # in doubling steps to keep a large value linear.
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(size):
+                    raise
+                size *= 2
+                continue
+            # A bare number or literal only ends at a delimiter: "12" may be the
+            # start of "1234" or "12.5" whose rest is still in the next chunk.
+            if (
+                self.buf[self.pos] not in '{["'
+                and not self.eof
+                and (end == len(self.buf) or self.buf[end] not in _DELIMITERS)
+            ):
+                self.fill(size)
+                continue
+            self.pos = end
+            return value
+
+
+    def buffered_value(self) -> Tuple[bool, Any]:
+        """Decode the next value only if it is already complete in the buffer."""
+        try:
+            value, end = _decoder.raw_decode(self.buf, self.pos)
+        except json.JSONDecodeError:
+            return False, None
+        self.pos = end
+        return True, value
+
+
+def _array_items(reader: _Reader) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("]")
+        return
+
+
+def iter_records(
+    stream: Union[BinaryIO, TextIO],
+    keys: Sequence[str] = RECORD_KEYS,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Any]:
+    """Yield records one at a time from a JSON file-like object, in constant memory.
+
+    Accepts a top-level array of records, an object whose first matching
+    ``keys`` member holds the array (other members are skipped), and
+    newline-delimited JSON. An NDJSON line is an object without such a
+    member, so it is yielded as a record itself. ``stream`` may be text or
+    bytes (a file, or an S3 ``StreamingBody``). Only one record is decoded
+    at a time.
+    """
+    reader = _Reader(stream, chunk_size)
+    first = reader.peek()
+    if first == "[":
+        yield from _array_items(reader)
+        return
+    while first == "{":
+        # Fast path for NDJSON lines and small files: the whole object is
+        # already buffered, so decode it in one call.
+        complete, record = reader.buffered_value()
+        if complete:
+            items = next((record[k] for k in record if k in keys and isinstance(record[k], list)), None)
+            if items is None:
+                yield record
+            else:
+                yield from items
+            first = reader.peek()
+            continue
+        reader.expect("{")
+        record: dict = {}
+        streamed = False
+        while reader.peek() != "}":
+            key = reader.value()
+            reader.expect(":")
+            if not streamed and key in keys and reader.peek() == "[":
+                yield from _array_items(reader)
+                streamed = True
+            else:
+                value = reader.value()
+                if not streamed:
+                    record[key] = value
+            if reader.peek() == ",":
+                reader.pos += 1
+        reader.expect("}")
+        if not streamed:
+            yield record
+        first = reader.peek()
+    if first:
+        raise ValueError(f"Unexpected {first!r} in JSON stream")
@@ -0,0 +1,201 @@
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import boto3
+
+# PutLogEvents limits: https://docs.aws.amazon.com/AmazonCloudWatchLogs/latest/APIReference/API_PutLogEvents.html
+MAX_BATCH_EVENTS = 10_000
+MAX_BATCH_BYTES = 1_048_576
+EVENT_OVERHEAD_BYTES = 26
+MAX_EVENT_BYTES = 256 * 1024 - EVENT_OVERHEAD_BYTES
+MAX_BATCH_SPAN_MS = 24 * 60 * 60 * 1000
+SHIP_WORKERS = 8
+
+logger = logging.getLogger(__name__)
+
+
+def _truncate(message: str) -> Tuple[str, int]:
+    encoded = message.encode("utf-8")
+    if len(encoded) <= MAX_EVENT_BYTES:
+        return message, len(encoded)
+    clipped = encoded[:MAX_EVENT_BYTES].decode("utf-8", errors="ignore")
+    return clipped, len(clipped.encode("utf-8"))
+
+
+def make_batches(events: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """Split time-sorted events into PutLogEvents-sized batches.
+
+    A batch closes at 10,000 events, at 1 MiB counting 26 bytes of overhead
+    per event, or when the next event is more than 24 hours after the
+    batch's first one. Messages over the 256 KiB event limit are truncated.
+    """
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    first_ts = 0
+    for event in events:
+        message, message_bytes = _truncate(event["message"])
+        event_bytes = message_bytes + EVENT_OVERHEAD_BYTES
+        if batch and (
+            len(batch) >= MAX_BATCH_EVENTS
+            or size + event_bytes > MAX_BATCH_BYTES
+            or event["timestamp"] - first_ts > MAX_BATCH_SPAN_MS
+        ):
+            yield batch
+            batch, size = [], 0
+        if not batch:
+            first_ts = event["timestamp"]
+        batch.append(event if message is event["message"] else {**event, "message": message})
+        size += event_bytes
+    if batch:
+        yield batch
+
+
+class LogShipper:
+    """Ships events to CloudWatch Logs, one ordered writer per stream, streams in parallel.
+
+    Sequence tokens are no longer required by PutLogEvents, so batches are
+    sent without one and no DescribeLogStreams round trip is made. If the
+    service still rejects the token, the expected one from the error is used
+    and then chained from each response.
+    """
+
+    def __init__(self, logs_client: boto3.client, max_workers: int = SHIP_WORKERS):
+        self.logs_client = logs_client
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._groups: set[str] = set()
+        self._streams: set[Tuple[str, str]] = set()
+        self._stream_locks: dict[Tuple[str, str], threading.Lock] = defaultdict(threading.Lock)
+        self._tokens: dict[Tuple[str, str], str] = {}
+        self.log_groups_created = 0
+        self.events_pushed = 0
+        self.batches = 0
+        self.rejected = 0
+
+    def _ensure_log_group(self, group_name: str) -> None:
+        with self._lock:
+            if group_name in self._groups:
+                return
+            try:
+                self.logs_client.create_log_group(logGroupName=group_name)
+                self.log_groups_created += 1
+            except self.logs_client.exceptions.ResourceAlreadyExistsException:
+                pass
+            self._groups.add(group_name)
+
+    def _ensure_log_stream(self, group_name: str, stream_name: str) -> None:
+        key = (group_name, stream_name)
+        if key in self._streams:
+            return
+        try:
+            self.logs_client.create_log_stream(logGroupName=group_name, logStreamName=stream_name)
+        except self.logs_client.exceptions.ResourceAlreadyExistsException:
+            pass
+        self._streams.add(key)
+
+    def _put(self, group_name: str, stream_name: str, batch: List[Dict[str, Any]]) -> None:
+        key = (group_name, stream_name)
+        payload: Dict[str, Any] = {
+            "logGroupName": group_name,
+            "logStreamName": stream_name,
+            "logEvents": batch,
+        }
+        if key in self._tokens:
+            payload["sequenceToken"] = self._tokens[key]
+        try:
+            response = self.logs_client.put_log_events(**payload)
+        except self.logs_client.exceptions.InvalidSequenceTokenException as exc:
+            expected = exc.response.get("expectedSequenceToken")
+            if not expected:
+                raise
+            payload["sequenceToken"] = expected
+            response = self.logs_client.put_log_events(**payload)
+        if response.get("nextSequenceToken") and "sequenceToken" in payload:
+            self._tokens[key] = response["nextSequenceToken"]
+        rejected = response.get("rejectedLogEventsInfo")
+        if rejected:
+            logger.warning("%s/%s rejected events: %s", group_name, stream_name, rejected)
+            with self._lock:
+                self.rejected += 1
+
+    def ship_stream(self, group_name: str, stream_name: str, events: Sequence[Dict[str, Any]]) -> int:
+        """Send ``events`` to one stream in sorted, size-limited batches. Thread-safe."""
+        if not events:
+            return 0
+        with self._lock:
+            stream_lock = self._stream_locks[(group_name, stream_name)]
+        with stream_lock:
+            self._ensure_log_group(group_name)
+            self._ensure_log_stream(group_name, stream_name)
+            batches = 0
+            for batch in make_batches(sorted(events, key=lambda e: e["timestamp"])):
+                self._put(group_name, stream_name, batch)
+                batches += 1
+        with self._lock:
+            self.events_pushed += len(events)
+            self.batches += batches
+        return len(events)
+
+    def ship(self, events_by_stream: Mapping[Tuple[str, str], Sequence[Dict[str, Any]]]) -> Dict[str, int]:
+        """Ship every stream, ``max_workers`` streams at a time."""
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="log-ship") as pool:
+            futures = [
+                pool.submit(self.ship_stream, group_name, stream_name, events)
+                for (group_name, stream_name), events in events_by_stream.items()
+            ]
+            for future in futures:
+                future.result()
+        return self.stats()
+
+    def ship_events(
+        self,
+        events: Iterable[Tuple[str, str, Dict[str, Any]]],
+        chunk_events: int = MAX_BATCH_EVENTS,
+        pool: Optional[Executor] = None,
+    ) -> int:
+        """Ship ``(group, stream, event)`` tuples as they are read, in per-stream chunks.
+
+        At most ``chunk_events`` events wait per stream and ``max_workers``
+        chunks are in flight, so memory stays flat however large the input.
+        Each chunk is sorted on its own; PutLogEvents only needs each batch in
+        order. Runs on ``pool`` if given. Returns the number of events shipped.
+        """
+        own_pool = pool is None
+        if own_pool:
+            pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="log-ship")
+        buffers: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        in_flight: deque = deque()
+        shipped = 0
+
+        def submit(key: Tuple[str, str], chunk: List[Dict[str, Any]]) -> None:
+            nonlocal shipped
+            while len(in_flight) >= self.max_workers:
+                shipped += in_flight.popleft().result()
+            in_flight.append(pool.submit(self.ship_stream, key[0], key[1], chunk))
+
+        try:
+            for group_name, stream_name, event in events:
+                key = (group_name, stream_name)
+                buffers[key].append(event)
+                if len(buffers[key]) >= chunk_events:
+                    submit(key, buffers.pop(key))
+            for key, chunk in buffers.items():
+                submit(key, chunk)
+            while in_flight:
+                shipped += in_flight.popleft().result()
+        finally:
+            if own_pool:
+                pool.shutdown(wait=True)
+        return shipped
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "log_groups_created": self.log_groups_created,
+                "events_pushed": self.events_pushed,
+                "batches": self.batches,
+                "rejected_batches": self.rejected,
+            }
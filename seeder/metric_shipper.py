@@ -0,0 +1,154 @@
+import logging
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import boto3
+
+from app.tools.timeutil import from_epoch_ms
+
+# PutMetricData limits: https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/API_PutMetricData.html
+MAX_DATUMS_PER_CALL = 1000
+MAX_VALUES_PER_DATUM = 150
+MAX_REQUEST_BYTES = 1_000_000  # 1 MB POST limit, with headroom
+RESOLUTION_SECONDS = 60  # standard-resolution metrics keep one-minute buckets
+SHIP_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+def _bucket(timestamp_ms: int, resolution_seconds: int) -> int:
+    step = resolution_seconds * 1000
+    return timestamp_ms - timestamp_ms % step
+
+
+def build_datums(
+    metric_name: str,
+    dimensions: Sequence[Dict[str, str]],
+    points: Iterable[Tuple[int, float]],
+    unit: str | None = None,
+    resolution_seconds: int = RESOLUTION_SECONDS,
+) -> List[Dict[str, Any]]:
+    """Collapse one series into as few MetricDatum entries as CloudWatch keeps apart.
+
+    ``points`` are (epoch-ms, value) pairs. Points sharing a
+    ``resolution_seconds`` bucket become one datum: a single
+    ``Value``, or ``Values``/``Counts`` for up to 150 distinct values, or
+    ``StatisticValues`` (count/sum/min/max) past that.
+    """
+    buckets: Dict[int, Counter] = defaultdict(Counter)
+    for timestamp, value in points:
+        buckets[_bucket(timestamp, resolution_seconds)][float(value)] += 1
+    datums = []
+    for timestamp in sorted(buckets):
+        counts = buckets[timestamp]
+        datum: Dict[str, Any] = {
+            "MetricName": metric_name,
+            "Dimensions": list(dimensions),
+            "Timestamp": from_epoch_ms(timestamp),
+        }
+        if unit:
+            datum["Unit"] = unit
+        if len(counts) == 1 and next(iter(counts.values())) == 1:
+            datum["Value"] = next(iter(counts))
+        elif len(counts) <= MAX_VALUES_PER_DATUM:
+            datum["Values"] = list(counts)
+            datum["Counts"] = [float(c) for c in counts.values()]
+        else:
+            datum["StatisticValues"] = {
+                "SampleCount": float(sum(counts.values())),
+                "Sum": sum(v * c for v, c in counts.items()),
+                "Minimum": min(counts),
+                "Maximum": max(counts),
+            }
+        datums.append(datum)
+    return datums
+
+
+def _datum_bytes(datum: Dict[str, Any]) -> int:
+    # Upper estimate of the query-protocol encoding, which spells out every member
+    # path (MetricData.member.N.Values.member.M=...): ~40 bytes per field.
+    size = 160 + len(datum["MetricName"])
+    for dimension in datum["Dimensions"]:
+        size += 100 + len(dimension["Name"]) + len(dimension["Value"])
+    return size + 80 * len(datum.get("Values", ())) + (200 if "StatisticValues" in datum else 0)
+
+
+def batch_datums(datums: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """Group datums into PutMetricData calls of at most 1,000 items and ~1 MB."""
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    for datum in datums:
+        datum_bytes = _datum_bytes(datum)
+        if batch and (len(batch) >= MAX_DATUMS_PER_CALL or size + datum_bytes > MAX_REQUEST_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(datum)
+        size += datum_bytes
+    if batch:
+        yield batch
+
+
+class MetricShipper:
+    """Packs datums per namespace and ships namespaces in parallel."""
+
+    def __init__(self, cloudwatch: boto3.client, max_workers: int = SHIP_WORKERS):
+        self.cloudwatch = cloudwatch
+        self.max_workers = max_workers
+
+    def _ship_namespace(self, namespace: str, datums: List[Dict[str, Any]]) -> Tuple[int, int]:
+        calls = 0
+        for batch in batch_datums(datums):
+            self.cloudwatch.put_metric_data(Namespace=namespace, MetricData=batch)
+            calls += 1
+        return calls, len(datums)
+
+    def ship(self, datums_by_namespace: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        calls = datums = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="metric-ship") as pool:
+            futures = {
+                namespace: pool.submit(self._ship_namespace, namespace, items)
+                for namespace, items in datums_by_namespace.items()
+                if items
+            }
+            for namespace, future in futures.items():
+                namespace_calls, namespace_datums = future.result()
+                logger.info("Pushed %d datums → %s in %d calls", namespace_datums, namespace, namespace_calls)
+                calls += namespace_calls
+                datums += namespace_datums
+        return {"namespaces": len(futures), "datums": datums, "put_calls": calls}
+
+    def ship_datums(self, datums: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+        """Ship ``(namespace, datum)`` pairs as they are built, one full call's worth at a time.
+
+        At most ``MAX_DATUMS_PER_CALL`` datums wait per namespace and
+        ``max_workers`` chunks are in flight.
+        """
+        buffers: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        in_flight: deque = deque()
+        namespaces: set[str] = set()
+        calls = shipped = 0
+
+        def settle() -> None:
+            nonlocal calls, shipped
+            chunk_calls, chunk_datums = in_flight.popleft().result()
+            calls += chunk_calls
+            shipped += chunk_datums
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="metric-ship") as pool:
+
+            def submit(namespace: str, chunk: List[Dict[str, Any]]) -> None:
+                while len(in_flight) >= self.max_workers:
+                    settle()
+                namespaces.add(namespace)
+                in_flight.append(pool.submit(self._ship_namespace, namespace, chunk))
+
+            for namespace, datum in datums:
+                buffers[namespace].append(datum)
+                if len(buffers[namespace]) >= MAX_DATUMS_PER_CALL:
+                    submit(namespace, buffers.pop(namespace))
+            for namespace, chunk in buffers.items():
+                submit(namespace, chunk)
+            while in_flight:
+                settle()
+        return {"namespaces": len(namespaces), "datums": shipped, "put_calls": calls}
@@ -0,0 +1,78 @@
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+import boto3
+from botocore.config import Config
+
+S3_MAX_WORKERS = int(os.environ.get("SEEDER_S3_WORKERS", "32"))
+
+T = TypeVar("T")
+
+_clients: Dict[Tuple[str, int], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def shared_s3_client(region: str, max_workers: int = S3_MAX_WORKERS):
+    """One S3 client per region for the container, sized for ``max_workers`` threads.
+
+    boto3 clients are thread-safe, and the default pool of 10 connections would
+    make most download threads wait on a socket.
+    """
+    key = (region, max_workers)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = boto3.client(
+                "s3",
+                region_name=region,
+                config=Config(
+                    max_pool_connections=max_workers + 4,
+                    retries={"max_attempts": 10, "mode": "adaptive"},
+                ),
+            )
+        return _clients[key]
+
+
+def list_keys(s3_client, bucket: str, prefixes: Sequence[str], max_workers: int = S3_MAX_WORKERS) -> List[str]:
+    """All keys under ``prefixes``, listing the prefixes concurrently."""
+
+    def _list(prefix: str) -> List[str]:
+        keys: List[str] = []
+        kwargs: Dict[str, Any] = {"Bucket": bucket, "Prefix": prefix}
+        while True:
+            page = s3_client.list_objects_v2(**kwargs)
+            keys.extend(obj["Key"] for obj in page.get("Contents", []) if obj.get("Key"))
+            if not page.get("IsTruncated"):
+                return keys
+            kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prefixes)))) as pool:
+        return [key for keys in pool.map(_list, prefixes) for key in keys]
+
+
+def fetch_concurrently(
+    fetch: Callable[[str], T], keys: Iterable[str], max_workers: int = S3_MAX_WORKERS
+) -> Iterator[Tuple[str, T]]:
+    """Yield ``(key, fetch(key))`` as downloads complete, in completion order.
+
+    At most ``2 * max_workers`` fetches are queued or running at once, so a
+    backfill of thousands of objects never holds more than that many parsed
+    payloads waiting for the consumer. Errors from ``fetch`` propagate.
+    """
+    keys = iter(keys)
+    limit = 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-fetch") as pool:
+        pending = {}
+        for key in keys:
+            pending[pool.submit(fetch, key)] = key
+            if len(pending) >= limit:
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                yield key, future.result()
+                for next_key in keys:
+                    pending[pool.submit(fetch, next_key)] = next_key
+                    break
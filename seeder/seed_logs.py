@@ -1,167 +1,78 @@
 import json
 import logging
-from collections import defaultdict
-from datetime import datetime, timezone
-from typing import Any, Dict, Tuple, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Tuple
 
 import boto3
+from botocore.config import Config
+
+from app.tools.timeutil import to_epoch_ms
+from seeder.json_stream import iter_records
+from seeder.log_shipper import LogShipper
+from seeder.s3_ingest import S3_MAX_WORKERS, fetch_concurrently, list_keys, shared_s3_client
 
 SERVICES = ["checkout-service", "payment-service", "inventory-service"]
 LOG_GROUP_TEMPLATE = "/bayer/{service}"
+PUSH_WORKERS = 8
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def _parse_timestamp_to_millis(value: Any) -> int | None:
-    if value is None:
-        return None
-    if isinstance(value, (int, float)):
-        ts = float(value)
-        if ts > 1e14:
-            seconds = ts / 1e9
-        elif ts > 1e12:
-            seconds = ts / 1000.0
-        else:
-            seconds = ts
-        return int(seconds * 1000)
-    if isinstance(value, str):
-        normalized = value.strip()
-        if not normalized:
-            return None
-        if normalized.endswith("Z"):
-            normalized = normalized[:-1] + "+00:00"
-        try:
-            parsed = datetime.fromisoformat(normalized)
-        except ValueError:
-            try:
-                parsed = datetime.fromtimestamp(float(normalized), tz=timezone.utc)
-            except ValueError:
-                return None
-        return int(parsed.timestamp() * 1000)
-    return None
-
-
-def _read_json_from_s3(s3_client: boto3.client, bucket: str, key: str) -> Sequence[Any]:
+def _read_json_from_s3(s3_client: boto3.client, bucket: str, key: str) -> Iterator[Any]:
+    # Records are decoded straight off the response body, one at a time.
     response = s3_client.get_object(Bucket=bucket, Key=key)
-    payload = response["Body"].read()
     try:
-        data = json.loads(payload)
-    except json.JSONDecodeError as exc:
+        yield from iter_records(response["Body"])
+    except ValueError as exc:
         logger.warning("Failed to parse %s: %s", key, exc)
-        return []
-    if isinstance(data, dict):
-        return data.get("logs") or data.get("entries") or data.get("records") or []
-    if isinstance(data, list):
-        return data
-    return []
-
 
-def _ensure_log_group(logs_client: boto3.client, group_name: str, cache: set[str]) -> bool:
-    if group_name in cache:
-        return False
-    try:
-        logs_client.create_log_group(logGroupName=group_name)
-        cache.add(group_name)
-        return True
-    except logs_client.exceptions.ResourceAlreadyExistsException:
-        cache.add(group_name)
-        return False
-
-
-def _ensure_log_stream(logs_client: boto3.client, group_name: str, stream_name: str, cache: set[Tuple[str, str]]) -> None:
-    key = (group_name, stream_name)
-    if key in cache:
-        return
-    try:
-        logs_client.create_log_stream(logGroupName=group_name, logStreamName=stream_name)
-    except logs_client.exceptions.ResourceAlreadyExistsException:
-        pass
-    cache.add(key)
 
-
-def _describe_sequence_token(logs_client: boto3.client, group_name: str, stream_name: str) -> str | None:
-    response = logs_client.describe_log_streams(
-        logGroupName=group_name,
-        logStreamNamePrefix=stream_name,
-        limit=1,
+def _iter_events(service: str, entries: Iterable[Any]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    group_name = LOG_GROUP_TEMPLATE.format(service=service)
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        instance_id = (
+            entry.get("instance_id")
+            or entry.get("instance")
+            or entry.get("host")
+            or entry.get("host_id")
+            or "unknown"
+        )
+        timestamp = to_epoch_ms(entry.get("timestamp"))
+        if timestamp is None:
+            continue
+        message = json.dumps(entry, default=str)
+        yield group_name, str(instance_id), {"timestamp": timestamp, "message": message}
+
+
+def seed_logs(
+    bucket: str,
+    region: str = "us-east-1",
+    max_workers: int = S3_MAX_WORKERS,
+    push_workers: int = PUSH_WORKERS,
+) -> Dict[str, int]:
+    # Objects are downloaded and parsed on a bounded pool. Each download streams
+    # its records into the push pool in per-stream chunks as it reads them, so
+    # CloudWatch writes overlap the downloads and no object is held whole.
+    s3_client = shared_s3_client(region, max_workers)
+    logs_client = boto3.client(
+        "logs", region_name=region, config=Config(max_pool_connections=push_workers + 2)
     )
-    streams = response.get("logStreams")
-    if not streams:
-        return None
-    return streams[0].get("uploadSequenceToken")
-
-
-def _push_events(
-    logs_client: boto3.client,
-    group_name: str,
-    stream_name: str,
-    events: Sequence[Dict[str, Any]],
-    sequence_token: str | None,
-) -> str | None:
-    payload = {
-        "logGroupName": group_name,
-        "logStreamName": stream_name,
-        "logEvents": events,
-    }
-    if sequence_token:
-        payload["sequenceToken"] = sequence_token
-    try:
-        response = logs_client.put_log_events(**payload)
-        return response.get("nextSequenceToken")
-    except logs_client.exceptions.InvalidSequenceTokenException:
-        token = _describe_sequence_token(logs_client, group_name, stream_name)
-        if token:
-            payload["sequenceToken"] = token
-            response = logs_client.put_log_events(**payload)
-            return response.get("nextSequenceToken")
-        raise
-
-
-def seed_logs(bucket: str, region: str = "us-east-1") -> Dict[str, int]:
-    s3_client = boto3.client("s3", region_name=region)
-    logs_client = boto3.client("logs", region_name=region)
-    log_groups_created = 0
-    events_pushed = 0
-    log_group_cache: set[str] = set()
-    stream_cache: set[Tuple[str, str]] = set()
-    entries_by_stream: dict[Tuple[str, str], list[Dict[str, Any]]] = defaultdict(list)
-
-    for service in SERVICES:
-        prefix = f"logs/{service}/"
-        paginator = s3_client.get_paginator("list_objects_v2")
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            for obj in page.get("Contents", []):
-                key = obj.get("Key")
-                if not key:
-                    continue
-                for entry in _read_json_from_s3(s3_client, bucket, key):
-                    if not isinstance(entry, dict):
-                        continue
-                    instance_id = (
-                        entry.get("instance_id")
-                        or entry.get("instance")
-                        or entry.get("host")
-                        or entry.get("host_id")
-                        or "unknown"
-                    )
-                    timestamp = _parse_timestamp_to_millis(entry.get("timestamp"))
-                    if timestamp is None:
-                        continue
-                    message = json.dumps(entry, default=str)
-                    group_name = LOG_GROUP_TEMPLATE.format(service=service)
-                    stream_name = str(instance_id)
-                    entries_by_stream[(group_name, stream_name)].append(
-                        {"timestamp": timestamp, "message": message}
-                    )
-    for (group_name, stream_name), events in entries_by_stream.items():
-        events.sort(key=lambda item: item["timestamp"])
-        if _ensure_log_group(logs_client, group_name, log_group_cache):
-            log_groups_created += 1
-        _ensure_log_stream(logs_client, group_name, stream_name, stream_cache)
-        sequence_token = _describe_sequence_token(logs_client, group_name, stream_name)
-        next_token = _push_events(logs_client, group_name, stream_name, events, sequence_token)
-        if next_token:
-            logger.debug("Updated sequence token for %s/%s", group_name, stream_name)
-        events_pushed += len(events)
-    return {"log_groups_created": log_groups_created, "events_pushed": events_pushed}
+    shipper = LogShipper(logs_client, max_workers=push_workers)
+    keys = list_keys(s3_client, bucket, [f"logs/{service}/" for service in SERVICES], max_workers)
+    logger.info("Seeding %d log objects from s3://%s", len(keys), bucket)
+
+    with ThreadPoolExecutor(max_workers=push_workers, thread_name_prefix="log-push") as push_pool:
+        for _ in fetch_concurrently(
+            lambda k: shipper.ship_events(
+                _iter_events(k.split("/")[1], _read_json_from_s3(s3_client, bucket, k)),
+                pool=push_pool,
+            ),
+            keys,
+            max_workers,
+        ):
+            pass
+    stats = shipper.stats()
+    return {"log_groups_created": stats["log_groups_created"], "events_pushed": stats["events_pushed"]}
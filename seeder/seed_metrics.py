@@ -1,11 +1,15 @@
-import json
 import logging
-from datetime import datetime, timezone
+from collections import defaultdict
 from typing import Any, Dict
 
 import boto3
 from botocore.exceptions import ClientError
 
+from app.tools.timeutil import bulk_epoch_ms
+from seeder.json_stream import iter_records
+from seeder.metric_shipper import MetricShipper, build_datums
+from seeder.s3_ingest import fetch_concurrently, shared_s3_client
+
 SERVICES = ["checkout-service", "payment-service", "inventory-service"]
 METRICS_PREFIX = "metrics/{service}/timeseries.json"
 
@@ -13,99 +17,87 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def _parse_timestamp_to_datetime(value: Any) -> datetime | None:
-    if value is None:
-        return None
-    if isinstance(value, (int, float)):
-        timestamp = float(value)
-        if timestamp > 1e14:
-            seconds = timestamp / 1e9
-        elif timestamp > 1e12:
-            seconds = timestamp / 1000.0
-        else:
-            seconds = timestamp
-        return datetime.fromtimestamp(seconds, tz=timezone.utc)
-    if isinstance(value, str):
-        normalized = value.strip()
-        if not normalized:
-            return None
-        if normalized.endswith("Z"):
-            normalized = normalized[:-1] + "+00:00"
-        try:
-            return datetime.fromisoformat(normalized)
-        except ValueError:
-            try:
-                return datetime.fromtimestamp(float(normalized), tz=timezone.utc)
-            except ValueError:
-                return None
-    return None
-
-
 def _read_timeseries_from_s3(s3_client: boto3.client, bucket: str, key: str) -> Dict[str, Any]:
+    # Metrics are decoded one at a time off the response body; only the
+    # compact (timestamp, value) points of each are kept.
     response = s3_client.get_object(Bucket=bucket, Key=key)
-    payload = response["Body"].read()
+    metrics = []
     try:
-        return json.loads(payload)
-    except json.JSONDecodeError as exc:
+        for metric in iter_records(response["Body"], keys=("metrics", "data")):
+            if not isinstance(metric, dict):
+                continue
+            datapoints = [
+                p for p in metric.pop("datapoints", None) or metric.pop("timeseries", None) or []
+                if isinstance(p, dict)
+            ]
+            timestamps = bulk_epoch_ms([p.get("timestamp") for p in datapoints])
+            metric["points"] = [
+                (timestamp, p["value"])
+                for timestamp, p in zip(timestamps, datapoints)
+                if timestamp is not None and p.get("value") is not None
+            ]
+            metrics.append(metric)
+    except ValueError as exc:
         logger.warning("Could not parse metrics payload %s: %s", key, exc)
-        return {}
+    return {"metrics": metrics}
+
+
+def _read_service_timeseries(s3_client: boto3.client, bucket: str, key: str) -> Dict[str, Any] | None:
+    try:
+        return _read_timeseries_from_s3(s3_client, bucket, key)
+    except ClientError as exc:
+        error_code = exc.response.get("Error", {}).get("Code")
+        if error_code == "NoSuchKey":
+            logger.info("Metrics file missing at %s", key)
+            return None
+        raise
+
+
+def _namespace_for(metric: Dict[str, Any], service: str) -> str:
+    namespace = metric.get("namespace") or "BEYERS"
+    # AWS/* namespaces are reserved for AWS; the metrics agent reads Bayer/<Service>.
+    if namespace.startswith("AWS/") or namespace == "CWAgent":
+        namespace = f"Bayer/{service.replace('-', '_').title().replace('_', '')}"
+    return namespace
 
 
 def seed_metrics(bucket: str, region: str = "us-east-1") -> Dict[str, int]:
-    s3_client = boto3.client("s3", region_name=region)
+    s3_client = shared_s3_client(region)
     cloudwatch = boto3.client("cloudwatch", region_name=region)
     services_seeded = 0
     datapoints_pushed = 0
-    for service in SERVICES:
-        key = METRICS_PREFIX.format(service=service)
-        try:
-            payload = _read_timeseries_from_s3(s3_client, bucket, key)
-        except ClientError as exc:
-            error_code = exc.response.get("Error", {}).get("Code")
-            if error_code == "NoSuchKey":
-                logger.info("Metrics file missing for %s at %s", service, key)
-                continue
-            raise
-        metrics = payload.get("metrics") or payload.get("data") or []
-        if not metrics:
+    datums_by_namespace: dict[str, list[Dict[str, Any]]] = defaultdict(list)
+    keys = {METRICS_PREFIX.format(service=service): service for service in SERVICES}
+    for key, payload in fetch_concurrently(
+        lambda k: _read_service_timeseries(s3_client, bucket, k), keys, len(keys)
+    ):
+        service = keys[key]
+        if payload is None:
             continue
         service_seeded = False
-        for metric in metrics:
-            namespace = metric.get("namespace") or "BEYERS"
+        for metric in payload["metrics"]:
             metric_name = metric.get("metric_name") or metric.get("name")
-            if not metric_name:
+            points = metric["points"]
+            if not metric_name or not points:
                 continue
-            datapoints = metric.get("datapoints") or metric.get("timeseries") or []
-            batch: list[Dict[str, Any]] = []
-            for point in datapoints:
-                if not isinstance(point, dict):
-                    continue
-                timestamp = _parse_timestamp_to_datetime(point.get("timestamp"))
-                if not timestamp:
-                    continue
-                value = point.get("value")
-                if value is None:
-                    continue
-                payload_entry: Dict[str, Any] = {
-                    "MetricName": metric_name,
-                    "Dimensions": [
+            datums_by_namespace[_namespace_for(metric, service)].extend(
+                build_datums(
+                    metric_name,
+                    [
                         {"Name": "ServiceName", "Value": service},
                         {"Name": "Environment", "Value": "production"},
                     ],
-                    "Timestamp": timestamp,
-                    "Value": value,
-                }
-                unit = metric.get("unit")
-                if unit:
-                    payload_entry["Unit"] = unit
-                batch.append(payload_entry)
-                datapoints_pushed += 1
-                if len(batch) == 20:
-                    cloudwatch.put_metric_data(Namespace=namespace, MetricData=batch)
-                    batch = []
-                service_seeded = True
-            if batch:
-                cloudwatch.put_metric_data(Namespace=namespace, MetricData=batch)
+                    points,
+                    metric.get("unit"),
+                )
+            )
+            datapoints_pushed += len(points)
+            service_seeded = True
         if service_seeded:
             services_seeded += 1
-    return {"services_seeded": services_seeded, "datapoints_pushed": datapoints_pushed}
+    stats = MetricShipper(cloudwatch).ship(datums_by_namespace)
+    return {
+        "services_seeded": services_seeded,
+        "datapoints_pushed": datapoints_pushed,
+        "put_calls": stats["put_calls"],
+    }
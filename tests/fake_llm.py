@@ -0,0 +1,38 @@
+"""Scripted stand-in for Bedrock models, shared by tests that drive the agents."""
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+class ScriptedLlm(BaseLlm):
+    """Fake model that replays a fixed list of responses, one per call."""
+
+    script: list = []
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        response = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        yield response
+
+
+def function_call(name, args, prompt_tokens=120, output_tokens=30):
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))],
+        ),
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens, candidates_token_count=output_tokens
+        ),
+    )
+
+
+def text(value, prompt_tokens=200, output_tokens=50):
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=value)]),
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens, candidates_token_count=output_tokens
+        ),
+    )
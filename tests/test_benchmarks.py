@@ -0,0 +1,33 @@
+import unittest
+
+from benchmarks import generators
+from benchmarks.run import BENCHMARKS, compare, run_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_generators_are_seeded_and_scaled(self):
+        self.assertEqual(generators.deployments(0.001), generators.deployments(0.001))
+        self.assertEqual(len(generators.log_entries(0.001)), 1000)
+        series = generators.metric_series(0.01)
+        self.assertEqual(len(series), 1)
+        self.assertEqual(len(next(iter(series.values()))), 200)
+
+    def test_suite_runs_at_small_scale_and_flags_regressions(self):
+        results = run_benchmarks(scale=0.001, repeat=1)
+
+        self.assertEqual(set(results["benchmarks"]), set(BENCHMARKS))
+        self.assertEqual(results["meta"]["scale"], 0.001)
+
+        slower = {
+            "benchmarks": {
+                name: {**r, "min_s": r["min_s"] * 2 + 1e-6}
+                for name, r in results["benchmarks"].items()
+            }
+        }
+        self.assertEqual(compare(results, results), [])
+        self.assertEqual(set(compare(results, slower)), set(BENCHMARKS))
+
+
+if __name__ == "__main__":
+    unittest.main()
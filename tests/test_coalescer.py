@@ -0,0 +1,125 @@
+import threading
+import time
+import unittest
+
+from app.tools.coalescer import (
+    MAX_RESULT_BYTES,
+    InMemoryCoalesceBackend,
+    coalesce_key,
+    lease_result,
+    run_coalesced,
+)
+from app.tools.serialization import pack, unpack
+
+
+def _incident(incident_id, detected_at="2026-02-06T14:30:00Z", metric="p99_latency_ms"):
+    return {
+        "incident_id": incident_id,
+        "service": "checkout-service",
+        "metric_name": metric,
+        "detected_at": detected_at,
+    }
+
+
+class TestCoalescer(unittest.TestCase):
+
+    def test_key_groups_alarms_in_the_same_bucket(self):
+        a = coalesce_key(_incident("INC-1", "2026-02-06T14:30:05Z"), window_seconds=300)
+        b = coalesce_key(_incident("INC-2", "2026-02-06T14:32:40Z"), window_seconds=300)
+        c = coalesce_key(_incident("INC-3", "2026-02-06T14:36:00Z"), window_seconds=300)
+        d = coalesce_key(_incident("INC-4", metric="error_rate_percent"), window_seconds=300)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertNotEqual(a, d)
+        self.assertTrue(a.startswith("checkout-service#p99_latency_ms#"))
+
+    def test_alarm_storm_runs_one_investigation(self):
+        backend = InMemoryCoalesceBackend()
+        runs = []
+        results = {}
+
+        def investigate():
+            runs.append(1)
+            time.sleep(0.2)
+            return {"response": "# Incident Report"}
+
+        def fire(i):
+            incident = _incident(f"INC-{i}", f"2026-02-06T14:30:0{i}Z")
+            results[i] = run_coalesced(incident, investigate, backend=backend)
+
+        threads = [threading.Thread(target=fire, args=(i,)) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(runs), 1)
+        self.assertTrue(all(r["response"] == "# Incident Report" for r in results.values()))
+        followers = [r for r in results.values() if "coalesced_with" in r]
+        self.assertEqual(len(followers), 4)
+
+        # A late duplicate in the same bucket gets the finished result immediately.
+        late = run_coalesced(_incident("INC-9", "2026-02-06T14:31:00Z"), investigate, backend=backend)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(late["response"], "# Incident Report")
+
+    def test_followers_learn_when_the_leader_fails(self):
+        backend = InMemoryCoalesceBackend()
+        started = threading.Event()
+        follower_result = {}
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("Bedrock throttled")
+
+        def follow():
+            started.wait()
+            follower_result["r"] = run_coalesced(
+                _incident("INC-2"), failing, backend=backend, wait_seconds=5
+            )
+
+        follower = threading.Thread(target=follow)
+        follower.start()
+        with self.assertRaises(RuntimeError):
+            run_coalesced(_incident("INC-1"), failing, backend=backend)
+        follower.join()
+
+        self.assertEqual(follower_result["r"]["status"], "leader_failed")
+        self.assertEqual(follower_result["r"]["coalesced_with"], "INC-1")
+
+    def test_finished_leases_expire_for_every_key(self):
+        backend = InMemoryCoalesceBackend()
+        backend.try_acquire("done", "INC-1", ttl_seconds=0.05)
+        backend.publish("done", {"response": "# Incident Report"})
+        backend.try_acquire("running", "INC-2", ttl_seconds=0.05)
+        time.sleep(0.1)
+
+        self.assertIsNone(backend.try_acquire("other", "INC-3", ttl_seconds=60))
+
+        self.assertEqual(sorted(backend._entries), ["other", "running"])
+
+    def test_published_result_fits_a_dynamodb_item(self):
+        small = {"response": "# Incident Report", "session_id": "s-1"}
+        self.assertEqual(lease_result(small), pack(small))
+
+        huge = {
+            "response": "| row | value |\n" * 60_000,
+            "session_id": "s-1",
+            "report_url": "s3://reports/INC-1/rca.md",
+            "trace": {"spans": [{"name": "llm", "ms": i} for i in range(20_000)]},
+        }
+        with self.assertLogs("app.tools.coalescer", "WARNING"):
+            packed = lease_result(huge)
+
+        self.assertLessEqual(len(packed), MAX_RESULT_BYTES)
+        result = unpack(packed)
+        self.assertNotIn("trace", result)
+        self.assertTrue(result["response_truncated"])
+        self.assertTrue(huge["response"].startswith(result["response"]))
+        self.assertGreater(len(result["response"]), MAX_RESULT_BYTES // 2)
+        self.assertEqual(result["report_url"], "s3://reports/INC-1/rca.md")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from app.agents.commander import commander_agent
+from app.agents.deploy_agent import deploy_agent
+from app.agents.logs_agent import analyze_logs
+from app.handler import lambda_handler
+from app.local.dynamodb import LocalDynamoDB
+from app.local.s3 import LocalS3
+from app.tools import coalescer, deadline, report_generator, s3_deployments, state_store
+from app.tools.state_store import StateStore
+
+_WINDOW = {"start": "2026-02-06T14:00:00Z", "end": "2026-02-06T14:35:00Z", "incident_id": "INC-1"}
+
+
+def _context(agent):
+    return SimpleNamespace(agent_name=agent, state={})
+
+
+_instructions = []
+
+
+class _SilentLlm(BaseLlm):
+    """A Commander that never gets to the report; records the end of each request."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        last = llm_request.contents[-1] if llm_request.contents else None
+        _instructions.append("".join(p.text or "" for p in (last.parts if last else None) or []))
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="Still thinking.")]))
+
+
+class _HungLlm(BaseLlm):
+    """A Commander whose model call never returns."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        await asyncio.sleep(3600)
+        yield LlmResponse()
+
+
+class _DeployCallingLlm(BaseLlm):
+    """A deploy agent that asks for the deploy history over two days, then answers."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if any(p.function_response for c in llm_request.contents for p in c.parts or []):
+            part = types.Part(text="Done.")
+        else:
+            window = {"start": "2026-02-05T14:00:00Z", "end": "2026-02-06T14:35:00Z"}
+            part = types.Part(
+                function_call=types.FunctionCall(
+                    name="get_deployments", args={"service": "checkout-service", "time_window": window}
+                )
+            )
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+class _SlowCache:
+    """Each S3 read takes longer than the deploy agent's whole slice."""
+
+    def get(self, bucket, key, parse, missing=None):
+        time.sleep(0.3)
+        return missing
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_sub_agents_split_what_is_left_of_investigate(self):
+        budget = deadline.Budget("INC-1", 100.0)
+
+        self.assertAlmostEqual(budget.phase_end("INVESTIGATE") - budget.start, 70.0)
+        self.assertAlmostEqual(budget.phase_end("REPORT") - budget.start, 100.0)
+        logs_end = budget.start_agent("logs_agent")
+        self.assertAlmostEqual(logs_end - budget.start, 70.0 / 3, delta=0.5)
+        self.assertAlmostEqual(budget.remaining(), 70.0 / 3, delta=0.5)
+        budget.finish_agent("logs_agent")
+        # logs_agent finished early, so the two agents left share the rest.
+        metrics_end = budget.start_agent("metrics_agent")
+        self.assertAlmostEqual(metrics_end - budget.start, 35.0, delta=0.5)
+
+    def test_logs_query_is_stopped_when_the_budget_runs_out(self):
+        client = MagicMock()
+        client.start_query.return_value = {"queryId": "q-1"}
+        client.get_query_results.return_value = {"status": "Running"}
+
+        with patch("app.tools.cloudwatch_logs.boto3.client", return_value=client), deadline.incident_budget(
+            "INC-1", seconds=0.05
+        ):
+            envelope = analyze_logs("checkout-service", _WINDOW)
+
+        client.stop_query.assert_called_once_with(queryId="q-1")
+        self.assertEqual(envelope["status"], "failed")
+        self.assertIn("still running", envelope["error"])
+        self.assertIsNone(deadline.remaining())
+
+    def test_callbacks_fail_expired_agents_and_steer_the_commander(self):
+        with deadline.incident_budget("INC-1", seconds=0.0) as budget:
+            deadline.agent_started(_context("metrics_agent"))
+            tool = SimpleNamespace(name="query_metrics_and_detect_anomalies")
+            skipped = deadline.tool_started(tool, {}, _context("metrics_agent"))
+            stopped = deadline.model_started(_context("metrics_agent"), LlmRequest())
+            request = LlmRequest()
+            self.assertIsNone(deadline.model_started(_context("commander"), request))
+
+        self.assertEqual((skipped["agent"], skipped["status"]), ("metrics_agent", "failed"))
+        envelope = json.loads(stopped.content.parts[0].text)
+        self.assertEqual((envelope["agent"], envelope["incident_id"]), ("metrics_agent", "INC-1"))
+        self.assertEqual(budget.drain_failures(), [envelope])
+        # Steering goes after the conversation; the cached system prompt is untouched.
+        self.assertIn("generate_rca_markdown", request.contents[-1].parts[0].text)
+        self.assertIsNone(request.config.system_instruction)
+        # No budget, no interference.
+        self.assertIsNone(deadline.tool_started(tool, {}, _context("metrics_agent")))
+
+    def test_tool_that_runs_out_of_time_mid_call_fails_its_agent(self):
+        from google.adk.runners import InMemoryRunner
+
+        source = s3_deployments.DeploymentSource(layout="daily", cache=_SlowCache())
+
+        async def run():
+            runner = InMemoryRunner(agent=deploy_agent, app_name="test")
+            session = await runner.session_service.create_session(app_name="test", user_id="u")
+            message = types.Content(role="user", parts=[types.Part(text="Check checkout-service deploys.")])
+            responses = []
+            async for event in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+                responses += [r.response for r in event.get_function_responses()]
+            return responses
+
+        # A 0.6s budget leaves deploy_agent ~0.14s: the first day's read passes
+        # the check, the second day's read is refused part way through the tool.
+        with patch.object(deploy_agent, "model", _DeployCallingLlm(model="stub/deploy")), patch.object(
+            s3_deployments, "_default_source", source
+        ), deadline.incident_budget("INC-1", seconds=0.6):
+            responses = asyncio.run(run())
+
+        self.assertEqual(len(responses), 1)
+        envelope = responses[0]
+        self.assertEqual((envelope["agent"], envelope["status"]), ("deploy_agent", "failed"))
+        self.assertIn("get_deployments stopped", envelope["error"])
+        self.assertIn("time budget exhausted", envelope["error"])
+
+    def test_handler_escalates_on_partial_evidence_when_the_budget_is_spent(self):
+        s3 = LocalS3()
+        store = StateStore("AIC-IncidentState", dynamodb=LocalDynamoDB())
+        with open("mock_data/cloudwatch_alarm.json") as f:
+            event = json.load(f)["mock_alarm_event"]
+        lambda_context = SimpleNamespace(get_remaining_time_in_millis=lambda: 30_000)
+
+        with patch.object(commander_agent, "model", _SilentLlm(model="stub/silent")), patch.object(
+            state_store, "_default_store", store
+        ), patch.object(report_generator, "REPORTS_BUCKET", "reports"), patch.object(
+            report_generator.boto3, "client", lambda *a, **k: s3
+        ), patch.object(coalescer, "COALESCE_ENABLED", False):
+            started = time.monotonic()
+            response = lambda_handler(event, lambda_context)
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertIn("budget is exhausted", _instructions[-1])
+        self.assertEqual(response["statusCode"], 200)
+        markdown = s3.get_object(Bucket="reports", Key="INC-20260206-143000/rca.md")["Body"].read().decode()
+        self.assertIn("time budget ran out", markdown)
+        self.assertIn("escalate", markdown.lower())
+
+    def test_hung_commander_is_stopped_inside_the_reserve(self):
+        s3 = LocalS3()
+        store = StateStore("AIC-IncidentState", dynamodb=LocalDynamoDB())
+        with open("mock_data/cloudwatch_alarm.json") as f:
+            event = json.load(f)["mock_alarm_event"]
+
+        with patch.object(commander_agent, "model", _HungLlm(model="stub/hung")), patch.object(
+            deadline, "GRACE_SECONDS", 0.5
+        ), patch.object(state_store, "_default_store", store), patch.object(
+            report_generator, "REPORTS_BUCKET", "reports"
+        ), patch.object(report_generator.boto3, "client", lambda *a, **k: s3), patch.object(
+            coalescer, "COALESCE_ENABLED", False
+        ):
+            started = time.monotonic()
+            with self.assertLogs("app.tools.deadline", "WARNING"):
+                response = lambda_handler(event, SimpleNamespace(get_remaining_time_in_millis=lambda: 60_500))
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(response["statusCode"], 200)
+        markdown = s3.get_object(Bucket="reports", Key="INC-20260206-143000/rca.md")["Body"].read().decode()
+        self.assertIn("time budget ran out", markdown)
+
+
+if __name__ == "__main__":
+    unittest.main()
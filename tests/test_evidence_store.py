@@ -0,0 +1,132 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.local.aws import patch_aws
+from app.local.pipeline import run_pipeline
+from app.tools import cloudwatch_logs, evidence_store, s3_deployments
+from app.tools.evidence_store import EvidenceStore
+
+
+def _evidence(codes, confidence, action="rollback", deploy="deploy-1"):
+    return {
+        "findings": [
+            {
+                "agent": "logs_agent",
+                "summary": "errors",
+                "findings": [{"matched_entries": 10, "error_summary": {c: {"count": 5} for c in codes}}],
+            },
+            {
+                "agent": "metrics_agent",
+                "findings": [
+                    {
+                        "metric_name": "p99_latency_ms",
+                        "anomaly_start": "2026-02-06T14:25:00Z",
+                        "raw_datapoints": [
+                            {"timestamp": "2026-02-06T14:20:00Z", "value": 180},
+                            {"timestamp": "2026-02-06T14:25:00Z", "value": 2100},
+                        ],
+                    }
+                ],
+            },
+            {
+                "agent": "deploy_agent",
+                "findings": [
+                    {"deploy_id": deploy, "timestamp": "2026-02-06T14:00:00Z", "correlation_score": 0.9,
+                     "matched_keywords": ["pool"], "config_diff": {"max": "100 → 50"}},
+                    {"deploy_id": "deploy-0", "timestamp": "2026-02-06T11:00:00Z", "correlation_score": 0.1},
+                ],
+            },
+        ],
+        "decision": {"base_confidence": confidence},
+        "action": {"recommended_action": action, "confidence": confidence, "root_cause": "pool config"},
+    }
+
+
+def _incident(n, service="checkout-service", day=6):
+    return {"incident_id": f"INC-{n}", "service": service, "detected_at": f"2026-02-{day:02d}T14:30:00Z"}
+
+
+class TestEvidenceStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = EvidenceStore(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_append_and_pruned_scans(self):
+        written = self.store.append(_incident(1), _evidence(["DB_CONN_TIMEOUT"], 0.9))
+        self.store.append(_incident(2, day=7), _evidence(["POOL_EXHAUSTED"], 0.4, "escalate"))
+        self.store.append(_incident(3, service="payment-service"), _evidence(["UPSTREAM_5XX"], 0.7))
+        self.store.append(_incident(1), _evidence(["DB_CONN_TIMEOUT"], 0.95))  # re-run replaces
+
+        self.assertEqual(written, {"incidents": 1, "metrics": 2, "deployments": 2})
+        checkout = self.store.scan("incidents", service="checkout-service")
+        self.assertEqual(sorted(checkout["incident_id"].to_pylist()), ["INC-1", "INC-2"])
+        self.assertEqual(self.store.scan("incidents", since="2026-02-07")["incident_id"].to_pylist(), ["INC-2"])
+        row = self.store.scan("incidents", service="checkout-service", until="2026-02-06").to_pylist()[0]
+        self.assertEqual(row["confidence"], 0.95)
+        self.assertEqual(row["top_deploy_id"], "deploy-1")
+        self.assertEqual(row["deploy_keywords"], ["pool"])
+        metrics = self.store.scan("metrics", service="checkout-service", columns=["value", "anomalous"])
+        self.assertEqual(metrics.num_rows, 4)
+        self.assertEqual(sorted(metrics["anomalous"].to_pylist()), [False, False, True, True])
+
+    def test_raw_get_deployments_findings_are_scored(self):
+        incident = _incident(1)
+        with patch_aws(), patch.object(s3_deployments, "_default_source", None):
+            deployments = s3_deployments.get_deployments(
+                "checkout-service",
+                {"start": "2026-02-06T12:00:00Z", "end": incident["detected_at"]},
+                incident_time=incident["detected_at"],
+            )["deployments"]
+        evidence = _evidence(["DB_CONN_TIMEOUT"], 0.9)
+        # What the deploy agent's envelope carries: the rows as get_deployments returned them.
+        evidence["findings"][2]["findings"] = deployments
+        self.assertNotIn("correlation_score", deployments[0])
+
+        rows = evidence_store.evidence_rows(incident, evidence)
+
+        row = rows["incidents"][0]
+        self.assertEqual(row["top_deploy_id"], "deploy-20260206-1410")
+        self.assertEqual(row["top_deploy_score"], 0.9)
+        self.assertEqual(row["deploy_keywords"], ["config", "limit"])
+        self.assertEqual(
+            [(d["deploy_id"], d["correlation_score"], d["minutes_before_incident"]) for d in rows["deployments"]],
+            [("deploy-20260206-1410", 0.9, 20.0), ("deploy-20260206-1400", 0.8, 30.0)],
+        )
+
+    def test_repeat_lookup_and_calibration(self):
+        self.store.append(_incident(1, day=1), _evidence(["DB_CONN_TIMEOUT", "POOL_EXHAUSTED"], 0.92))
+        self.store.append(_incident(2, day=2), _evidence(["DB_CONN_TIMEOUT"], 0.85))
+        self.store.append(_incident(3, day=3), _evidence(["UPSTREAM_5XX"], 0.35, "escalate"))
+
+        repeats = self.store.repeat_incidents("checkout-service", ["DB_CONN_TIMEOUT", "POOL_EXHAUSTED"])
+
+        self.assertEqual([r["incident_id"] for r in repeats], ["INC-1", "INC-2"])
+        self.assertEqual(repeats[0]["shared_error_codes"], 2)
+        self.assertEqual(repeats[0]["detected_at"], "2026-02-01T14:30:00Z")
+        calibration = self.store.confidence_calibration(bins=10)
+        self.assertEqual([(c["bin"], c["incidents"], c["rollback_rate"]) for c in calibration],
+                         [(0.3, 1, 0.0), (0.8, 1, 1.0), (0.9, 1, 1.0)])
+
+    def test_pipeline_appends_when_enabled(self):
+        with patch.object(evidence_store, "EVIDENCE_DIR", self._tmp.name), patch.object(
+            evidence_store, "_default_store", None
+        ), patch_aws(), patch.object(cloudwatch_logs, "POLL_INTERVAL_SECONDS", 0), patch.object(
+            s3_deployments, "_default_source", None
+        ):
+            with open("mock_data/cloudwatch_alarm.json") as f:
+                result = run_pipeline(json.load(f)["mock_alarm_event"])
+
+        row = self.store.scan("incidents", service="checkout-service").to_pylist()[0]
+        self.assertEqual(row["incident_id"], result["incident_id"])
+        self.assertIn("DB_CONN_TIMEOUT", row["error_codes"])
+        self.assertEqual(row["recommended_action"], result["recommended_action"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.local.aws import MockDataStore, patch_aws
+from app.local.pipeline import run_pipeline
+from app.tools import cloudwatch_logs, s3_deployments
+from benchmarks.incidents import IncidentSpec, write_incident
+
+SPEC = IncidentSpec(services=4, duration_minutes=90, events_per_second=2, faulty_service=1, seed=5)
+
+
+class TestSyntheticIncidents(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_output_is_seeded_and_loads_into_the_stubs(self):
+        truth = write_incident(SPEC, self.out / "a")
+        again = write_incident(SPEC, self.out / "b")
+
+        self.assertEqual(truth, again)
+        for path in sorted((self.out / "a").rglob("*.*")):
+            self.assertEqual(path.read_bytes(), (self.out / "b" / path.relative_to(self.out / "a")).read_bytes())
+        self.assertEqual(truth["service"], "payment-service")
+        self.assertEqual(truth["log_events"], 4 * 90 * 60 * 2)
+
+        store = MockDataStore(self.out / "a")
+        self.assertEqual(sum(len(store.logs(s)) for s in ("checkout-service", "payment-service",
+                                                          "inventory-service", "shipping-service")),
+                         truth["log_events"])
+        self.assertEqual(len(store.metrics("payment-service")["p99_latency_ms"]), 90)
+
+    def test_pipeline_finds_the_injected_root_cause(self):
+        for fmt in ("ndjson", "parquet"):
+            with self.subTest(fmt=fmt):
+                root = self.out / fmt
+                truth = write_incident(SPEC, root, fmt)
+                with open(root / "cloudwatch_alarm.json") as f:
+                    event = json.load(f)["mock_alarm_event"]
+
+                with patch_aws(MockDataStore(root)), patch.object(
+                    cloudwatch_logs, "POLL_INTERVAL_SECONDS", 0
+                ), patch.object(s3_deployments, "_default_source", None):
+                    result = run_pipeline(event)
+
+                self.assertEqual(result["incident_id"], truth["incident_id"])
+                self.assertEqual(result["service"], truth["service"])
+                self.assertIn(f"Top deploy: {truth['root_cause_deploy_id']}", result["report"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import datetime
+import unittest
+
+from botocore.exceptions import ClientError
+
+from app.local.aws import MockDataStore, StubLogsClient, StubMetricsClient
+
+START = 1_770_386_400  # 2026-02-06T14:00:00Z
+
+
+def _entry(second, level="INFO", code=None, latency=100):
+    entry = {
+        "timestamp": datetime.datetime.fromtimestamp(START + second, datetime.timezone.utc).isoformat(),
+        "level": level,
+        "message": "pool exhausted" if code else "ok",
+        "metadata": {"response_time_ms": latency},
+    }
+    if code:
+        entry["error_code"] = code
+    return entry
+
+
+def _query(logs, query, start=START, end=START + 3600, **kwargs):
+    query_id = logs.start_query(
+        logGroupName="/bayer/checkout-service", startTime=start, endTime=end, queryString=query, **kwargs
+    )["queryId"]
+    response = logs.get_query_results(queryId=query_id)
+    return [{f["field"]: f["value"] for f in row} for row in response["results"]], response["statistics"]
+
+
+class TestInsightsStub(unittest.TestCase):
+
+    def setUp(self):
+        store = MockDataStore(root=None)
+        # Added out of order on purpose: the store keeps time order.
+        store.add_logs("checkout-service", [_entry(s) for s in range(600, 1200)])
+        store.add_logs(
+            "checkout-service",
+            [_entry(s, "ERROR", "DB_CONN_TIMEOUT" if s % 3 else "POOL_EXHAUSTED", 2500) for s in range(0, 600, 10)],
+        )
+        self.logs = StubLogsClient(store)
+
+    def test_window_filters_sort_and_limit(self):
+        rows, stats = _query(
+            self.logs,
+            "fields @timestamp, error_code | filter level in ['ERROR', 'FATAL'] and error_code != 'POOL_EXHAUSTED' "
+            "| filter @message like /pool|timeout/ | sort @timestamp desc | limit 5",
+            end=START + 300,
+        )
+
+        self.assertEqual(stats["recordsScanned"], 31)
+        self.assertEqual(stats["recordsMatched"], 20)
+        self.assertEqual([r["@timestamp"] for r in rows][:2], ["2026-02-06 14:04:50.000", "2026-02-06 14:04:40.000"])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {"@timestamp", "error_code"})
+
+        slow, _ = _query(self.logs, "filter metadata.response_time_ms >= 2000 | fields level", limit=3)
+        self.assertEqual([r["level"] for r in slow], ["ERROR"] * 3)
+
+    def test_stats_count_by_field_and_bin(self):
+        rows, _ = _query(
+            self.logs, "filter level = 'ERROR' | stats count(*) as errors by error_code | sort errors desc"
+        )
+        self.assertEqual(rows, [
+            {"error_code": "DB_CONN_TIMEOUT", "errors": "40"},
+            {"error_code": "POOL_EXHAUSTED", "errors": "20"},
+        ])
+
+        binned, _ = _query(self.logs, "stats count() by bin(10m) | sort bin(10m) asc")
+        self.assertEqual([r["count(*)"] for r in binned], ["60", "600"])
+
+        with self.assertRaises(ClientError) as raised:
+            _query(self.logs, "parse @message 'x'")
+        self.assertEqual(raised.exception.response["Error"]["Code"], "MalformedQueryException")
+
+    def test_metric_data_aggregates_per_period_newest_first(self):
+        store = MockDataStore(root=None)
+        store.add_metrics(
+            "checkout-service",
+            "p99_latency_ms",
+            [{"timestamp": START + s, "value": s} for s in range(0, 180, 10)],
+        )
+        query = {
+            "Id": "m0",
+            "MetricStat": {
+                "Metric": {
+                    "MetricName": "p99_latency_ms",
+                    "Dimensions": [{"Name": "ServiceName", "Value": "checkout-service"}],
+                },
+                "Period": 60,
+                "Stat": "Maximum",
+            },
+        }
+        start = datetime.datetime.fromtimestamp(START, datetime.timezone.utc)
+
+        result = StubMetricsClient(store).get_metric_data(
+            MetricDataQueries=[query], StartTime=start, EndTime=start + datetime.timedelta(hours=1)
+        )["MetricDataResults"][0]
+
+        self.assertEqual(result["Values"], [170.0, 110.0, 50.0])
+        self.assertEqual(result["Timestamps"][0], start + datetime.timedelta(minutes=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
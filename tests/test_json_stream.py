@@ -0,0 +1,54 @@
+import io
+import json
+import unittest
+
+from app.local.s3 import LocalS3
+from seeder.json_stream import iter_records
+from seeder.seed_logs import _read_json_from_s3
+
+RECORDS = [
+    {"timestamp": f"2026-02-06T14:{i % 60:02d}:00Z", "message": f"héllo ✓ {i}", "latency": i * 1.25, "ok": None}
+    for i in range(500)
+]
+
+
+class TestJsonStream(unittest.TestCase):
+
+    def test_array_wrapper_and_ndjson_at_any_chunk_size(self):
+        documents = {
+            "array": json.dumps(RECORDS),
+            "wrapper": json.dumps({"service": "checkout-service", "logs": RECORDS, "tail": [1, 2]}, indent=2),
+            "ndjson": "\n".join(json.dumps(r) for r in RECORDS) + "\n",
+        }
+        for name, document in documents.items():
+            for chunk_size in (1, 7, 4096):
+                with self.subTest(name=name, chunk_size=chunk_size):
+                    stream = io.BytesIO(document.encode())
+                    self.assertEqual(list(iter_records(stream, chunk_size=chunk_size)), RECORDS)
+
+    def test_decodes_one_record_at_a_time(self):
+        class Counting(io.BytesIO):
+            consumed = 0
+
+            def read(self, size=-1):
+                chunk = super().read(size)
+                self.consumed += len(chunk)
+                return chunk
+
+        stream = Counting(json.dumps({"logs": RECORDS}).encode())
+        first = next(iter_records(stream, chunk_size=256))
+
+        self.assertEqual(first, RECORDS[0])
+        self.assertLess(stream.consumed, 1024)
+
+    def test_seeder_streams_s3_bodies_and_tolerates_bad_json(self):
+        s3 = LocalS3()
+        s3.put_object(Bucket="mock", Key="logs/a.json", Body=json.dumps({"entries": RECORDS}))
+        s3.put_object(Bucket="mock", Key="logs/bad.json", Body=b'[{"timestamp": 1}, {"oops"')
+
+        self.assertEqual(list(_read_json_from_s3(s3, "mock", "logs/a.json")), RECORDS)
+        self.assertEqual(list(_read_json_from_s3(s3, "mock", "logs/bad.json")), [{"timestamp": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import asyncio
+import io
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from app.agents.models import ScheduledLlm
+from app.tools import llm_scheduler
+from app.tools.llm_scheduler import (
+    PRIORITY_DECIDE,
+    PRIORITY_SUB_AGENT,
+    LlmScheduler,
+    ModelLimits,
+    emit_metrics,
+)
+
+_ROOMY = ModelLimits(requests_per_minute=6000, tokens_per_minute=1e9, max_concurrency=1)
+
+
+class _FakeBackend(BaseLlm):
+    """Answers after a short delay with fixed usage, or raises ``error``."""
+
+    error: str = ""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        await asyncio.sleep(0.01)
+        if self.error:
+            raise RuntimeError(self.error)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="ok")]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=300, candidates_token_count=100
+            ),
+        )
+
+
+class TestLlmScheduler(unittest.TestCase):
+
+    def test_priority_then_round_robin_across_incidents(self):
+        scheduler = LlmScheduler(default_limits=_ROOMY)
+        order = []
+
+        async def call(incident, priority, label):
+            grant = await scheduler.acquire("m", incident, priority)
+            order.append(label)
+            await asyncio.sleep(0)
+            scheduler.release(grant)
+
+        async def run():
+            holder = await scheduler.acquire("m", "A", PRIORITY_SUB_AGENT)
+            tasks = [
+                asyncio.create_task(call(incident, priority, label))
+                for incident, priority, label in [
+                    ("A", PRIORITY_SUB_AGENT, "A1"),
+                    ("A", PRIORITY_SUB_AGENT, "A2"),
+                    ("A", PRIORITY_SUB_AGENT, "A3"),
+                    ("B", PRIORITY_SUB_AGENT, "B1"),
+                    ("B", PRIORITY_DECIDE, "B-decide"),
+                ]
+            ]
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.stats()["m"]["queued"], 5)
+            scheduler.release(holder)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+
+        self.assertEqual(order, ["B-decide", "A1", "B1", "A2", "A3"])
+
+    def test_token_bucket_delays_until_refilled(self):
+        # 6000 tokens/min = 100 tokens/s; the first call takes the whole minute.
+        scheduler = LlmScheduler(default_limits=ModelLimits(6000, 6000, 4))
+
+        async def run():
+            first = await scheduler.acquire("m", tokens=6000)
+            second = await scheduler.acquire("m", tokens=30)
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        self.assertLess(first.wait_s, 0.05)
+        self.assertGreaterEqual(second.wait_s, 0.25)
+
+    def test_cancelled_waiter_does_not_strand_the_refill_timer(self):
+        # 60 requests/min = one per second once the bucket is drained.
+        scheduler = LlmScheduler(default_limits=ModelLimits(60, 1e9, 100))
+
+        async def drain_then_cancel():
+            for _ in range(60):
+                scheduler.release(await scheduler.acquire("m"))
+            # Queues behind the empty bucket; its refill timer is on this loop.
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(scheduler.acquire("m"), 0.05)
+
+        async def acquire_on_new_loop():
+            return await asyncio.wait_for(scheduler.acquire("m"), 5)
+
+        asyncio.run(drain_then_cancel())
+        grant = asyncio.run(acquire_on_new_loop())
+
+        self.assertLess(grant.wait_s, 2)
+        self.assertEqual(scheduler.stats()["m"]["queued"], 0)
+
+    def test_scheduled_model_settles_usage_and_backs_off_on_throttling(self):
+        scheduler = LlmScheduler(default_limits=ModelLimits(60, 100_000, 2))
+        model = ScheduledLlm(model="bedrock/fake", inner=_FakeBackend(model="bedrock/fake"))
+        request = LlmRequest(
+            model="bedrock/fake",
+            contents=[types.Content(role="user", parts=[types.Part(text="x" * 400)])],
+        )
+
+        async def generate(llm):
+            return [r async for r in llm.generate_content_async(request)]
+
+        with patch.object(llm_scheduler, "_default_scheduler", scheduler):
+            responses = asyncio.run(generate(model))
+            throttled = model.model_copy(update={"inner": _FakeBackend(model="x", error="ThrottlingException")})
+            with self.assertRaises(RuntimeError):
+                asyncio.run(generate(throttled))
+
+        self.assertEqual(responses[0].content.parts[0].text, "ok")
+        queue = scheduler._queues["bedrock/fake"]
+        self.assertEqual(queue.in_flight, 0)
+        self.assertLessEqual(queue.tokens.level, 0)  # drained by the throttle
+        out = io.StringIO()
+        self.assertEqual(emit_metrics(out, scheduler), 1)
+        record = json.loads(out.getvalue())
+        self.assertEqual(record["Model"], "bedrock/fake")
+        self.assertEqual((record["Calls"], record["Throttles"]), (2, 1))
+        self.assertEqual(record["_aws"]["CloudWatchMetrics"][0]["Namespace"], "AIC/LLMScheduler")
+        self.assertEqual(emit_metrics(io.StringIO(), scheduler), 0)  # window was reset
+
+    def test_grants_cross_event_loops(self):
+        # One scheduler, two threads each running its own loop (as the handlers do).
+        scheduler = LlmScheduler(default_limits=_ROOMY)
+        done = []
+
+        def worker(incident):
+            async def run():
+                for _ in range(20):
+                    grant = await scheduler.acquire("m", incident)
+                    await asyncio.sleep(0.001)
+                    scheduler.release(grant)
+                done.append(incident)
+
+            asyncio.run(run())
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in ("A", "B")]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+
+        self.assertEqual(sorted(done), ["A", "B"])
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(scheduler.stats()["m"]["granted"], 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
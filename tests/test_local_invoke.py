@@ -1 +1,61 @@
-#!/usr/bin/env python3
+import json
+import unittest
+from unittest.mock import patch
+
+import replay_local
+from app.agents.commander import commander_agent
+from app.local.aws import patch_aws
+from app.local.llm import StubLlm
+from app.local.pipeline import run_pipeline
+from app.tools import cloudwatch_logs, coalescer, tracing
+
+
+def _alarm_event():
+    with open("mock_data/cloudwatch_alarm.json") as f:
+        return json.load(f)["mock_alarm_event"]
+
+
+class TestLocalInvoke(unittest.TestCase):
+
+    def test_pipeline_runs_every_phase_against_stubs(self):
+        with patch_aws(), patch.object(cloudwatch_logs, "POLL_INTERVAL_SECONDS", 0):
+            with tracing.trace_incident("local", enabled=True, export=False) as trace:
+                result = run_pipeline(_alarm_event())
+
+        self.assertEqual(result["service"], "checkout-service")
+        self.assertIn("# Incident Report: INC-20260206-143000", result["report"])
+        self.assertIn("DB_CONN_TIMEOUT", result["report"])
+        summary = trace.summary()
+        self.assertEqual(list(summary["phases"]), list(tracing.PHASES))
+        self.assertGreaterEqual(summary["aws"]["calls"], 4)
+
+    def test_handler_replay_with_stub_llm(self):
+        with patch_aws(), patch.object(
+            commander_agent, "model", StubLlm(model="stub/commander")
+        ), patch.object(tracing, "TRACE_ENABLED", True), patch.object(
+            tracing, "TRACE_DIR", "/tmp/aic-test-traces"
+        ), patch.object(
+            coalescer, "COALESCE_ENABLED", False
+        ), patch.object(
+            replay_local, "_MODE", "handler"
+        ):
+            result = replay_local.replay_one(0, _alarm_event())
+
+        self.assertNotIn("error", result)
+        self.assertIn("REPORT", result["phases"])
+
+    def test_summary_percentiles(self):
+        results = [{"index": i, "latency_ms": float(i + 1), "phases": {"PLAN": 2.0}} for i in range(100)]
+        results.append({"index": 100, "latency_ms": 1.0, "error": "boom"})
+
+        summary = replay_local.summarize(results, wall_s=2.0)
+
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["throughput_per_s"], 50.5)
+        self.assertEqual(summary["latency_ms"]["p50"], 50.0)
+        self.assertEqual(summary["latency_ms"]["p99"], 99.0)
+        self.assertEqual(summary["phases_ms"]["PLAN"], {"mean": 2.0, "p95": 2.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from app.local.logs import LocalLogs
+from seeder.log_shipper import (
+    EVENT_OVERHEAD_BYTES,
+    MAX_BATCH_BYTES,
+    LogShipper,
+    make_batches,
+)
+
+HOUR_MS = 60 * 60 * 1000
+
+
+def _events(n, size=100, step_ms=1000, start=1_770_000_000_000):
+    return [{"timestamp": start + i * step_ms, "message": "x" * size} for i in range(n)]
+
+
+class TestLogShipper(unittest.TestCase):
+
+    def test_batches_respect_count_bytes_and_span(self):
+        by_count = list(make_batches(_events(25_000, size=10)))
+        self.assertEqual([len(b) for b in by_count], [10_000, 10_000, 5_000])
+
+        by_bytes = list(make_batches(_events(5_000, size=1_000)))
+        per_batch = MAX_BATCH_BYTES // (1_000 + EVENT_OVERHEAD_BYTES)
+        self.assertEqual(len(by_bytes[0]), per_batch)
+        self.assertEqual(sum(len(b) for b in by_bytes), 5_000)
+
+        by_span = list(make_batches(_events(60, step_ms=HOUR_MS)))
+        self.assertEqual([len(b) for b in by_span], [25, 25, 10])
+
+        huge = list(make_batches([{"timestamp": 0, "message": "y" * 300_000}]))
+        self.assertLessEqual(len(huge[0][0]["message"]) + EVENT_OVERHEAD_BYTES, 256 * 1024)
+
+    def test_ships_streams_without_sequence_token_round_trips(self):
+        logs = LocalLogs()
+        streams = {
+            ("/bayer/checkout-service", f"i-{n}"): list(reversed(_events(3_000, size=500)))
+            for n in range(4)
+        }
+
+        stats = LogShipper(logs, max_workers=4).ship(streams)
+
+        self.assertEqual(stats["events_pushed"], 12_000)
+        self.assertEqual(stats["log_groups_created"], 1)
+        self.assertNotIn("DescribeLogStreams", logs.calls)
+        self.assertEqual(logs.calls["PutLogEvents"], stats["batches"])
+        self.assertEqual(len(logs.events("/bayer/checkout-service", "i-3")), 3_000)
+
+    def test_streamed_events_ship_in_bounded_chunks(self):
+        logs = LocalLogs()
+        shipper = LogShipper(logs, max_workers=2)
+        chunks = []
+        ship_stream = shipper.ship_stream
+
+        def record(group_name, stream_name, events):
+            chunks.append(len(events))
+            return ship_stream(group_name, stream_name, events)
+
+        shipper.ship_stream = record
+        events = (
+            ("/bayer/checkout-service", f"i-{i % 3}", event)
+            for i, event in enumerate(_events(10_000, size=50))
+        )
+
+        self.assertEqual(shipper.ship_events(events, chunk_events=1_000), 10_000)
+        self.assertLessEqual(max(chunks), 1_000)
+        self.assertEqual(sum(chunks), 10_000)
+        self.assertEqual(
+            sum(len(logs.events("/bayer/checkout-service", f"i-{n}")) for n in range(3)), 10_000
+        )
+
+    def test_recovers_when_sequence_tokens_are_enforced(self):
+        logs = LocalLogs(require_sequence_token=True)
+        shipper = LogShipper(logs)
+
+        shipper.ship_stream("/bayer/payment-service", "i-1", _events(10, size=10))
+        shipper.ship_stream("/bayer/payment-service", "i-1", _events(25_000, size=10, start=1_770_100_000_000))
+
+        self.assertEqual(len(logs.events("/bayer/payment-service", "i-1")), 25_010)
+
+
+if __name__ == "__main__":
+    unittest.main()
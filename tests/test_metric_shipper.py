@@ -0,0 +1,68 @@
+import datetime
+import json
+import unittest
+from unittest.mock import patch
+
+from app.local.cloudwatch import LocalCloudWatch
+from app.local.s3 import LocalS3
+from app.tools.timeutil import to_epoch_ms
+from seeder import seed_metrics as seed_metrics_module
+from seeder.metric_shipper import batch_datums, build_datums
+
+SERVICES = ["checkout-service", "payment-service", "inventory-service"]
+START = datetime.datetime(2026, 1, 23, tzinfo=datetime.timezone.utc)
+
+
+class TestMetricShipper(unittest.TestCase):
+
+    def test_points_collapse_into_values_counts_and_statistics(self):
+        start_ms = to_epoch_ms(START)
+        minute = [(start_ms + s * 1000, v) for s, v in [(0, 5), (10, 5), (20, 7)]]
+        noisy = [(start_ms + 60_000 + s * 100, s) for s in range(200)]
+
+        datums = build_datums("p99_latency_ms", [], minute + noisy, "Milliseconds")
+
+        self.assertEqual(datums[0]["Timestamp"], START)
+        self.assertEqual(datums[0]["Values"], [5.0, 7.0])
+        self.assertEqual(datums[0]["Counts"], [2.0, 1.0])
+        self.assertEqual(datums[1]["StatisticValues"]["SampleCount"], 200.0)
+        self.assertEqual(datums[1]["StatisticValues"]["Maximum"], 199.0)
+        self.assertEqual([len(b) for b in batch_datums([datums[0]] * 2500)], [1000, 1000, 500])
+
+    def test_fourteen_day_backfill_uses_far_fewer_calls(self):
+        s3, cloudwatch = LocalS3(), LocalCloudWatch()
+        minutes = 14 * 24 * 60
+        for service in SERVICES:
+            metrics = [
+                {
+                    "metric_name": name,
+                    "namespace": namespace,
+                    "unit": "Percent",
+                    "datapoints": [
+                        {"timestamp": (START + datetime.timedelta(minutes=m)).isoformat(), "value": m % 7}
+                        for m in range(minutes)
+                    ],
+                }
+                for name, namespace in [("cpu_utilization_percent", "AWS/EC2"), ("error_rate_percent", "Bayer/X")]
+            ]
+            s3.put_object(
+                Bucket="mock", Key=f"metrics/{service}/timeseries.json", Body=json.dumps({"metrics": metrics})
+            )
+
+        with patch.object(seed_metrics_module, "shared_s3_client", return_value=s3), patch.object(
+            seed_metrics_module.boto3, "client", return_value=cloudwatch
+        ):
+            result = seed_metrics_module.seed_metrics("mock")
+
+        points = 3 * 2 * minutes
+        self.assertEqual(result["datapoints_pushed"], points)
+        legacy_calls = 3 * 2 * -(-minutes // 20)
+        self.assertLess(result["put_calls"] * 10, legacy_calls)
+        self.assertEqual(cloudwatch.calls["PutMetricData"], result["put_calls"])
+        self.assertEqual(
+            cloudwatch.sample_count("Bayer/CheckoutService", "cpu_utilization_percent"), minutes
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
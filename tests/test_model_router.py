@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+import unittest
+from unittest.mock import patch
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from app.agents.models import ScheduledLlm
+from app.tools import llm_scheduler, model_router
+from app.tools.envelope import build_response_envelope
+from app.tools.llm_scheduler import LlmScheduler, ModelLimits
+from app.tools.model_router import TIER_PINNED, TIER_SMALL, route
+
+PINNED = "bedrock/anthropic.claude-sonnet-4-5-20250929-v1:0"
+SMALL = "bedrock/anthropic.claude-haiku-4-5-20251001-v1:0"
+_START = datetime.datetime.now(datetime.timezone.utc)
+
+_called_models = []
+
+
+class _RecordingBackend(BaseLlm):
+    async def generate_content_async(self, llm_request, stream=False):
+        _called_models.append(llm_request.model)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="ok")]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=2000, candidates_token_count=400
+            ),
+        )
+
+
+def _logs_envelope(counts):
+    findings = [{"matched_entries": sum(counts.values()),
+                 "error_summary": {code: {"count": n} for code, n in counts.items()}}]
+    return build_response_envelope("logs_agent", "INC-1", findings if counts else [], _START)
+
+
+def _request(*responses):
+    contents = [types.Content(role="user", parts=[types.Part(text="Investigate INC-1")])]
+    for response in responses:
+        contents.append(
+            types.Content(
+                role="user",
+                parts=[types.Part(function_response=types.FunctionResponse(name="t", response=response))],
+            )
+        )
+    return LlmRequest(
+        model=PINNED,
+        contents=contents,
+        config=types.GenerateContentConfig(labels={"adk_agent_name": "logs_agent"}),
+    )
+
+
+class TestModelRouter(unittest.TestCase):
+
+    def test_simple_evidence_goes_small_and_multi_signal_stays_pinned(self):
+        cases = [
+            ([], TIER_SMALL),
+            ([_logs_envelope({})], TIER_SMALL),  # no_findings
+            ([{"error": "AccessDenied"}], TIER_SMALL),
+            ([_logs_envelope({"DB_CONN_TIMEOUT": 46, "DB_POOL_EXHAUSTED": 4})], TIER_SMALL),
+            ([_logs_envelope({"DB_CONN_TIMEOUT": 20, "OOM_KILLED": 15})], TIER_PINNED),
+            ([{"anomalies": [{"metric_name": "Latency"}, {"metric_name": "5XXError"}], "count": 2}], TIER_PINNED),
+            ([{"deployments": [{"risk_flag": None}, {"risk_flag": None}]},
+              {"deployment_data": {"commits": []}}], TIER_SMALL),
+            ([{"deployments": [{"risk_flag": "config"}, {"risk_flag": "config"}]}], TIER_PINNED),
+        ]
+        for responses, tier in cases:
+            with self.subTest(responses=responses):
+                self.assertEqual(route(PINNED, SMALL, responses)[1], tier)
+
+        model, tier, reason = route(PINNED, SMALL, [_logs_envelope({"DB_CONN_TIMEOUT": 46, "X": 4})])
+        self.assertEqual((model, tier), (SMALL, TIER_SMALL))
+        self.assertIn("dominant DB_CONN_TIMEOUT 92%", reason)
+        # Without a small model (the Commander, or tiering switched off) nothing moves.
+        self.assertEqual(route(PINNED, None, [])[:2], (PINNED, TIER_PINNED))
+
+    def test_scheduled_model_routes_and_logs_savings_per_incident(self):
+        _called_models.clear()
+        llm = ScheduledLlm(model=PINNED, inner=_RecordingBackend(model=PINNED), small_model=SMALL)
+        simple = _request(_logs_envelope({"DB_CONN_TIMEOUT": 50}))
+        ambiguous = _request(_logs_envelope({"DB_CONN_TIMEOUT": 20, "OOM_KILLED": 15}))
+
+        async def run():
+            for request in (ambiguous, simple):
+                async for _ in llm.generate_content_async(request):
+                    pass
+
+        scheduler = LlmScheduler(default_limits=ModelLimits(6000, 1e9, 4))
+        with patch.object(llm_scheduler, "_default_scheduler", scheduler), \
+                model_router.incident("INC-1") as routing:
+            asyncio.run(run())
+
+        self.assertEqual(_called_models, [PINNED, SMALL])
+        self.assertEqual(set(scheduler.stats()), {PINNED, SMALL})
+        summary = routing.summary()
+        self.assertEqual((summary["calls"], summary["small_calls"]), (2, 1))
+        self.assertEqual([d["agent"] for d in summary["decisions"]], ["logs_agent"] * 2)
+        # 2000 in / 400 out: Sonnet $0.012 vs Haiku $0.004.
+        self.assertAlmostEqual(summary["est_cost_saved_usd"], 0.008)
+        self.assertAlmostEqual(summary["cost_usd"], 0.016)
+        self.assertIsNone(model_router.current_log())
+
+
+if __name__ == "__main__":
+    unittest.main()
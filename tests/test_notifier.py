@@ -0,0 +1,137 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from app import handler
+from app.local.sns import LocalSNS
+from app.tools import notifier, state_store
+from app.tools.notifier import Notifier
+
+TOPIC = "arn:aws:sns:us-east-1:123456789012:aic-incident-alerts"
+
+
+def _incident(i, service="checkout-service", root_cause=None):
+    return {
+        "incident_id": f"INC-{i:03d}",
+        "summary": "Pool size cut — rollback recommended.",
+        "report_url": f"https://reports.s3.amazonaws.com/INC-{i:03d}/rca.md",
+        "recommended_action": "rollback",
+        "service": service,
+        "root_cause": root_cause or f"cause {i}",
+    }
+
+
+class _ConditionalTable:
+    """Honours the notifier's ``attribute_not_exists(PK) OR expires_at < :now`` put."""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, Item, ConditionExpression, ExpressionAttributeValues):
+        held = self.items.get(Item["PK"])
+        if held and held["expires_at"] >= ExpressionAttributeValues[":now"]:
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+            )
+        self.items[Item["PK"]] = Item
+
+
+class TestNotifier(unittest.TestCase):
+
+    def test_batches_and_deduplicates(self):
+        sns = LocalSNS()
+        sender = Notifier(TOPIC, sns=sns)
+
+        statuses = [sender.notify(_incident(i)) for i in range(23)]
+        statuses += [sender.notify(_incident(100 + i, root_cause="cause 22")) for i in range(3)]
+        sender.flush()
+
+        self.assertEqual(statuses.count("duplicate"), 3)
+        self.assertEqual(sns.calls, {"PublishBatch": 3})  # 10 + 10 + 3
+        self.assertEqual(sender.published, 23)
+        first = json.loads(sns.messages[0]["Message"])
+        self.assertEqual(sns.messages[0]["MessageStructure"], "json")
+        self.assertEqual(
+            sns.messages[0]["Subject"], "[AIC] CRITICAL — INC-000 — Rollback Recommended"
+        )
+        last = json.loads(sns.messages[-1]["Message"])
+        self.assertIn("Also seen as: INC-100, INC-101, INC-102", last["default"])
+        self.assertEqual(json.loads(first["lambda"])["service"], "checkout-service")
+
+    def test_containers_share_dedup_through_the_state_table(self):
+        table = _ConditionalTable()
+        sns = LocalSNS()
+        first, second = (Notifier(TOPIC, sns=sns, dedup_table=table) for _ in range(2))
+
+        self.assertEqual(first.notify(_incident(1)), "queued")
+        self.assertEqual(second.notify(_incident(2, root_cause="cause 1")), "duplicate")
+        self.assertEqual(second.notify(_incident(3)), "queued")
+        first.flush()
+        second.flush()
+
+        self.assertEqual(sns.calls, {"Publish": 2})
+        self.assertEqual(second.suppressed, 1)
+        self.assertEqual(sorted(table.items), sorted(
+            f"NOTIFY#{notifier.fingerprint(_incident(i))}" for i in (1, 3)
+        ))
+
+    def test_shared_dedup_outage_still_sends(self):
+        class _DownTable:
+            def put_item(self, **kwargs):
+                raise EndpointConnectionError(endpoint_url="https://dynamodb.us-east-1.amazonaws.com")
+
+        sns = LocalSNS()
+        sender = Notifier(TOPIC, sns=sns, dedup_table=_DownTable())
+        with self.assertLogs("app.tools.notifier", "WARNING"):
+            self.assertEqual(sender.notify(_incident(1)), "queued")
+        self.assertEqual(sender.flush(), 1)
+
+    def test_retries_failed_entries(self):
+        sns = LocalSNS(failure_rate=0.3, seed=7)
+        sender = Notifier(TOPIC, sns=sns)
+
+        with patch.object(notifier, "RETRY_BASE_SECONDS", 0.0):
+            for i in range(10):
+                sender.notify(_incident(i))
+
+        self.assertEqual(sender.published, 10)
+        self.assertGreater(sns.calls["PublishBatch"], 1)
+        self.assertEqual(
+            sorted(json.loads(json.loads(m["Message"])["lambda"])["incident_id"] for m in sns.messages),
+            [f"INC-{i:03d}" for i in range(10)],
+        )
+
+    def test_connection_errors_are_retried(self):
+        class _FlakySNS(LocalSNS):
+            def publish(self, **kwargs):
+                if not self.calls:
+                    self._count("Failed")
+                    raise EndpointConnectionError(endpoint_url="https://sns.us-east-1.amazonaws.com")
+                return super().publish(**kwargs)
+
+        sns = _FlakySNS()
+        sender = Notifier(TOPIC, sns=sns)
+        with patch.object(notifier, "RETRY_BASE_SECONDS", 0.0):
+            sender.notify(_incident(1))
+            self.assertEqual(sender.flush(), 1)
+
+        self.assertEqual(sns.calls, {"Failed": 1, "Publish": 1})
+
+    def test_invocation_end_publishes_even_if_the_state_flush_fails(self):
+        sns = LocalSNS()
+        sender = Notifier(TOPIC, sns=sns)
+        sender.notify(_incident(1))
+
+        with patch.object(notifier, "_default_notifier", sender), patch.object(
+            state_store, "flush_state", side_effect=RuntimeError("DynamoDB unavailable")
+        ), self.assertLogs("app.handler", "ERROR"):
+            handler._finish_invocation()
+
+        self.assertEqual(sns.calls, {"Publish": 1})
+        self.assertEqual(sender.published, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
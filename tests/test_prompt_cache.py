@@ -0,0 +1,90 @@
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Keep litellm from fetching its model price list in a background thread.
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.genai import types  # noqa: E402
+from litellm import ModelResponse  # noqa: E402
+
+from app.agents.models import CACHE_POINTS, bedrock_model  # noqa: E402
+from app.tools import deadline, llm_scheduler, model_router  # noqa: E402
+from app.tools.llm_scheduler import LlmScheduler, ModelLimits  # noqa: E402
+
+OPUS = "bedrock/anthropic.claude-opus-4-6-v1"
+_requests = []
+
+
+class _FakeLiteLLMClient:
+    """Stands in for litellm.acompletion; answers with a partly cached prompt."""
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        _requests.append({"model": model, "messages": messages, "tools": tools, **kwargs})
+        return ModelResponse(
+            model=model,
+            choices=[{"index": 0, "finish_reason": "stop",
+                      "message": {"role": "assistant", "content": "ok"}}],
+            usage={"prompt_tokens": 5000, "completion_tokens": 100, "total_tokens": 5100,
+                   "prompt_tokens_details": {"cached_tokens": 4200}},
+        )
+
+
+def _commander_request(text):
+    return LlmRequest(
+        model=OPUS,
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+        config=types.GenerateContentConfig(
+            system_instruction="You are the Incident Commander.",
+            labels={"adk_agent_name": "commander"},
+        ),
+    )
+
+
+class TestPromptCache(unittest.TestCase):
+
+    def test_static_prefix_is_marked_and_cached_tokens_are_reported(self):
+        _requests.clear()
+        llm = bedrock_model(OPUS, role="commander")
+        llm = llm.model_copy(update={"inner": llm.inner.model_copy(update={"llm_client": _FakeLiteLLMClient()})})
+        scheduler = LlmScheduler(default_limits=ModelLimits(6000, 1e9, 4))
+
+        async def turn(request):
+            return [r async for r in llm.generate_content_async(request)]
+
+        with patch.object(llm_scheduler, "_default_scheduler", scheduler), \
+                model_router.incident("INC-1") as routing:
+            first = _commander_request("Alarm for checkout-service")
+            responses = asyncio.run(turn(first))
+            # Past the budget the Commander is steered, but its system prompt stays the same.
+            with deadline.incident_budget("INC-1", seconds=0.0):
+                late = _commander_request("Alarm for checkout-service")
+                deadline.model_started(SimpleNamespace(agent_name="commander"), late)
+                asyncio.run(turn(late))
+
+        self.assertEqual(_requests[0]["cache_control_injection_points"], CACHE_POINTS)
+        # The steering note is for one turn only: the conversation's cache point
+        # stays on the last persisted message, before it.
+        steered = _requests[1]["cache_control_injection_points"]
+        self.assertEqual(steered[-1], {"location": "message", "index": -2})
+        self.assertEqual(_requests[1]["messages"][-2]["content"], "Alarm for checkout-service")
+        self.assertEqual(CACHE_POINTS[-1]["index"], -1)
+        self.assertEqual(llm.inner._additional_args["cache_control_injection_points"], CACHE_POINTS)
+        systems = [r["messages"][0] for r in _requests]
+        self.assertEqual([m["role"] for m in systems], ["system", "system"])
+        self.assertEqual(systems[0]["content"], systems[1]["content"])
+        self.assertIn("budget is exhausted", str(_requests[1]["messages"][-1]["content"]))
+
+        usage = responses[-1].usage_metadata
+        self.assertEqual((usage.prompt_token_count, usage.cached_content_token_count), (5000, 4200))
+        summary = routing.summary()
+        self.assertEqual(summary["cached_tokens"], 8400)
+        # 800 uncached + 4200 at a tenth of $5/M, plus 100 out at $25/M, per call.
+        self.assertAlmostEqual(summary["cost_usd"], 2 * (800 * 5 + 420 * 5 + 100 * 25) / 1e6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import io
+import json
+import unittest
+
+from app.agents.commander import generate_rca_markdown
+from app.tools.rca_templates import render_rca
+
+ARGS = dict(
+    incident_id="INC-20260206-143000",
+    service="checkout-service",
+    detected_at="2026-02-06T14:30:00Z",
+    root_cause="Pool <max> cut 100->50",
+    confidence=0.87,
+    recommended_action="rollback",
+    evidence_chain=["Deploy at 14:00", "Pool saturated at 14:20"],
+)
+
+
+class TestRcaTemplates(unittest.TestCase):
+
+    def test_markdown_matches_generate_rca_markdown_layout(self):
+        report = render_rca(**ARGS, generated_at="2026-02-06T15:00:00Z")
+
+        self.assertTrue(report.startswith("# Incident Report: INC-20260206-143000\n"))
+        self.assertIn("| Confidence | 87% |", report)
+        self.assertIn("## Evidence Chain\n  1. Deploy at 14:00\n  2. Pool saturated at 14:20\n", report)
+        self.assertIn("## Log Analysis\nNo log findings available.\n\n## Metric Analysis", report)
+        self.assertIn("**ROLLBACK** — Roll back checkout-service to previous version", report)
+        tool_report = generate_rca_markdown(**ARGS)
+        self.assertEqual(
+            [line for line in tool_report.splitlines() if "Generated" not in line and "generated" not in line],
+            [line for line in report.splitlines() if "Generated" not in line and "generated" not in line],
+        )
+
+    def test_html_escapes_and_json_parses(self):
+        clusters = [{"label": "DB_CONN_TIMEOUT", "count": 8, "first_seen": "14:20", "last_seen": "14:34"}]
+
+        page = render_rca("html", **ARGS, clusters=clusters)
+        self.assertIn("<td>Pool &lt;max&gt; cut 100-&gt;50</td>", page)
+        self.assertIn("<li>Deploy at 14:00</li>", page)
+        self.assertIn("<td>DB_CONN_TIMEOUT</td><td>8</td>", page)
+
+        doc = json.loads(render_rca("json", **ARGS, clusters=clusters))
+        self.assertEqual(doc["evidence_chain"], ARGS["evidence_chain"])
+        self.assertEqual(doc["clusters"], clusters)
+        with self.assertRaises(ValueError):
+            render_rca("pdf", **ARGS)
+
+    def test_large_sections_stream_in_chunks(self):
+        class CountingBuffer(io.StringIO):
+            writes = 0
+            largest = 0
+
+            def write(self, s):
+                self.writes += 1
+                self.largest = max(self.largest, len(s))
+                return super().write(s)
+
+        out = CountingBuffer()
+        rows = ({"metric_name": f"m{i}", "baseline_avg": 1, "peak_value": 2.5, "change_factor": 2.5} for i in range(5000))
+        args = {**ARGS, "evidence_chain": (f"row {i}" for i in range(5000))}
+
+        self.assertIsNone(render_rca(out=out, **args, metric_summaries=rows))
+
+        report = out.getvalue()
+        self.assertIn("  5000. row 4999\n", report)
+        self.assertIn("| m4999 | 1.00 | 2.50 | 2.5x |", report)
+        self.assertLess(out.largest, 64 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import gzip
+import json
+import random
+import unittest
+from unittest.mock import patch
+
+from app.agents.commander import commander_agent
+from app.handler import lambda_handler
+from app.local.dynamodb import LocalDynamoDB
+from app.local.llm import StubLlm
+from app.local.s3 import LocalS3
+from app.tools import coalescer, report_generator, state_store
+from app.tools.report_generator import generate_rca_report, list_reports, upload_evidence_bundle
+from app.tools.state_store import StateStore
+
+
+def _read_bundle(s3, key):
+    return json.loads(gzip.decompress(s3.get_object(Bucket="reports", Key=key)["Body"].read()))
+
+
+class TestReportGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.store = StateStore("AIC-IncidentState", dynamodb=LocalDynamoDB())
+        patcher = patch.object(state_store, "_default_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_report_bundle_and_index_are_written(self):
+        s3 = LocalS3()
+        evidence = {"decision": {"base_confidence": 0.9}, "findings": [{"agent": "logs_agent"}]}
+
+        result = generate_rca_report(
+            "INC-20260206-143000",
+            "checkout-service",
+            "2026-02-06T14:30:00.000+0000",
+            "# Incident Report",
+            evidence,
+            bucket="reports",
+            s3=s3,
+        )
+
+        self.assertEqual(result["report_s3_uri"], "s3://reports/INC-20260206-143000/rca.md")
+        self.assertEqual(_read_bundle(s3, "INC-20260206-143000/evidence.json.gz"), evidence)
+        self.assertEqual(s3.calls.get("CreateMultipartUpload", 0), 0)
+        listed = list_reports("checkout-service", "2026-02-06", bucket="reports", s3=s3)
+        self.assertEqual(
+            [(r["incident_id"], r["detected_at"]) for r in listed],
+            [("INC-20260206-143000", "2026-02-06T14:30:00Z")],
+        )
+        self.assertEqual(
+            self.store.load("INC-20260206-143000", "REPORT#")[0]["report_url"],
+            result["report_url"],
+        )
+
+    def test_large_bundle_streams_as_multipart(self):
+        s3 = LocalS3(min_part_size=4096)
+        rng = random.Random(1)
+        series = [{"t": i, "v": rng.random()} for i in range(5000)]
+
+        bundle = upload_evidence_bundle(
+            s3, "reports", "INC-1/", {"series": series}, part_size=4096
+        )
+
+        self.assertGreater(bundle["parts"], 2)
+        self.assertEqual(s3.calls["CompleteMultipartUpload"], 1)
+        self.assertLess(bundle["compressed_bytes"], bundle["raw_bytes"])
+        self.assertEqual(_read_bundle(s3, bundle["key"]), {"series": series})
+
+    def test_handler_publishes_report(self):
+        s3 = LocalS3()
+        with open("mock_data/cloudwatch_alarm.json") as f:
+            event = json.load(f)["mock_alarm_event"]
+
+        with patch.object(commander_agent, "model", StubLlm(model="stub/commander")), patch.object(
+            report_generator, "REPORTS_BUCKET", "reports"
+        ), patch.object(report_generator.boto3, "client", lambda *a, **k: s3), patch.object(
+            coalescer, "COALESCE_ENABLED", False
+        ):
+            response = lambda_handler(event)
+
+        self.assertEqual(
+            response["body"]["report_url"],
+            "https://reports.s3.amazonaws.com/INC-20260206-143000/rca.md",
+        )
+        bundle = _read_bundle(s3, "INC-20260206-143000/evidence.json.gz")
+        self.assertEqual(bundle["incident"]["service"], "checkout-service")
+        self.assertEqual(bundle["action"]["recommended_action"], "rollback")
+
+
+if __name__ == "__main__":
+    unittest.main()
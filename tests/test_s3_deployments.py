@@ -0,0 +1,87 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from app.local.s3 import LocalS3
+from app.tools import s3_deployments
+from app.tools.deploy_correlator import correlate_deploy_to_incident
+from app.tools.s3_deployments import CachedS3Objects, DeploymentSource, get_deployments
+
+WINDOW = {"start": "2026-02-06T12:00:00Z", "end": "2026-02-06T14:35:00Z"}
+
+
+def _history_s3():
+    s3 = LocalS3()
+    with open("mock_data/deployments/deploy-history.json") as f:
+        s3.put_object(Bucket="aic-mock-data", Key="deployments/deploy-history.json", Body=f.read())
+    return s3
+
+
+class TestS3Deployments(unittest.TestCase):
+
+    def test_get_deployments_filters_and_feeds_correlator(self):
+        source = DeploymentSource("aic-mock-data", "single", CachedS3Objects(_history_s3()))
+
+        with patch.object(s3_deployments, "_default_source", source):
+            result = get_deployments(
+                "checkout-service", WINDOW, incident_time="2026-02-06T14:30:00Z"
+            )
+
+        self.assertEqual(result["highest_risk_deploy"], "deploy-20260206-1400")
+        top = result["deployments"][-1]
+        self.assertEqual(top["minutes_before_incident"], 30.0)
+        self.assertEqual(top["risk_flag"], "CONFIG_CHANGE_POOL")
+        self.assertTrue(all(d["service"] == "checkout-service" for d in result["deployments"]))
+        correlation = correlate_deploy_to_incident(result["deployments"], "2026-02-06T14:15:00Z")
+        self.assertIsNotNone(correlation["highest_risk_deploy"])
+
+    def test_conditional_get_revalidates_by_etag(self):
+        s3 = _history_s3()
+        cache = CachedS3Objects(s3, revalidate_seconds=0)
+        source = DeploymentSource("aic-mock-data", "single", cache)
+
+        first = source.between("checkout-service", WINDOW["start"], WINDOW["end"])
+        second = source.between("checkout-service", WINDOW["start"], WINDOW["end"])
+        self.assertEqual(first, second)
+        self.assertEqual((cache.downloads, cache.not_modified), (1, 1))
+
+        s3.put_object(
+            Bucket="aic-mock-data",
+            Key="deployments/deploy-history.json",
+            Body=json.dumps({"deployments": []}),
+        )
+        self.assertEqual(source.between("checkout-service", WINDOW["start"], WINDOW["end"]), [])
+        self.assertEqual(cache.downloads, 2)
+
+    def test_per_day_and_per_service_layouts_fetch_only_the_window(self):
+        s3 = LocalS3()
+        deploys = [
+            {"deploy_id": f"d{day}", "timestamp": f"2026-02-0{day}T10:00:00Z", "service": svc}
+            for day in range(1, 8)
+            for svc in ("checkout-service", "payment-service")
+        ]
+        for day in range(1, 8):
+            todays = [d for d in deploys if d["timestamp"].startswith(f"2026-02-0{day}")]
+            s3.put_object(
+                Bucket="b", Key=f"deployments/2026-02-0{day}.json", Body=json.dumps({"deployments": todays})
+            )
+            for svc in ("checkout-service", "payment-service"):
+                s3.put_object(
+                    Bucket="b",
+                    Key=f"deployments/{svc}/2026-02-0{day}.json",
+                    Body=json.dumps({"deployments": [d for d in todays if d["service"] == svc]}),
+                )
+
+        daily = DeploymentSource("b", "daily", CachedS3Objects(s3))
+        found = daily.between("checkout-service", "2026-02-05T00:00:00Z", "2026-02-06T23:00:00Z")
+        self.assertEqual([d["deploy_id"] for d in found], ["d5", "d6"])
+        self.assertEqual(daily.cache.downloads, 2)
+
+        per_service = DeploymentSource("b", "service", CachedS3Objects(s3))
+        found = per_service.between(None, "2026-02-06T00:00:00Z", "2026-02-06T23:00:00Z")
+        self.assertEqual(sorted(d["service"] for d in found), ["checkout-service", "payment-service"])
+        self.assertEqual(per_service.cache.downloads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
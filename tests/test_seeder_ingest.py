@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.local.s3 import LocalS3
+from seeder import seed_logs as seed_logs_module
+from seeder.s3_ingest import fetch_concurrently
+
+
+class TestSeederIngest(unittest.TestCase):
+
+    def test_fetch_concurrently_bounds_in_flight(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def fetch(key):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.005)
+            with lock:
+                state["running"] -= 1
+            return key.upper()
+
+        results = dict(fetch_concurrently(fetch, (f"k{i}" for i in range(100)), max_workers=8))
+
+        self.assertEqual(len(results), 100)
+        self.assertEqual(results["k42"], "K42")
+        self.assertGreater(state["peak"], 1)
+        self.assertLessEqual(state["peak"], 8)
+
+    def test_seed_logs_reads_all_objects_and_pushes_per_stream(self):
+        s3 = LocalS3()
+        for service in ("checkout-service", "payment-service"):
+            for i in range(20):
+                entries = [
+                    {"timestamp": f"2026-02-06T14:{i:02d}:{j:02d}Z", "instance_id": f"i-{j % 2}", "level": "INFO"}
+                    for j in range(10)
+                ]
+                s3.put_object(Bucket="mock", Key=f"logs/{service}/{i:03d}.json", Body=json.dumps(entries))
+        logs_client = MagicMock()
+        logs_client.describe_log_streams.return_value = {"logStreams": []}
+        logs_client.put_log_events.return_value = {}
+
+        with patch.object(seed_logs_module, "shared_s3_client", return_value=s3), patch.object(
+            seed_logs_module.boto3, "client", return_value=logs_client
+        ):
+            result = seed_logs_module.seed_logs("mock", max_workers=4)
+
+        self.assertEqual(result, {"log_groups_created": 2, "events_pushed": 400})
+        self.assertEqual(s3.calls["GetObject"], 40)
+        for call in logs_client.put_log_events.call_args_list:
+            stamps = [e["timestamp"] for e in call.kwargs["logEvents"]]
+            self.assertEqual(stamps, sorted(stamps))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import datetime
+import unittest
+from unittest.mock import patch
+
+from app.tools import serialization
+from app.tools.envelope import build_response_envelope
+from app.tools.serialization import Envelope, decode_envelope, encode_envelope
+
+
+def _envelope(findings, **kwargs):
+    start = datetime.datetime.now(datetime.timezone.utc)
+    return build_response_envelope("logs_agent", "INC-1", findings, start, **kwargs)
+
+
+class TestSerialization(unittest.TestCase):
+
+    def test_round_trip_is_lossless(self):
+        rows = [
+            {"error_code": "DB_CONN_TIMEOUT", "count": i, "ratio": i / 3, "frames": ["a", "b"]}
+            for i in range(50)
+        ]
+        cases = [
+            _envelope(rows),
+            _envelope([{"a": 1}, {"b": 2.5}, "free text"]),
+            _envelope([], error="boom"),
+            {**_envelope([{"x": None}]), "extra_key": {"nested": [1, 2]}},
+        ]
+        for envelope in cases:
+            self.assertEqual(Envelope.from_dict(envelope).to_dict(), envelope)
+            self.assertEqual(decode_envelope(encode_envelope(envelope)), envelope)
+
+    def test_json_fallback_and_size(self):
+        rows = [{"error_code": "DB_CONN_TIMEOUT", "count": i} for i in range(500)]
+        envelope = _envelope(rows)
+
+        with patch.object(serialization, "msgpack", None), patch.object(
+            serialization, "orjson", None
+        ):
+            data = encode_envelope(envelope)
+            self.assertEqual(serialization.codec_name(), "json")
+            self.assertEqual(decode_envelope(data), envelope)
+
+        plain = serialization.json.dumps(envelope).encode("utf-8")
+        self.assertLess(len(data), len(plain) / 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
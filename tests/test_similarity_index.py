@@ -0,0 +1,151 @@
+import asyncio
+import contextlib
+import json
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.local.aws import patch_aws
+from app.local.pipeline import run_pipeline
+from app.tools import cloudwatch_logs, evidence_store, s3_deployments, similarity_index
+from app.tools.evidence_store import EvidenceStore
+from app.tools.similarity_index import SimilarityIndex, incident_features
+
+
+def _evidence(codes, frames, metrics, keywords, root_cause):
+    return {
+        "findings": [
+            {
+                "agent": "logs_agent",
+                "findings": [
+                    {
+                        "matched_entries": 5,
+                        "error_summary": {c: {"count": 5} for c in codes},
+                        "sample_entries": [
+                            {"parsed_stack_trace": {"root_frame": {"full_path": f}}} for f in frames
+                        ],
+                    }
+                ],
+            },
+            {"agent": "metrics_agent", "findings": [{"metric_name": m} for m in metrics]},
+            {
+                "agent": "deploy_agent",
+                "findings": [{"deploy_id": "d-1", "correlation_score": 0.9, "matched_keywords": keywords}],
+            },
+        ],
+        "action": {"recommended_action": "rollback", "confidence": 0.9, "root_cause": root_cause},
+    }
+
+
+_DB_POOL = (
+    ["DB_CONN_TIMEOUT", "DB_POOL_EXHAUSTED", "CIRCUIT_BREAKER_OPEN"],
+    ["com.bayer.checkout.db.ConnectionPool.acquire"],
+    ["db_connection_wait_queue", "p99_latency_ms"],
+    ["pool", "connection"],
+    "Pool max lowered to 50",
+)
+_RATE_LIMIT = (
+    ["UPSTREAM_429"],
+    ["com.bayer.checkout.http.RateLimiter.check"],
+    ["error_rate_percent"],
+    ["ratelimit"],
+    "Rate limit lowered",
+)
+
+
+class TestSimilarityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = EvidenceStore(self._tmp.name)
+        for n, (kind, day) in enumerate([(_DB_POOL, 1), (_RATE_LIMIT, 2), (_DB_POOL, 3)]):
+            self.store.append(
+                {"incident_id": f"INC-{n}", "service": "checkout-service",
+                 "metric_name": "p99_latency_ms", "detected_at": f"2026-02-0{day}T14:30:00Z"},
+                _evidence(*kind),
+            )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_sync_and_query_ranks_by_shared_evidence(self):
+        index = SimilarityIndex()
+        self.assertEqual(index.sync(self.store), 3)
+        self.assertEqual(index.sync(self.store), 0)  # nothing changed
+
+        tokens = incident_features(
+            "checkout-service", "p99_latency_ms", ["DB_POOL_EXHAUSTED"],
+            ["com.bayer.checkout.db.ConnectionPool.acquire"],
+        )
+        matches = index.query(tokens, top_k=5)
+
+        self.assertEqual({m["incident_id"] for m in matches}, {"INC-0", "INC-2"})
+        self.assertEqual(matches[0]["root_cause"], "Pool max lowered to 50")
+        self.assertIn("err:DB_POOL_EXHAUSTED", matches[0]["shared_features"])
+        self.assertEqual(index.query(tokens, exclude="INC-2")[0]["incident_id"], "INC-0")
+
+        # A re-run replaces the incident instead of indexing it twice.
+        time.sleep(0.01)
+        self.store.append(
+            {"incident_id": "INC-0", "service": "checkout-service", "detected_at": "2026-02-01T14:30:00Z"},
+            _evidence(*_RATE_LIMIT),
+        )
+        self.assertEqual(index.sync(self.store), 1)
+        self.assertEqual(len(index), 3)
+        self.assertEqual([m["incident_id"] for m in index.query(tokens)], ["INC-2"])
+
+    def test_bad_history_and_evidence_do_not_fail_the_incident(self):
+        bad = self.store.root / "incidents" / "service=checkout-service" / "date=2026-02-04"
+        bad.mkdir(parents=True)
+        (bad / "INC-7.parquet").write_bytes(b"PAR1 half-written")
+        with self.assertLogs("app.tools.similarity_index", "WARNING"):
+            self.assertEqual(SimilarityIndex().sync(self.store), 4)
+
+        alarm = {"incident_id": "INC-9", "service": "checkout-service", "metric_name": "p99_latency_ms"}
+        deploy = {"agent": "deploy_agent", "findings": [{"deploy_id": "d-1", "timestamp": "yesterday"}]}
+        metrics = {"agent": "metrics_agent", "findings": [{"metric_name": "m", "anomaly_start": "2026-02-06T14:25:00Z"}]}
+        with self._default_index(), self.assertLogs("app.tools.similarity_index", "WARNING"):
+            matches = similarity_index.SimilarIncidents(alarm)
+            self.assertEqual(matches.lookup([metrics, deploy]), [])
+
+    def test_commander_matches_and_pipeline_use_the_default_index(self):
+        from app.agents.commander import commander_agent
+
+        alarm = {"incident_id": "INC-9", "service": "checkout-service", "metric_name": "p99_latency_ms"}
+        logs = {**_evidence(*_RATE_LIMIT)["findings"][0], "status": "completed"}
+        tool = SimpleNamespace(name="analyze_logs")
+        with self._default_index():
+            matches = similarity_index.SimilarIncidents(alarm)
+            with similarity_index.incident(matches):
+                result = asyncio.run(similarity_index.logs_reported(tool, {}, None, logs))
+            # Outside an incident run the tool result is left alone.
+            self.assertIsNone(asyncio.run(similarity_index.logs_reported(tool, {}, None, logs)))
+
+            with patch_aws(), patch.object(cloudwatch_logs, "POLL_INTERVAL_SECONDS", 0), patch.object(
+                s3_deployments, "_default_source", None
+            ), open("mock_data/cloudwatch_alarm.json") as f:
+                pipeline = run_pipeline(json.load(f)["mock_alarm_event"])
+
+        # The alarm alone is too coarse to match; logs_agent's evidence finds INC-1.
+        self.assertEqual(matches.opening, "")
+        self.assertEqual(result["findings"], logs["findings"])
+        self.assertEqual(result["similar_incidents"][0]["incident_id"], "INC-1")
+        self.assertEqual(pipeline["similar_incidents"][0]["root_cause"], "Pool max lowered to 50")
+        # No history, no paragraph; and the Commander never spends a turn on it.
+        with patch.object(evidence_store, "EVIDENCE_DIR", None):
+            self.assertEqual(similarity_index.SimilarIncidents(alarm).lookup([logs]), [])
+        self.assertNotIn("find_similar_incidents", [t.__name__ for t in commander_agent.tools])
+
+    def _default_index(self):
+        stack = contextlib.ExitStack()
+        stack.enter_context(patch.object(evidence_store, "EVIDENCE_DIR", self._tmp.name))
+        stack.enter_context(patch.object(evidence_store, "_default_store", None))
+        stack.enter_context(patch.object(similarity_index, "_default_index", None))
+        stack.enter_context(patch.object(similarity_index, "_last_sync", float("-inf")))
+        return stack
+
+
+if __name__ == "__main__":
+    unittest.main()
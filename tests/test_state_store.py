@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+from app.agents.commander import commander_agent
+from app.agents.metrics_agent import metrics_agent
+from app.handler import _normalize_event, stream_commander
+from app.local.dynamodb import LocalDynamoDB
+from app.tools import state_store
+from app.tools.state_store import StateStore
+from fake_llm import ScriptedLlm, function_call, text
+
+
+class TestStateStore(unittest.TestCase):
+
+    def test_save_is_write_behind_and_load_reads_own_writes(self):
+        dynamodb = LocalDynamoDB(latency_ms=50)
+        store = StateStore("AIC-IncidentState", dynamodb=dynamodb)
+
+        t0 = time.perf_counter()
+        store.save("INC-1", "META#0", {"service": "checkout-service"}, timestamped=False)
+        for agent in ("logs_agent", "metrics_agent", "deploy_agent"):
+            store.save("INC-1", f"FINDING#{agent}", {"confidence": 0.85})
+        store.save("INC-2", "META#0", {"service": "payment-service"}, timestamped=False)
+        self.assertLess(time.perf_counter() - t0, 0.05)
+
+        findings = store.load("INC-1", entity_prefix="FINDING#")
+        self.assertEqual(
+            [f["SK"].split("#")[1] for f in findings],
+            ["deploy_agent", "logs_agent", "metrics_agent"],
+        )
+        self.assertEqual(findings[0]["confidence"], 0.85)
+        self.assertEqual(len(store.load("INC-1")), 4)
+        self.assertEqual(store.load("INC-1", limit=2), findings[:2])
+
+    def test_unprocessed_items_are_retried_in_batches(self):
+        dynamodb = LocalDynamoDB(unprocessed_rate=0.5, seed=3)
+        store = StateStore("AIC-IncidentState", dynamodb=dynamodb)
+
+        with patch.object(state_store, "RETRY_BASE_SECONDS", 0):
+            for i in range(60):
+                store.save("INC-1", f"FINDING#agent{i:02d}", {"i": i})
+            self.assertTrue(store.flush(timeout=5))
+
+        self.assertEqual(store.failed_items, 0)
+        self.assertGreater(dynamodb.batch_calls, 3)  # 60 items need >= 3 calls of 25
+        self.assertEqual(len(store.load("INC-1")), 60)
+
+    def test_flush_reports_dropped_batches_once(self):
+        class _DownDynamoDB(LocalDynamoDB):
+            def batch_write_item(self, RequestItems, **kwargs):
+                raise RuntimeError("table is gone")
+
+        store = StateStore("AIC-IncidentState", dynamodb=_DownDynamoDB())
+        store.save("INC-1", "META#0", {"service": "checkout-service"}, timestamped=False)
+        store.save("INC-2", "META#0", {"service": "payment-service"}, timestamped=False)
+
+        with self.assertLogs("app.tools.state_store", "ERROR"):
+            self.assertEqual(store.load("INC-1"), [])
+            self.assertFalse(store.flush("INC-1", timeout=5))
+            self.assertTrue(store.flush("INC-1", timeout=5))
+            self.assertFalse(store.flush(timeout=5))
+        self.assertTrue(store.flush(timeout=5))
+        self.assertEqual(store.failed_items, 2)
+
+    def test_default_store_needs_a_table_inside_lambda(self):
+        with patch.object(state_store, "_default_store", None), patch.object(
+            state_store, "STATE_TABLE_NAME", None
+        ), patch.dict("os.environ", {"AWS_LAMBDA_FUNCTION_NAME": "aic-commander"}):
+            with self.assertRaises(RuntimeError):
+                state_store.default_store()
+        with patch.object(state_store, "_default_store", None), patch.object(
+            state_store, "STATE_TABLE_NAME", None
+        ), patch.dict("os.environ", {}, clear=True):
+            self.assertIsInstance(state_store.default_store()._dynamodb, LocalDynamoDB)
+
+    def test_handler_writes_meta_plan_and_findings(self):
+        with open("mock_data/cloudwatch_alarm.json") as f:
+            event = json.load(f)["mock_alarm_event"]
+        commander = ScriptedLlm(
+            model="fake-commander",
+            script=[
+                function_call("parse_alarm", {"event": event}),
+                function_call("transfer_to_agent", {"agent_name": "metrics_agent"}),
+            ],
+        )
+        metrics = ScriptedLlm(
+            model="fake-metrics",
+            script=[
+                function_call(
+                    "query_metrics_and_detect_anomalies",
+                    {
+                        "service": "checkout-service",
+                        "metric_names": ["p99_latency_ms"],
+                        "time_window": {"incident_id": "INC-20260206-143000"},
+                    },
+                ),
+                text("Metrics: nothing unusual."),
+            ],
+        )
+        store = StateStore("AIC-IncidentState", dynamodb=LocalDynamoDB())
+
+        async def run():
+            return [u async for u in stream_commander(_normalize_event(event))]
+
+        with patch.object(commander_agent, "model", commander), patch.object(
+            metrics_agent, "model", metrics
+        ), patch.object(state_store, "_default_store", store), patch(
+            "app.agents.metrics_agent.get_metric_data", return_value={}
+        ):
+            asyncio.run(run())
+
+        sks = [item["SK"].split("#")[0] for item in store.load("INC-20260206-143000")]
+        self.assertEqual(sks, ["FINDING", "META", "PLAN"])
+        meta = store.load("INC-20260206-143000", entity_prefix="META#0")[0]
+        self.assertEqual(meta["service"], "checkout-service")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+from app.agents.commander import commander_agent
+from app.agents.metrics_agent import metrics_agent
+from app import handler
+from app.handler import _normalize_event, stream_commander, stream_handler
+from fake_llm import ScriptedLlm, function_call, text
+
+
+def _alarm_event():
+    with open("mock_data/cloudwatch_alarm.json") as f:
+        return json.load(f)["mock_alarm_event"]
+
+
+def _scripted_models(event):
+    commander = ScriptedLlm(
+        model="fake-commander",
+        script=[
+            function_call("parse_alarm", {"event": event}),
+            function_call("transfer_to_agent", {"agent_name": "metrics_agent"}),
+        ],
+    )
+    metrics = ScriptedLlm(
+        model="fake-metrics",
+        script=[
+            function_call(
+                "query_metrics_and_detect_anomalies",
+                {
+                    "service": "checkout-service",
+                    "metric_names": ["p99_latency_ms"],
+                    "time_window": {
+                        "start": "2026-02-06T14:00:00Z",
+                        "end": "2026-02-06T14:30:00Z",
+                        "incident_id": "INC-20260206-143000",
+                    },
+                },
+            ),
+            text("Metrics: p99 latency spiked to 2300ms."),
+        ],
+    )
+    return commander, metrics
+
+
+def _latency_spike(service, metric_names, time_window):
+    points = [
+        {"timestamp": f"2026-02-06T14:{minute:02d}:00Z", "value": 170.0 + minute % 3}
+        for minute in range(0, 20)
+    ]
+    points += [{"timestamp": "2026-02-06T14:20:00Z", "value": 2300.0}]
+    return {name: points for name in metric_names}
+
+
+class TestStreaming(unittest.TestCase):
+
+    def test_stream_emits_phases_and_findings_in_order(self):
+        event = _alarm_event()
+        commander, metrics = _scripted_models(event)
+
+        async def collect():
+            return [u async for u in stream_commander(_normalize_event(event))]
+
+        with patch.object(commander_agent, "model", commander), patch.object(
+            metrics_agent, "model", metrics
+        ), patch("app.agents.metrics_agent.get_metric_data", _latency_spike):
+            updates = asyncio.run(collect())
+
+        types = [u["type"] for u in updates]
+        self.assertEqual(types[0], "started")
+        self.assertEqual(types[-1], "final")
+        self.assertEqual(
+            [u["phase"] for u in updates if u["type"] == "phase"], ["PLAN", "INVESTIGATE"]
+        )
+
+        finding = next(u for u in updates if u["type"] == "finding")
+        self.assertEqual(finding["agent"], "metrics_agent")
+        self.assertEqual(finding["status"], "completed")
+        # The envelope wraps the agent's final text and the anomalies its tool found.
+        self.assertEqual(finding["summary"], "Metrics: p99 latency spiked to 2300ms.")
+        self.assertEqual(finding["findings"][0]["metric_name"], "p99_latency_ms")
+        self.assertLess(types.index("finding"), types.index("final"))
+        self.assertEqual(metrics.calls, 2)  # tool call, then the summary
+
+        final = updates[-1]
+        self.assertIn("p99 latency spiked", final["response"])
+        self.assertLessEqual(final["first_evidence_ms"], final["elapsed_ms"])
+
+    def test_stream_handler_yields_ndjson_lines(self):
+        event = _alarm_event()
+        commander, metrics = _scripted_models(event)
+
+        with patch.object(commander_agent, "model", commander), patch.object(
+            metrics_agent, "model", metrics
+        ), patch("app.agents.metrics_agent.get_metric_data", _latency_spike):
+            lines = list(stream_handler(event))
+
+        updates = [json.loads(line) for line in lines]
+        self.assertTrue(all(line.endswith(b"\n") for line in lines))
+        self.assertEqual(updates[0]["type"], "started")
+        self.assertEqual(updates[-1]["type"], "final")
+
+    def test_stream_handler_flushes_when_the_client_disconnects(self):
+        event = _alarm_event()
+        commander, metrics = _scripted_models(event)
+
+        with patch.object(commander_agent, "model", commander), patch.object(
+            metrics_agent, "model", metrics
+        ), patch("app.agents.metrics_agent.get_metric_data", _latency_spike), patch.object(
+            handler, "_finish_invocation"
+        ) as finish:
+            stream = stream_handler(event)
+            first = json.loads(next(stream))
+            stream.close()
+
+        self.assertEqual(first["type"], "started")
+        finish.assert_called_once_with()
+        self.assertEqual(metrics.calls, 2)  # the investigation still ran to the end
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import datetime
+import unittest
+from unittest.mock import patch
+
+from app.tools import timeutil
+
+UTC = datetime.timezone.utc
+MS = 1_770_385_500_000  # 2026-02-06T13:45:00Z
+
+
+def _column():
+    return [timeutil.iso_from_ms(MS + i * 60_000) for i in range(200)] + ["bad", 17]
+
+
+class TestTimeutil(unittest.TestCase):
+
+    def test_every_input_shape_maps_to_the_same_epoch_ms(self):
+        for value in (
+            "2026-02-06T13:45:00Z",
+            "2026-02-06T13:45:00+00:00",
+            "2026-02-06T13:45:00+0000",
+            "2026-02-06T15:45:00+02:00",
+            " 2026-02-06T13:45:00 ",
+            str(MS // 1000),
+            MS // 1000,
+            MS,
+            MS * 1_000_000,
+            datetime.datetime(2026, 2, 6, 13, 45, tzinfo=UTC),
+        ):
+            with self.subTest(value=value):
+                self.assertEqual(timeutil.to_epoch_ms(value), MS)
+        for value in (None, "", "yesterday", True, {}):
+            self.assertIsNone(timeutil.to_epoch_ms(value))
+
+        self.assertEqual(timeutil.iso_from_ms(MS), "2026-02-06T13:45:00Z")
+        self.assertEqual(timeutil.from_epoch_ms(MS), datetime.datetime(2026, 2, 6, 13, 45, tzinfo=UTC))
+        self.assertEqual(timeutil.parse_iso("2026-02-06T15:45:00+02:00").utcoffset(), datetime.timedelta(hours=2))
+        with self.assertRaises(ValueError):
+            timeutil.parse_iso("not a timestamp")
+
+    def test_bulk_parse_without_numpy_matches_scalar(self):
+        column = _column()
+        expected = [timeutil.to_epoch_ms(v) for v in column]
+
+        with patch.object(timeutil, "np", None):
+            self.assertEqual(timeutil.bulk_epoch_ms(column), expected)
+            self.assertEqual(timeutil.bulk_epoch_ms(column[:200]), expected[:200])
+
+    @unittest.skipUnless(timeutil.np is not None, "numpy not installed")
+    def test_vectorized_bulk_parse_matches_scalar(self):
+        column = _column()
+        expected = [timeutil.to_epoch_ms(v) for v in column]
+
+        self.assertEqual(timeutil.bulk_epoch_ms(column), expected)
+        self.assertEqual(timeutil.bulk_epoch_ms(column[:200]), expected[:200])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import boto3
+from botocore.stub import Stubber
+
+from app.tools import coalescer, tracing
+from fake_llm import ScriptedLlm, function_call, text
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_disabled_tracing_is_a_noop(self):
+        with tracing.trace_incident("INC-OFF", enabled=False) as trace:
+            self.assertIsNone(trace)
+            with tracing.span("anything") as s:
+                self.assertIsNone(s)
+            tracing.enter_phase("PLAN")
+        self.assertIsNone(tracing.current_trace())
+
+    def test_spans_are_grouped_by_phase(self):
+        with tracing.trace_incident("INC-ON", enabled=True, export=False) as trace:
+            with tracing.span("git log", kind="subprocess"):
+                pass
+            tracing.enter_phase("INVESTIGATE")
+            with tracing.span("outer", kind="tool") as outer:
+                with tracing.span("inner", kind="aws", bytes_sent=10) as inner:
+                    pass
+
+        summary = trace.summary()
+        self.assertEqual(set(summary["phases"]), {"DETECT", "INVESTIGATE"})
+        self.assertEqual(summary["subprocess"]["calls"], 1)
+        self.assertEqual(summary["aws"]["bytes_sent"], 10)
+        self.assertEqual(inner.parent_id, outer.span_id)
+        self.assertEqual(inner.attrs["phase"], "INVESTIGATE")
+
+    def test_aws_calls_are_recorded(self):
+        client = tracing.instrument_client(
+            boto3.client(
+                "logs",
+                region_name="us-east-1",
+                aws_access_key_id="test",
+                aws_secret_access_key="test",
+            )
+        )
+        with Stubber(client) as stub:
+            stub.add_response("start_query", {"queryId": "q-1"})
+            with tracing.trace_incident("INC-AWS", enabled=True, export=False) as trace:
+                client.start_query(
+                    logGroupName="/bayer/checkout-service",
+                    startTime=0,
+                    endTime=60,
+                    queryString="fields @timestamp",
+                )
+
+        aws_spans = [s for s in trace.spans if s.kind == "aws"]
+        self.assertEqual(len(aws_spans), 1)
+        self.assertEqual(aws_spans[0].name, "logs.StartQuery")
+        self.assertGreater(aws_spans[0].attrs["bytes_sent"], 0)
+
+    def test_trace_is_exported_and_summarized_by_handler(self):
+        from app.agents.commander import commander_agent
+        from app.handler import lambda_handler
+
+        with open("mock_data/cloudwatch_alarm.json") as f:
+            event = json.load(f)["mock_alarm_event"]
+
+        llm = ScriptedLlm(
+            model="fake-commander",
+            script=[function_call("parse_alarm", {"event": event}), text("# Incident Report")],
+        )
+        with tempfile.TemporaryDirectory() as trace_dir, patch.object(
+            tracing, "TRACE_ENABLED", True
+        ), patch.object(tracing, "TRACE_DIR", trace_dir), patch.object(
+            commander_agent, "model", llm
+        ), patch.object(
+            coalescer, "_default_backend", coalescer.InMemoryCoalesceBackend()
+        ):
+            result = lambda_handler(event)
+
+            self.assertEqual(result["statusCode"], 200)
+            summary = result["body"]["trace"]
+            self.assertIn("DETECT", summary["phases"])
+            self.assertIn("PLAN", summary["phases"])
+            self.assertEqual(summary["llm"]["calls"], 2)
+            self.assertEqual(summary["llm"]["input_tokens"], 320)
+            self.assertEqual(summary["tool"]["calls"], 1)
+            self.assertTrue(os.path.exists(summary["trace_file"]))
+
+
+if __name__ == "__main__":
+    unittest.main()